@@ -0,0 +1,211 @@
+# batch_sim.py
+# Vectorized simulator that plays many games in lockstep with NumPy.
+#
+# Every round lasts exactly 16 turns unless someone calls shobu, so all N
+# rounds can advance together: turn t plays card 24 + t of each deck. Cards,
+# hands, field and captured piles are (N, 48) boolean arrays and yaku scoring
+# uses the same tables as yaku_table.py, indexed with array operations.
+# Usage: python koikoi/batch_sim.py [num_games] [greedy|random]
+
+import sys
+import time
+import numpy as np
+from bitboard import NUM_CARDS, CARD_MONTHS, CARD_POINTS, mask_to_ids
+from yaku_table import (HIKARI_MASK, SET_CARDS_MASK, TANE_MASK, TAN_MASK, KASU_MASK,
+                        HIKARI_SCORES, SET_SCORES, TANE_SCORES, TAN_SCORES, KASU_SCORES)
+
+TURNS_PER_ROUND = 16
+
+MONTH_INDEX = np.array([month - 1 for month in CARD_MONTHS])
+POINTS = np.array(CARD_POINTS)
+POINTS_SMALL = POINTS.astype(np.int16)
+# Highest points first, then lowest card id, as in bitboard.best_target
+TARGET_ORDER = POINTS * 64 + (63 - np.arange(NUM_CARDS))
+MONTH_POINTS = POINTS_SMALL.reshape(12, 4)
+# MONTH_MEMBERS[m] is True for the cards of month m + 1
+MONTH_MEMBERS = np.array([[month == m + 1 for month in CARD_MONTHS] for m in range(12)])
+
+
+def _mask_columns(mask):
+    return np.array(mask_to_ids(mask))
+
+
+def _subset_table(mask, scores):
+    """
+    Re-indexes a yaku_table score dict (keyed by card bitmask) by the packed
+    index sum(2**j for each j-th card of mask that is present).
+    """
+    ids = mask_to_ids(mask)
+    table = np.zeros(1 << len(ids), dtype=np.int64)
+    for subset, score in scores.items():
+        index = sum(1 << j for j, card_id in enumerate(ids) if subset >> card_id & 1)
+        table[index] = score
+    return np.array(ids), 1 << np.arange(len(ids)), table
+
+
+HIKARI_COLUMNS, HIKARI_WEIGHTS, HIKARI_TABLE = _subset_table(HIKARI_MASK, HIKARI_SCORES)
+SET_COLUMNS, SET_WEIGHTS, SET_TABLE = _subset_table(SET_CARDS_MASK, SET_SCORES)
+TANE_COLUMNS, TANE_TABLE = _mask_columns(TANE_MASK), np.array(TANE_SCORES)
+TAN_COLUMNS, TAN_TABLE = _mask_columns(TAN_MASK), np.array(TAN_SCORES)
+KASU_COLUMNS, KASU_TABLE = _mask_columns(KASU_MASK), np.array(KASU_SCORES)
+
+
+def yaku_scores(captured):
+    """Total yaku points for each row of an (N, 48) captured-card array."""
+    return (HIKARI_TABLE[captured[:, HIKARI_COLUMNS] @ HIKARI_WEIGHTS]
+            + SET_TABLE[captured[:, SET_COLUMNS] @ SET_WEIGHTS]
+            + TANE_TABLE[captured[:, TANE_COLUMNS].sum(axis=1)]
+            + TAN_TABLE[captured[:, TAN_COLUMNS].sum(axis=1)]
+            + KASU_TABLE[captured[:, KASU_COLUMNS].sum(axis=1)])
+
+
+def greedy_policy(sim, hand):
+    """
+    bitboard.greedy_move for every game at once: capture the most valuable
+    field card possible, otherwise play the cheapest card. Ties go to the
+    lowest card id.
+    """
+    n = hand.shape[0]
+    # CARD_DATA lists four cards per month in order; every card is worth at least 1 point
+    best_match = (sim.field.reshape(n, 12, 4) * MONTH_POINTS).max(axis=2)[:, MONTH_INDEX]
+    # Captures score 101..120, other cards 40..59 (cheapest highest), cards not in hand 0
+    value = np.where(best_match > 0, 100 + best_match, 60 - POINTS_SMALL) * hand
+    return value.argmax(axis=1)
+
+
+def greedy_koikoi(sim, seat):
+    """Koikoi once, then shobu: the rollout proxy of bitboard.greedy_move, not koikoi_advice."""
+    return ~sim.koikoied[sim.rows, seat]
+
+
+def greedy_capture(sim, matches):
+    """Column of the most valuable matching field card, ties to the lowest card id."""
+    return (matches * TARGET_ORDER).argmax(axis=1)
+
+
+def random_policy(sim, hand):
+    """Plays a uniformly random card from each hand."""
+    return np.where(hand, sim.rng.random(hand.shape), -1.0).argmax(axis=1)
+
+
+def random_koikoi(sim, seat):
+    return sim.rng.random(len(seat)) < 0.5
+
+
+def random_capture(sim, matches):
+    return np.where(matches, sim.rng.random(matches.shape), -1.0).argmax(axis=1)
+
+
+# name -> (card to play, koikoi or not, which of two matches to capture)
+POLICIES = {
+    'greedy': (greedy_policy, greedy_koikoi, greedy_capture),
+    'random': (random_policy, random_koikoi, random_capture),
+}
+
+
+class BatchSimulator:
+    """Plays num_games games of koikoi side by side with one policy for both seats."""
+
+    def __init__(self, num_games, policy='greedy', seed=None):
+        self.num_games = num_games
+        self.play_policy, self.koikoi_policy, self.capture_policy = POLICIES[policy]
+        self.rng = np.random.default_rng(seed)
+        self.rows = np.arange(num_games)
+        self.total_scores = np.zeros((num_games, 2), dtype=np.int64)
+
+    def play_games(self):
+        """Plays 12 rounds per game and returns the (N, 2) total scores."""
+        parent = self.rng.integers(0, 2, self.num_games)
+        for _ in range(12):
+            winner, points = self.play_round(self.shuffled_decks(), parent)
+            self.total_scores[self.rows, winner] += points
+            parent = winner
+        return self.total_scores
+
+    def shuffled_decks(self):
+        """Returns an (N, 48) array of independent deck orders."""
+        return self.rng.random((self.num_games, NUM_CARDS)).argsort(axis=1)
+
+    def play_round(self, decks, parent):
+        """
+        Plays one round per deck order, dealing like BitboardState.deal.
+        Returns (winner seat, points awarded) arrays.
+        """
+        n, rows = self.num_games, self.rows
+        self.hands = np.zeros((n, 2, NUM_CARDS), dtype=bool)
+        self.field = np.zeros((n, NUM_CARDS), dtype=bool)
+        self.captured = np.zeros((n, 2, NUM_CARDS), dtype=bool)
+        self.koikoied = np.zeros((n, 2), dtype=bool)
+        self.monthly = np.zeros((n, 2), dtype=np.int64)
+        winner = np.full(n, -1)
+        ended = np.zeros(n, dtype=bool)
+
+        for i in range(8):
+            self.hands[rows, parent, decks[:, i]] = True
+            self.hands[rows, 1 - parent, decks[:, 8 + i]] = True
+            self.field[rows, decks[:, 16 + i]] = True
+
+        for turn in range(TURNS_PER_ROUND):
+            active = ~ended
+            seat = parent if turn % 2 == 0 else 1 - parent
+            card = self.play_policy(self, self.hands[rows, seat])
+            self.hands[rows[active], seat[active], card[active]] = False
+            self._handle_play(card, seat, active)
+            self._handle_play(decks[:, 24 + turn], seat, active)
+
+            score = yaku_scores(self.captured[rows, seat])
+            improved = active & (score > self.monthly[rows, seat])
+            self.monthly[rows[improved], seat[improved]] = score[improved]
+            koikoi = self.koikoi_policy(self, seat)
+            calls_koikoi = improved & koikoi
+            self.koikoied[rows[calls_koikoi], seat[calls_koikoi]] = True
+            shobu = improved & ~koikoi
+            winner[shobu] = seat[shobu]
+            ended |= shobu
+
+        # Rounds that ran out of cards are decided by kasu count; a tie goes to the parent
+        kasu = self.captured[:, :, KASU_COLUMNS].sum(axis=2)
+        by_cards = ~ended
+        kasu_winner = np.where(kasu[:, 0] > kasu[:, 1], 0, np.where(kasu[:, 1] > kasu[:, 0], 1, parent))
+        winner[by_cards] = kasu_winner[by_cards]
+        self.monthly[rows[by_cards], winner[by_cards]] = np.where(
+            kasu[by_cards, 0] == kasu[by_cards, 1], 6, 1)
+
+        base = self.monthly[rows, winner]
+        points = base * np.where(self.koikoied[rows, 1 - winner], 2, 1) * np.where(base >= 7, 2, 1)
+        return winner, points
+
+    def _handle_play(self, card, seat, active):
+        """
+        Captures the matching field card (the policy's choice of two, all of
+        three), or lays the card on the field. A hand card and a drawn card
+        use the same choice, like bitboard.greedy_move.
+        """
+        rows = self.rows
+        matches = self.field & MONTH_MEMBERS[MONTH_INDEX[card]]
+        count = matches.sum(axis=1)
+        choose = active & (count == 2)
+        if choose.any():
+            choice = self.capture_policy(self, matches)
+            matches[choose] = False
+            matches[rows[choose], choice[choose]] = True
+        capture = active & (count > 0)
+        place = active & ~capture
+        taken = matches & capture[:, None]
+        self.field &= ~taken
+        self.captured[rows, seat] |= taken
+        self.captured[rows[capture], seat[capture], card[capture]] = True
+        self.field[rows[place], card[place]] = True
+
+
+def main():
+    num_games = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    policy = sys.argv[2] if len(sys.argv) > 2 else 'greedy'
+    start = time.perf_counter()
+    BatchSimulator(num_games, policy).play_games()
+    elapsed = time.perf_counter() - start
+    print(f"Batch engine ({policy}): {num_games} games in {elapsed:.2f}s, {num_games / elapsed:,.0f} games/second")
+
+
+if __name__ == "__main__":
+    main()
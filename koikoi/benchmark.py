@@ -0,0 +1,411 @@
+# benchmark.py
+# Micro-benchmarks for the performance-sensitive parts of the engine.
+# Usage: python koikoi/benchmark.py [yaku] [parallel] [batch] [state] [zobrist] [features] [odds]
+
+import os
+import random
+import statistics
+import sys
+import time
+from bitboard import (BitboardState, NUM_CARDS, CARD_KINDS, greedy_move, move_card, move_target,
+                      cards_to_ids_mask, mask_to_ids)
+from constants import GAME_STATE_KOIKOI_CHOICE, GAME_STATE_CAPTURE_CHOICE, GAME_STATE_ROUND_END, GAME_STATE_GAME_END
+from deck import Deck
+from game_controller import GameController
+from ismcts import ISMCTS, ParallelISMCTS
+from player import Player
+from simulation import run_simulation, run_bitboard_simulation, play_bitboard_round
+from symmetry import position_class
+from yaku import Yaku
+from yaku_table import YakuTable
+
+
+def _time_calls(func, args_list, repeat=3):
+    """Returns the best time in seconds for calling func once per args entry."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for args in args_list:
+            func(args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_yaku(num_piles=20000, seed=0):
+    """Checks YakuTable against Yaku on random captured piles and times both."""
+    rng = random.Random(seed)
+    cards = Deck().cards
+    piles = [rng.sample(cards, rng.randint(0, 24)) for _ in range(num_piles)]
+
+    reference = Yaku()
+    table = YakuTable()
+    for pile in piles:
+        expected = reference.check_yaku(pile)
+        actual = table.check_yaku(pile)
+        if actual != expected:
+            raise AssertionError(f"YakuTable mismatch for {pile}: {actual} != {expected}")
+
+    reference_time = _time_calls(reference.check_yaku, piles)
+    table_time = _time_calls(table.check_yaku, piles)
+    print(f"check_yaku on {num_piles} piles (results identical)")
+    print(f"  Yaku:      {reference_time * 1e6 / num_piles:7.2f} us/call")
+    print(f"  YakuTable: {table_time * 1e6 / num_piles:7.2f} us/call  ({reference_time / table_time:.1f}x faster)")
+
+
+def bench_parallel(time_limit=2.0, seed=0):
+    """Measures ISMCTS playouts per second for 1..cpu_count worker processes."""
+    rng = random.Random(seed)
+    deck = list(range(NUM_CARDS))
+    rng.shuffle(deck)
+    state = BitboardState.deal(deck)
+
+    serial = ISMCTS(time_limit=time_limit, rng=random.Random(seed))
+    serial.run(state)
+    base_rate = serial.last_playouts / time_limit
+    print(f"ISMCTS playouts/second over {time_limit:.1f}s")
+    print(f"  in-process:  {base_rate:9,.0f}")
+
+    worker_counts = sorted({1, 2, os.cpu_count() or 1})
+    for workers in worker_counts:
+        search = ParallelISMCTS(workers=workers, time_limit=time_limit, rng=random.Random(seed))
+        search.start()
+        try:
+            search.search(state)
+        finally:
+            search.close()
+        rate = search.last_playouts / time_limit
+        print(f"  {workers:2d} workers:  {rate:9,.0f}  ({rate / base_rate:.2f}x)")
+
+
+def bench_batch(num_games=5000, object_games=300, seed=0):
+    """
+    Checks that the NumPy batch engine plays the same rounds as BitboardState
+    under the greedy policy, then compares games/second of all engines. The
+    object engine's CPU decides koikoi with koikoi_advice rather than the
+    greedy koikoi-once rule, so its games differ and only speed is compared.
+    """
+    from batch_sim import BatchSimulator
+
+    sim = BatchSimulator(1000, seed=seed)
+    decks = sim.shuffled_decks()
+    parents = sim.rng.integers(0, 2, 1000)
+    winners, points = sim.play_round(decks, parents)
+    for i in range(1000):
+        state = play_bitboard_round(BitboardState.deal([int(c) for c in decks[i]], int(parents[i])))
+        if (state.winner, state.round_points) != (winners[i], points[i]):
+            raise AssertionError(f"Batch engine differs from BitboardState on round {i}")
+    print("Batch engine matches BitboardState on 1000 greedy rounds")
+
+    rounds, elapsed = run_simulation(object_games)
+    print(f"  {'object engine:':<16} {object_games / elapsed:9,.0f} games/second")
+    rounds, elapsed = run_bitboard_simulation(object_games)
+    print(f"  {'bitboard engine:':<16} {object_games / elapsed:9,.0f} games/second")
+    for policy in ('greedy', 'random'):
+        start = time.perf_counter()
+        BatchSimulator(num_games, policy, seed=seed).play_games()
+        elapsed = time.perf_counter() - start
+        label = f"batch ({policy}):"
+        print(f"  {label:<16} {num_games / elapsed:9,.0f} games/second")
+
+
+def _comparable(state):
+    """pack() without round_points, which GameController adds to total_score instead."""
+    packed = state.pack()
+    return packed[:14] + packed[15:]
+
+
+def verify_make_undo(num_games=200, seed=0):
+    """
+    Plays headless games on GameController and replays every move on a
+    BitboardState with make(), checking that both reach the same state and
+    Zobrist key and that undo() restores the previous one exactly. Returns
+    the number of moves checked.
+    """
+    checked = 0
+    for game_index in range(num_games):
+        # Seats are not marked is_cpu, so koikoi and capture choices stop the controller like a human's do
+        game = GameController(Player("Seat 0"), Player("Seat 1"), rng=random.Random(seed * 100003 + game_index))
+        game.start_game()
+        while game.game_state != GAME_STATE_GAME_END:
+            if game.game_state == GAME_STATE_ROUND_END:
+                game.next_round()
+                continue
+            state = game.to_bitboard()
+            before = _comparable(state)
+            move = greedy_move(state)
+            if game.game_state == GAME_STATE_KOIKOI_CHOICE:
+                if move:
+                    game.player_chooses_koikoi()
+                else:
+                    game.player_chooses_shobu()
+            elif game.game_state == GAME_STATE_CAPTURE_CHOICE:
+                game.player_chooses_capture(next(card for card in game.field.cards if card.card_id == move))
+            else:
+                card = next(card for card in game.current_player.hand if card.card_id == move_card(move))
+                target = next((card for card in game.field.cards if card.card_id == move_target(move)), None)
+                game.execute_turn(card, target)
+
+            state.make(move)
+            if _comparable(state) != _comparable(game.to_bitboard()):
+                raise AssertionError(f"BitboardState differs from GameController after move {move}")
+            if state.zobrist() != game.position_hash():
+                raise AssertionError(f"Zobrist keys differ from GameController after move {move}")
+            state.undo()
+            if _comparable(state) != before:
+                raise AssertionError(f"undo() did not restore the state before move {move}")
+            checked += 1
+    return checked
+
+
+def bench_state(num_games=200, seed=0):
+    """Verifies make/undo against GameController, then times it against clone + apply."""
+    checked = verify_make_undo(num_games, seed)
+    print(f"make/undo matches GameController on {checked} moves")
+
+    rng = random.Random(seed)
+    states = []
+    for _ in range(200):
+        deck = list(range(NUM_CARDS))
+        rng.shuffle(deck)
+        state = BitboardState.deal(deck, rng.randrange(2))
+        for _ in range(rng.randrange(12)):
+            if state.is_terminal():
+                break
+            state.apply(greedy_move(state))
+        if not state.is_terminal():
+            states.append(state)
+
+    def expand_clone(state):
+        for move in state.legal_moves():
+            child = state.clone()
+            child.apply(move)
+
+    def expand_make(state):
+        for move in state.legal_moves():
+            state.make(move)
+            state.undo()
+
+    def clone_only(state):
+        for _ in state.legal_moves():
+            state.clone()
+
+    # Time the three loops back to back, many times over, and take medians:
+    # a slow stretch of the machine then hits all three alike.
+    clone_times, make_times, snapshot_times = [], [], []
+    for _ in range(200):
+        clone_times.append(_time_calls(expand_clone, states, repeat=1))
+        make_times.append(_time_calls(expand_make, states, repeat=1))
+        snapshot_times.append(_time_calls(clone_only, states, repeat=1))
+    clone_time = statistics.median(clone_times)
+    make_time = statistics.median(make_times)
+    snapshot_time = statistics.median(snapshot_times)
+    speedup = statistics.median(c / m for c, m in zip(clone_times, make_times))
+    moves = sum(len(state.legal_moves()) for state in states)
+    apply_time = clone_time - snapshot_time
+    print(f"Expanding {moves} child positions")
+    print(f"  clone + apply: {clone_time * 1e6 / moves:6.2f} us/child")
+    print(f"  make + undo:   {make_time * 1e6 / moves:6.2f} us/child  ({speedup:.2f}x)")
+    print(f"Copying the position alone, apply excluded ({apply_time * 1e6 / moves:.2f} us/child)")
+    print(f"  clone:         {snapshot_time * 1e6 / moves:6.2f} us/child")
+    print(f"  make + undo:   {(make_time - apply_time) * 1e6 / moves:6.2f} us/child")
+
+
+def _swap_interchangeable(state, rng):
+    """A copy of state with each group of interchangeable cards randomly relabelled."""
+    mapping = list(range(NUM_CARDS))
+    for kind in set(CARD_KINDS):
+        group = [card_id for card_id in range(NUM_CARDS) if CARD_KINDS[card_id] == kind]
+        shuffled = group[:]
+        rng.shuffle(shuffled)
+        for card_id, new_id in zip(group, shuffled):
+            mapping[card_id] = new_id
+
+    def relabel(mask):
+        return cards_to_ids_mask(mapping[card_id] for card_id in mask_to_ids(mask))
+
+    copy = state.clone()
+    copy.hands = [relabel(mask) for mask in state.hands]
+    copy.captured = [relabel(mask) for mask in state.captured]
+    copy.field = relabel(state.field)
+    copy.deck = tuple(mapping[card_id] for card_id in state.deck)
+    copy.pending = None if state.pending is None else mapping[state.pending]
+    copy.rehash()
+    return copy
+
+
+def bench_zobrist(num_games=2000, seed=0, table_bits=(12, 14, 16, 18, 20)):
+    """
+    Checks the incremental Zobrist keys against recomputed ones and against
+    the same positions with interchangeable cards swapped, counts true
+    64-bit collisions between position classes, and reports how often
+    distinct positions share a slot in tables of different sizes.
+    """
+    rng = random.Random(seed)
+    positions = {}  # Zobrist key -> position class
+    collisions = 0
+    visited = 0
+    start = time.perf_counter()
+    for _ in range(num_games):
+        deck = list(range(NUM_CARDS))
+        rng.shuffle(deck)
+        state = BitboardState.deal(deck, rng.randrange(2))
+        while not state.is_terminal():
+            key = state.zobrist()
+            check = state.clone()
+            check.rehash()
+            if check.cards_key != state.cards_key:
+                raise AssertionError("Incremental Zobrist key differs from a recomputed one")
+            if _swap_interchangeable(state, rng).zobrist() != key:
+                raise AssertionError("Swapping interchangeable cards changed the Zobrist key")
+            position = position_class(state)
+            if positions.setdefault(key, position) != position:
+                collisions += 1
+            visited += 1
+            state.apply(rng.choice(state.legal_moves()))
+    elapsed = time.perf_counter() - start
+    print(f"Zobrist keys match on {visited} positions ({len(positions)} distinct, "
+          f"{collisions} 64-bit collisions, {elapsed:.1f}s)")
+
+    keys = list(positions)
+    print("Slot sharing by table size (distinct positions that land on a used slot)")
+    for bits in table_bits:
+        size = 1 << bits
+        used = len({key % size for key in keys})
+        expected = len(keys) - size * (1 - (1 - 1 / size) ** len(keys))
+        print(f"  2^{bits:<2} slots: {len(keys) - used:7d} ({(len(keys) - used) / len(keys):6.1%}), "
+              f"{expected:9.0f} expected for random keys")
+
+
+def _row_features(row):
+    """One position's features built card by card, the way a single-position encoder would."""
+    import numpy as np
+    from evaluation import NUM_FEATURES, NUM_PLANES, SCALAR_SCALE
+    features = np.zeros(NUM_FEATURES, np.float32)
+    masks, counters = row
+    for plane, mask in enumerate(masks):
+        for card_id in mask_to_ids(mask):
+            features[plane * NUM_CARDS + card_id] = 1
+    features[NUM_PLANES * NUM_CARDS:] = np.array(counters, np.float32) * SCALAR_SCALE
+    return features
+
+
+def bench_features(num_games=100, seed=0):
+    """
+    Checks the batched encoder against the dataset encoding of the same
+    decision points, then times scoring every candidate move one position
+    at a time against one batch per decision.
+    """
+    import numpy as np
+    from evaluation import FeatureEncoder, LinearEvaluator, capture_row, encode_columns
+    from features import DECISION_PLAY, COLUMNS, encode_decision
+    from simulation import play_turn
+
+    encoder = FeatureEncoder()
+    states, rows = [], []
+    for game_index in range(num_games):
+        game = GameController(Player("CPU 1", is_cpu=True), Player("CPU 2", is_cpu=True),
+                              rng=random.Random(seed * 100003 + game_index))
+        game.start_game()
+        while game.game_state != GAME_STATE_GAME_END:
+            if game.game_state == GAME_STATE_ROUND_END:
+                game.next_round()
+                continue
+            states.append(game.to_bitboard())
+            rows.append(encode_decision(game, DECISION_PLAY, 0))
+            play_turn(game)
+    columns = {name: np.array(values if name != 'cards' else [list(codes) for codes in values])
+               for name, values in zip(COLUMNS, zip(*rows))}
+    if not np.array_equal(encoder.encode_states(states), encode_columns(columns)):
+        raise AssertionError("Batched features differ from the dataset encoding")
+    print(f"Batched features match the dataset encoding on {len(states)} positions")
+
+    evaluator = LinearEvaluator()
+    candidates = [[capture_row(state, state.current, move_card(move), move_target(move))
+                   for move in state.legal_moves()] for state in states]
+    def one_at_a_time(rows):
+        return max(range(len(rows)), key=lambda i: _row_features(rows[i]) @ evaluator.weights)
+
+    def batched(rows):
+        return int(np.argmax(evaluator.score(rows)))
+
+    for rows in candidates:
+        if one_at_a_time(rows) != batched(rows):
+            raise AssertionError("Batched scores pick a different move")
+    single_time = _time_calls(one_at_a_time, candidates)
+    batch_time = _time_calls(batched, candidates)
+    total = sum(len(rows) for rows in candidates)
+    print(f"Scoring {total} candidate moves of {len(states)} positions")
+    print(f"  one at a time: {single_time * 1e6 / total:6.2f} us/candidate")
+    print(f"  batched:       {batch_time * 1e6 / total:6.2f} us/candidate  ({single_time / batch_time:.1f}x)")
+    start = time.perf_counter()
+    for state in states:
+        evaluator.choose_play(state)
+    elapsed = time.perf_counter() - start
+    print(f"  choose_play:   {elapsed * 1e6 / len(states):6.2f} us/decision, including candidate generation")
+
+
+def bench_odds(num_rounds=3000, seed=0):
+    """
+    Checks the closed-form completion odds against counting every draw of
+    small pools, then times koikoi_advice on the koikoi calls of greedy
+    self-play, with an empty cache and again with a warm one.
+    """
+    import itertools
+    from bitboard import PHASE_KOIKOI
+    from yaku_odds import completion_probability, koikoi_advice
+
+    for groups, pool, draws in [(((2, 3),), 9, 4), (((1, 2), (2, 3)), 10, 5), (((3, 5), (1, 1)), 12, 7)]:
+        cards = [(g, c) for g, (_, unseen) in enumerate(groups) for c in range(unseen)]
+        cards += [(None, c) for c in range(pool - len(cards))]
+        hits = total = 0
+        for drawn in itertools.combinations(cards, draws):
+            total += 1
+            hits += all(sum(g == i for g, _ in drawn) >= need for i, (need, _) in enumerate(groups))
+        if abs(hits / total - completion_probability(groups, pool, draws)) > 1e-12:
+            raise AssertionError(f"Completion odds of {groups} from {pool} differ from enumeration")
+    print("Completion odds match enumeration")
+
+    rng = random.Random(seed)
+    states = []
+    for _ in range(num_rounds):
+        deck = list(range(NUM_CARDS))
+        rng.shuffle(deck)
+        state = BitboardState.deal(deck, rng.randrange(2))
+        while not state.is_terminal():
+            if state.phase == PHASE_KOIKOI:
+                states.append(state.clone())
+            state.apply(greedy_move(state))
+    completion_probability.cache_clear()
+    start = time.perf_counter()
+    calls = sum(koikoi_advice(state)[0] for state in states)
+    cold = time.perf_counter() - start
+    tails = completion_probability.cache_info()
+    warm = _time_calls(koikoi_advice, states)
+    print(f"koikoi_advice on {len(states)} koikoi calls from {num_rounds} rounds ({calls} koikoi):")
+    print(f"  empty cache: {cold * 1e6 / len(states):6.1f} us/call  ({tails.currsize} tails, "
+          f"{tails.hits / (tails.hits + tails.misses):.0%} hits)")
+    print(f"  warm cache:  {warm * 1e6 / len(states):6.1f} us/call")
+
+
+BENCHMARKS = {
+    'yaku': bench_yaku,
+    'parallel': bench_parallel,
+    'batch': bench_batch,
+    'state': bench_state,
+    'zobrist': bench_zobrist,
+    'features': bench_features,
+    'odds': bench_odds,
+}
+
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark '{name}'. Choose from: {', '.join(BENCHMARKS)}")
+            return
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main()
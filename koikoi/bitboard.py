@@ -0,0 +1,479 @@
+# bitboard.py
+# Bitboard representation of card sets: bit i stands for card.CARD_DATA[i].
+# Hands, field and captured piles become plain ints, so matching, capturing
+# and counting are AND/OR/popcount operations.
+
+from constants import GAME_STATE_KOIKOI_CHOICE, GAME_STATE_CAPTURE_CHOICE, GAME_STATE_ROUND_END, GAME_STATE_GAME_END
+from card import CARD_DATA
+from yaku_table import mask_where, HIKARI_MASK, TANE_MASK, TAN_MASK, KASU_MASK, lookup_yaku, lookup_score
+from zobrist import (CARD_KEYS, CAPTURE_KEYS, DECK_KEYS, FIELD, HAND, CAPTURED, PENDING, KEY_MASK,
+                     mask_key, deck_key, state_key)
+
+NUM_CARDS = len(CARD_DATA)
+ALL_CARDS = (1 << NUM_CARDS) - 1
+
+CARD_MONTHS = tuple(month for month, _, _, _ in CARD_DATA)
+CARD_NAMES = tuple(name for _, name, _, _ in CARD_DATA)
+CARD_CATEGORIES = tuple(category for _, _, category, _ in CARD_DATA)
+CARD_POINTS = tuple(points for _, _, _, points in CARD_DATA)
+# Cards that only differ by id (e.g. the two kasu of a month) share a kind
+CARD_KINDS = tuple(CARD_DATA.index(data) for data in CARD_DATA)
+# Lower ids of the same kind; a hand card is only offered if none of these are in the hand too
+SAME_KIND_BELOW = tuple(sum(1 << other for other in range(card_id) if CARD_KINDS[other] == CARD_KINDS[card_id])
+                        for card_id in range(NUM_CARDS))
+
+
+# MONTH_MASKS[m] holds the four cards of month m (index 0 is unused)
+MONTH_MASKS = tuple([0] + [mask_where(lambda m, n, c, p, month=month: m == month) for month in range(1, 13)])
+
+CATEGORY_MASKS = {'hikari': HIKARI_MASK, 'tane': TANE_MASK, 'tan': TAN_MASK, 'kasu': KASU_MASK}
+
+RAINMAN_MASK = mask_where(lambda m, n, c, p: n == "Ono no Michikaze")
+INOSHIKACHO_MASK = mask_where(lambda m, n, c, p: n in ("Inoshishi", "Shika", "Chou"))
+AKATAN_MASK = mask_where(lambda m, n, c, p: n == "Akatan" and m in (1, 2, 3))
+AOTAN_MASK = mask_where(lambda m, n, c, p: n == "Aotan" and m in (6, 9, 10))
+SAKAZUKI_MASK = mask_where(lambda m, n, c, p: n == "Sakazuki")
+MAKU_MASK = mask_where(lambda m, n, c, p: n == "Maku")
+TSUKI_MASK = mask_where(lambda m, n, c, p: n == "Tsuki")
+HANAMI_MASK = MAKU_MASK | SAKAZUKI_MASK
+TSUKIMI_MASK = TSUKI_MASK | SAKAZUKI_MASK
+
+
+def cards_to_mask(cards):
+    """Converts a list of Card objects to a bitboard."""
+    mask = 0
+    for card in cards:
+        mask |= 1 << card.card_id
+    return mask
+
+
+def cards_to_ids_mask(card_ids):
+    """Converts an iterable of card ids to a bitboard."""
+    mask = 0
+    for card_id in card_ids:
+        mask |= 1 << card_id
+    return mask
+
+
+def mask_to_ids(mask):
+    """Returns the card ids set in a bitboard, lowest first."""
+    ids = []
+    while mask:
+        low = mask & -mask
+        ids.append(low.bit_length() - 1)
+        mask ^= low
+    return ids
+
+
+def popcount(mask):
+    """Counts the cards in a bitboard."""
+    return mask.bit_count()
+
+
+def capture_targets(field, card_id):
+    """
+    The field cards the player may choose between when card_id is played
+    or drawn: the two matches of its month if they differ, else none.
+    With one match, or three (which are all captured), there is no choice;
+    between two identical cards the lowest id is taken.
+    """
+    matches = field & MONTH_MASKS[CARD_MONTHS[card_id]]
+    if matches.bit_count() != 2:
+        return ()
+    low = matches & -matches
+    first, second = low.bit_length() - 1, (matches ^ low).bit_length() - 1
+    if CARD_KINDS[first] == CARD_KINDS[second]:
+        return ()
+    return (first, second)
+
+
+# A play move is a card id, plus the chosen field card when there is a choice
+def play_move(card_id, target=None):
+    return card_id if target is None else card_id | (target + 1) << 6
+
+
+def move_card(move):
+    return move & 63
+
+
+def move_target(move):
+    """The field card a play move captures, or None when the rules decide."""
+    target = move >> 6
+    return target - 1 if target else None
+
+
+def month_mask_of(card_id):
+    """Returns the mask of all cards sharing the month of card_id."""
+    return MONTH_MASKS[CARD_MONTHS[card_id]]
+
+
+# Yaku scoring on bitboards is table driven, see yaku_table.py
+yaku_from_mask = lookup_yaku
+yaku_score = lookup_score
+
+
+# Round phases of a BitboardState
+PHASE_PLAY = "play"      # Current player must play a card from hand
+PHASE_DRAW = "draw"      # The drawn card matches two different field cards; current player picks one
+PHASE_KOIKOI = "koikoi"  # Current player improved their yaku and must choose
+PHASE_END = "end"        # Round is over
+
+
+class BitboardState:
+    """
+    The state of one round on bitboards, following the same rules as
+    GameController. Seats are 0 for GameController.player and 1 for
+    GameController.cpu. Moves are play_move() values in PHASE_PLAY, field
+    card ids in PHASE_DRAW and True (koikoi) or False (shobu) in
+    PHASE_KOIKOI.
+
+    A card matching one field card captures it and a card matching three
+    captures all of them. With two matches the player picks one (see
+    capture_targets); a play without a target takes the lowest card id.
+
+    Search can either clone() the state per node or walk one state with
+    make(move) and undo(). Every field is an int, a bool, a string or a
+    short list of those, and the deck order is a shared tuple, so a clone
+    costs a handful of small allocations. make() allocates a single tuple
+    of the fields the move can change.
+
+    cards_key is the Zobrist key of the card locations, updated as cards
+    move; zobrist() adds the turn, parent, koikoi flags and phase. Code
+    that edits the card fields directly must call rehash() afterwards.
+    """
+
+    __slots__ = ('hands', 'field', 'captured', 'deck', 'deck_pos', 'current', 'parent',
+                 'koikoied', 'monthly_scores', 'phase', 'winner', 'round_points', 'pending',
+                 'cards_key', 'history')
+
+    def __init__(self, hands, field, captured, deck, deck_pos=0, current=0, parent=0,
+                 koikoied=(False, False), monthly_scores=(0, 0), phase=PHASE_PLAY,
+                 winner=None, round_points=0, pending=None):
+        self.hands = list(hands)
+        self.field = field
+        self.captured = list(captured)
+        self.deck = tuple(deck)  # Card ids in draw order; never mutated, so clones share it
+        self.deck_pos = deck_pos
+        self.current = current
+        self.parent = parent
+        self.koikoied = list(koikoied)
+        self.monthly_scores = list(monthly_scores)
+        self.phase = phase
+        self.winner = winner
+        self.round_points = round_points  # Points awarded to the winner at round end
+        self.pending = pending  # Drawn card waiting for its capture choice in PHASE_DRAW
+        self.history = None  # Undo records pushed by make(), created on first use
+        self.rehash()
+
+    @classmethod
+    def deal(cls, deck, parent=0):
+        """Starts a round from a full deck order, dealing like GameController.start_round."""
+        hands = [0, 0]
+        hands[parent] = cards_to_ids_mask(deck[0:8])
+        hands[1 - parent] = cards_to_ids_mask(deck[8:16])
+        field = cards_to_ids_mask(deck[16:24])
+        return cls(hands, field, (0, 0), deck[24:], current=parent, parent=parent)
+
+    @classmethod
+    def from_controller(cls, game):
+        """Builds a state from a GameController mid-round."""
+        players = [game.player, game.cpu]
+        hands = [cards_to_mask(p.hand) for p in players]
+        pending = None
+        if game.game_state == GAME_STATE_KOIKOI_CHOICE:
+            phase = PHASE_KOIKOI
+        elif game.game_state == GAME_STATE_CAPTURE_CHOICE:
+            card, from_hand = game.pending_capture
+            if from_hand:
+                # A human's hand card waiting for its target counts as not played yet
+                hands[players.index(game.current_player)] |= 1 << card.card_id
+                phase = PHASE_PLAY
+            else:
+                phase = PHASE_DRAW
+                pending = card.card_id
+        elif game.game_state in (GAME_STATE_ROUND_END, GAME_STATE_GAME_END):
+            phase = PHASE_END
+        else:
+            phase = PHASE_PLAY
+        winner = None
+        if game.winner_of_round is not None:
+            winner = players.index(game.winner_of_round)
+        return cls(
+            hands,
+            cards_to_mask(game.field.cards),
+            [cards_to_mask(p.captured_cards) for p in players],
+            [card.card_id for card in game.deck.cards],
+            current=players.index(game.current_player) if game.current_player else 0,
+            parent=players.index(game.parent_player) if game.parent_player else 0,
+            koikoied=[p.has_koikoied for p in players],
+            monthly_scores=[p.monthly_score for p in players],
+            phase=phase,
+            winner=winner,
+            pending=pending,
+        )
+
+    def clone(self):
+        """Returns an independent copy. The deck order is shared."""
+        copy = BitboardState.__new__(BitboardState)
+        copy.hands = self.hands[:]
+        copy.field = self.field
+        copy.captured = self.captured[:]
+        copy.deck = self.deck
+        copy.deck_pos = self.deck_pos
+        copy.current = self.current
+        copy.parent = self.parent
+        copy.koikoied = self.koikoied[:]
+        copy.monthly_scores = self.monthly_scores[:]
+        copy.phase = self.phase
+        copy.winner = self.winner
+        copy.round_points = self.round_points
+        copy.pending = self.pending
+        copy.cards_key = self.cards_key
+        copy.history = None  # A clone starts with nothing to undo
+        return copy
+
+    def pack(self):
+        """Returns the state as a small tuple of ints and bytes, cheap to send to other processes."""
+        return (self.hands[0], self.hands[1], self.field, self.captured[0], self.captured[1],
+                bytes(self.deck[self.deck_pos:]), self.current, self.parent,
+                self.koikoied[0], self.koikoied[1], self.monthly_scores[0], self.monthly_scores[1],
+                self.phase, self.winner, self.round_points, self.pending)
+
+    @classmethod
+    def unpack(cls, data):
+        """Rebuilds a state from pack()."""
+        (hand0, hand1, field, captured0, captured1, deck, current, parent,
+         koikoi0, koikoi1, score0, score1, phase, winner, round_points, pending) = data
+        return cls((hand0, hand1), field, (captured0, captured1), tuple(deck),
+                   current=current, parent=parent, koikoied=(koikoi0, koikoi1),
+                   monthly_scores=(score0, score1), phase=phase, winner=winner,
+                   round_points=round_points, pending=pending)
+
+    def rehash(self):
+        """Recomputes cards_key from the card fields."""
+        key = (mask_key(self.hands[0], HAND[0]) + mask_key(self.hands[1], HAND[1])
+               + mask_key(self.captured[0], CAPTURED[0]) + mask_key(self.captured[1], CAPTURED[1])
+               + mask_key(self.field, FIELD) + deck_key(self.deck[self.deck_pos:]))
+        if self.pending is not None:
+            key += CARD_KEYS[PENDING][self.pending]
+        self.cards_key = key
+
+    def zobrist(self):
+        """64-bit Zobrist key of the position (the same as GameController.position_hash)."""
+        return (self.cards_key + state_key(self.current, self.parent, self.koikoied, self.phase)) & KEY_MASK
+
+    def deck_remaining(self):
+        """Number of cards left to draw."""
+        return len(self.deck) - self.deck_pos
+
+    def is_terminal(self):
+        return self.phase == PHASE_END
+
+    def legal_moves(self):
+        """
+        Returns the moves available to the current player. Of interchangeable
+        hand cards (see symmetry.py) only the lowest id is offered.
+        """
+        if self.phase == PHASE_PLAY:
+            moves = []
+            hand = self.hands[self.current]
+            for card_id in mask_to_ids(hand):
+                if hand & SAME_KIND_BELOW[card_id]:
+                    continue
+                targets = capture_targets(self.field, card_id)
+                if targets:
+                    moves.extend(play_move(card_id, target) for target in targets)
+                else:
+                    moves.append(card_id)
+            return moves
+        if self.phase == PHASE_DRAW:
+            return list(capture_targets(self.field, self.pending))
+        if self.phase == PHASE_KOIKOI:
+            return [True, False]
+        return []
+
+    def apply(self, move):
+        """Applies a move for the current player."""
+        if self.phase == PHASE_PLAY:
+            self.play_card(move_card(move), move_target(move))
+        elif self.phase == PHASE_DRAW:
+            self.choose_draw_target(move)
+        elif self.phase == PHASE_KOIKOI:
+            if move:
+                self.choose_koikoi()
+            else:
+                self.choose_shobu()
+        else:
+            raise ValueError("The round is already over")
+
+    def make(self, move):
+        """
+        Applies a move and records how to take it back with undo(). A move
+        only changes the mover's hand, captured pile and koikoi flag, the
+        field, the deck position, the pending card, the key, the phase, the
+        turn and the monthly scores. The winner and round points are only
+        set when the round ends, so they are unset before any move.
+        """
+        seat = self.current
+        history = self.history
+        if history is None:
+            history = self.history = []
+        history.append((seat, self.phase, self.hands[seat], self.captured[seat], self.koikoied[seat], self.field,
+                        self.deck_pos, self.pending, self.cards_key, self.monthly_scores[0], self.monthly_scores[1]))
+        try:
+            self.apply(move)
+        except ValueError:
+            history.pop()
+            raise
+
+    def undo(self):
+        """Takes back the last move applied with make()."""
+        (seat, self.phase, hand, captured, koikoied, self.field, self.deck_pos, self.pending, self.cards_key,
+         score0, score1) = self.history.pop()
+        self.current = seat
+        self.hands[seat] = hand
+        self.captured[seat] = captured
+        self.koikoied[seat] = koikoied
+        self.monthly_scores[0] = score0
+        self.monthly_scores[1] = score1
+        self.winner = None
+        self.round_points = 0
+
+    def play_card(self, card_id, target=None):
+        """
+        Plays a card from hand capturing target (if there is a choice),
+        draws from the deck and checks for yaku. Stops in PHASE_DRAW when
+        the drawn card needs a capture choice.
+        """
+        seat = self.current
+        bit = 1 << card_id
+        if not self.hands[seat] & bit:
+            raise ValueError(f"Card {card_id} is not in seat {seat}'s hand")
+        self.hands[seat] ^= bit
+        self.cards_key -= CARD_KEYS[HAND[seat]][card_id]
+        self._handle_play(card_id, seat, target)
+
+        if self.deck_pos < len(self.deck):
+            drawn = self.deck[self.deck_pos]
+            self.deck_pos += 1
+            self.cards_key -= DECK_KEYS[len(self.deck) - self.deck_pos][drawn]
+            if capture_targets(self.field, drawn):
+                self.pending = drawn
+                self.cards_key += CARD_KEYS[PENDING][drawn]
+                self.phase = PHASE_DRAW
+                return
+            self._handle_play(drawn, seat)
+
+        self._check_yaku_and_decide(seat)
+
+    def choose_draw_target(self, target):
+        """Captures target with the pending drawn card and checks for yaku."""
+        if target not in capture_targets(self.field, self.pending):
+            raise ValueError(f"Card {target} is not a capture choice for card {self.pending}")
+        self.cards_key -= CARD_KEYS[PENDING][self.pending]
+        self._handle_play(self.pending, self.current, target)
+        self.pending = None
+        self.phase = PHASE_PLAY
+        self._check_yaku_and_decide(self.current)
+
+    def _handle_play(self, card_id, seat, target=None):
+        matches = self.field & MONTH_MASKS[CARD_MONTHS[card_id]]
+        if not matches:
+            self.field |= 1 << card_id
+            self.cards_key += CARD_KEYS[FIELD][card_id]
+            return
+        if matches.bit_count() == 2:
+            if target is not None and matches >> target & 1:
+                matches = 1 << target
+            else:
+                matches &= -matches  # Lowest card id
+        # One or two matches capture one card, three capture all of them
+        self.field ^= matches
+        self.captured[seat] |= matches | (1 << card_id)
+        key = self.cards_key + CARD_KEYS[CAPTURED[seat]][card_id]
+        keys = CAPTURE_KEYS[seat]
+        while matches:
+            low = matches & -matches
+            key += keys[low.bit_length() - 1]
+            matches ^= low
+        self.cards_key = key
+
+    def _check_yaku_and_decide(self, seat):
+        new_score = yaku_score(self.captured[seat])
+        if new_score > self.monthly_scores[seat]:
+            self.monthly_scores[seat] = new_score
+            self.phase = PHASE_KOIKOI
+        else:
+            self.switch_turns()
+
+    def choose_koikoi(self):
+        self.koikoied[self.current] = True
+        self.phase = PHASE_PLAY
+        self.switch_turns()
+
+    def choose_shobu(self):
+        self.winner = self.current
+        self._calculate_final_score()
+        self.phase = PHASE_END
+
+    def _calculate_final_score(self):
+        score = self.monthly_scores[self.winner]
+        if self.koikoied[1 - self.winner]:
+            score *= 2
+        if self.monthly_scores[self.winner] >= 7:
+            score *= 2
+        self.round_points = score
+
+    def switch_turns(self):
+        """Passes the turn, ending the round by kasu count when cards run out."""
+        if (not self.hands[0] and not self.hands[1]) or self.deck_pos >= len(self.deck):
+            if self.winner is None:
+                kasu = [(self.captured[0] & KASU_MASK).bit_count(), (self.captured[1] & KASU_MASK).bit_count()]
+                if kasu[0] != kasu[1]:
+                    self.winner = 0 if kasu[0] > kasu[1] else 1
+                    self.monthly_scores[self.winner] = 1
+                else:
+                    self.winner = self.parent
+                    self.monthly_scores[self.parent] = 6
+                self._calculate_final_score()
+            self.phase = PHASE_END
+            return
+        self.current = 1 - self.current
+        self.phase = PHASE_PLAY
+
+    def score_for(self, seat):
+        """Round result from a seat's point of view: + if it won, - if it lost."""
+        if self.winner is None:
+            return 0
+        return self.round_points if self.winner == seat else -self.round_points
+
+
+def best_target(targets):
+    """The most valuable capture choice; ties go to the lowest card id."""
+    return max(targets, key=lambda card_id: (CARD_POINTS[card_id], -card_id))
+
+
+def greedy_move(state):
+    """
+    The card choice of Player.choose_card_to_play on a BitboardState: take
+    the most valuable field card we can match, else dump the cheapest card.
+    Koikoi once, then shobu. That koikoi rule is a cheap rollout proxy and
+    intentionally differs from the CPU in the game, which asks
+    yaku_odds.koikoi_advice.
+    """
+    seat = state.current
+    if state.phase == PHASE_KOIKOI:
+        return not state.koikoied[seat]
+    if state.phase == PHASE_DRAW:
+        return best_target(capture_targets(state.field, state.pending))
+    hand = state.hands[seat]
+    best_card, best_points = None, -1
+    for card_id in mask_to_ids(hand):
+        matches = state.field & MONTH_MASKS[CARD_MONTHS[card_id]]
+        for field_id in mask_to_ids(matches):
+            if CARD_POINTS[field_id] > best_points:
+                best_card, best_points = card_id, CARD_POINTS[field_id]
+    if best_card is not None:
+        targets = capture_targets(state.field, best_card)
+        return play_move(best_card, best_target(targets) if targets else None)
+    return min(mask_to_ids(hand), key=lambda card_id: CARD_POINTS[card_id])
@@ -1,65 +1,82 @@
 # card.py
 # Represents a single Hanafuda card
 
-import pygame
-from constants import CARD_WIDTH, CARD_HEIGHT, BLACK, WHITE
+# Complete Hanafuda card data
+# Structure: (month, name, category, points)
+CARD_DATA = [
+    # January (Matsu - Pine)
+    (1, "Tsuru", "hikari", 20),
+    (1, "Akatan", "tan", 5),
+    (1, "Kasu", "kasu", 1),
+    (1, "Kasu", "kasu", 1),
+    # February (Ume - Plum Blossom)
+    (2, "Uguisu", "tane", 10),
+    (2, "Akatan", "tan", 5),
+    (2, "Kasu", "kasu", 1),
+    (2, "Kasu", "kasu", 1),
+    # March (Sakura - Cherry Blossom)
+    (3, "Maku", "hikari", 20),
+    (3, "Akatan", "tan", 5),
+    (3, "Kasu", "kasu", 1),
+    (3, "Kasu", "kasu", 1),
+    # April (Fuji - Wisteria)
+    (4, "Hototogisu", "tane", 10),
+    (4, "Tan", "tan", 5),
+    (4, "Kasu", "kasu", 1),
+    (4, "Kasu", "kasu", 1),
+    # May (Ayame - Iris)
+    (5, "Yatsuhashi", "tane", 10),
+    (5, "Tan", "tan", 5),
+    (5, "Kasu", "kasu", 1),
+    (5, "Kasu", "kasu", 1),
+    # June (Botan - Peony)
+    (6, "Chou", "tane", 10),
+    (6, "Aotan", "tan", 5),
+    (6, "Kasu", "kasu", 1),
+    (6, "Kasu", "kasu", 1),
+    # July (Hagi - Bush Clover)
+    (7, "Inoshishi", "tane", 10),
+    (7, "Tan", "tan", 5),
+    (7, "Kasu", "kasu", 1),
+    (7, "Kasu", "kasu", 1),
+    # August (Susuki - Pampas Grass)
+    (8, "Tsuki", "hikari", 20),
+    (8, "Gan", "tane", 10),
+    (8, "Kasu", "kasu", 1),
+    (8, "Kasu", "kasu", 1),
+    # September (Kiku - Chrysanthemum)
+    (9, "Sakazuki", "tane", 10), # Special card, can be 10 or 1 pt
+    (9, "Aotan", "tan", 5),
+    (9, "Kasu", "kasu", 1),
+    (9, "Kasu", "kasu", 1),
+    # October (Momiji - Maple)
+    (10, "Shika", "tane", 10),
+    (10, "Aotan", "tan", 5),
+    (10, "Kasu", "kasu", 1),
+    (10, "Kasu", "kasu", 1),
+    # November (Yanagi - Willow)
+    (11, "Ono no Michikaze", "hikari", 20),
+    (11, "Tsubame", "tane", 10),
+    (11, "Tan", "tan", 5),
+    (11, "Kasu", "kasu", 1),
+    # December (Kiri - Paulownia)
+    (12, "Ho-oh", "hikari", 20),
+    (12, "Kasu", "kasu", 1),
+    (12, "Kasu", "kasu", 1),
+    (12, "Kasu", "kasu", 1),
+]
 
-# Define some colors for different card types for placeholder graphics
-CATEGORY_COLORS = {
-    'hikari': (255, 255, 0),   # Gold
-    'tane': (255, 0, 0),       # Red
-    'tan': (0, 0, 255),         # Blue
-    'kasu': (128, 128, 128),  # Grey
-}
 
 class Card:
-    def __init__(self, month, category, name, points=0):
+    """Plain data for one card. Rendering lives in card_sprites.py."""
+
+    def __init__(self, month, category, name, points=0, card_id=None):
         self.month = month
         self.category = category
         self.name = name
         self.points = points
-        self.image = self._create_placeholder_image()
-        self.rect = self.image.get_rect()
+        self.card_id = card_id  # Index into CARD_DATA
         self.is_face_up = True
 
-    def _create_placeholder_image(self):
-        """Creates a placeholder image for the card."""
-        image = pygame.Surface((CARD_WIDTH, CARD_HEIGHT))
-
-        # Get color based on category, default to white
-        color = CATEGORY_COLORS.get(self.category, WHITE)
-        image.fill(color)
-
-        # Draw a border
-        pygame.draw.rect(image, BLACK, image.get_rect(), 2)
-
-        # Add text with better formatting
-        font = pygame.font.Font(None, 16)
-        small_font = pygame.font.Font(None, 14)
-        
-        month_text = font.render(f"{self.month}月", True, BLACK)
-        cat_text = font.render(self.category.capitalize(), True, BLACK)
-        
-        # Truncate long names
-        display_name = self.name
-        if len(display_name) > 8:
-            display_name = display_name[:8] + "..."
-        name_text = small_font.render(display_name, True, BLACK)
-        
-        # Points display
-        if self.points > 1:
-            points_text = small_font.render(f"{self.points}pt", True, BLACK)
-            image.blit(points_text, (5, CARD_HEIGHT - 20))
-
-        image.blit(month_text, (5, 5))
-        image.blit(cat_text, (5, 25))
-        image.blit(name_text, (5, 45))
-
-        return image
-
-    def draw(self, surface):
-        """Draws the card on the given surface."""
-        surface.blit(self.image, self.rect)
-
     def __repr__(self):
         return f"Card({self.month}, '{self.name}', '{self.category}')"
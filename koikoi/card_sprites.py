@@ -0,0 +1,90 @@
+# card_sprites.py
+# Creates the placeholder graphics for cards. Only the UI imports this module,
+# so the game rules can run without pygame.
+#
+# Sprites are cached for the whole process, keyed by what a card looks like
+# (month, category, name, points) rather than by Card instance. The Deck is
+# rebuilt every round, but its 48 cards reuse the same 36 surfaces: cards
+# that only differ by id, like the kasu of one month, share one.
+
+import pygame
+from constants import CARD_WIDTH, CARD_HEIGHT, BLACK, WHITE
+from card import CARD_DATA
+
+# Define some colors for different card types for placeholder graphics
+CATEGORY_COLORS = {
+    'hikari': (255, 255, 0),   # Gold
+    'tane': (255, 0, 0),       # Red
+    'tan': (0, 0, 255),         # Blue
+    'kasu': (128, 128, 128),  # Grey
+}
+
+_sprites = {}  # (month, category, name, points) -> Surface
+_fonts = None  # (font, small_font), loaded on first use
+
+
+def sprite_key(card):
+    """The identity a card's sprite depends on."""
+    return (card.month, card.category, card.name, card.points)
+
+
+def _get_fonts():
+    global _fonts
+    if _fonts is None:
+        _fonts = (pygame.font.Font(None, 16), pygame.font.Font(None, 14))
+    return _fonts
+
+
+def _render(month, category, name, points):
+    """Draws one placeholder card."""
+    image = pygame.Surface((CARD_WIDTH, CARD_HEIGHT))
+
+    # Get color based on category, default to white
+    color = CATEGORY_COLORS.get(category, WHITE)
+    image.fill(color)
+
+    # Draw a border
+    pygame.draw.rect(image, BLACK, image.get_rect(), 2)
+
+    # Add text with better formatting
+    font, small_font = _get_fonts()
+
+    month_text = font.render(f"{month}月", True, BLACK)
+    cat_text = font.render(category.capitalize(), True, BLACK)
+
+    # Truncate long names
+    display_name = name
+    if len(display_name) > 8:
+        display_name = display_name[:8] + "..."
+    name_text = small_font.render(display_name, True, BLACK)
+
+    # Points display
+    if points > 1:
+        points_text = small_font.render(f"{points}pt", True, BLACK)
+        image.blit(points_text, (5, CARD_HEIGHT - 20))
+
+    image.blit(month_text, (5, 5))
+    image.blit(cat_text, (5, 25))
+    image.blit(name_text, (5, 45))
+
+    # Match the display's pixel format so blits need no conversion
+    if pygame.display.get_surface() is not None:
+        image = image.convert()
+    return image
+
+
+def create_card_image(card):
+    """Returns the shared placeholder image for the card, drawing it on first use."""
+    key = sprite_key(card)
+    image = _sprites.get(key)
+    if image is None:
+        image = _sprites[key] = _render(*key)
+    return image
+
+
+def preload_card_images():
+    """Draws all 36 distinct sprites up front so no frame has to."""
+    for month, name, category, points in CARD_DATA:
+        key = (month, category, name, points)
+        if key not in _sprites:
+            _sprites[key] = _render(*key)
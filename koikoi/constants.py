@@ -8,6 +8,9 @@ SCREEN_HEIGHT = 768
 # Frames per second
 FPS = 60
 
+# Seconds the CPU waits before playing, so its moves can be followed
+CPU_TURN_DELAY = 1.0
+
 # Colors
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
@@ -23,5 +26,6 @@ GAME_STATE_START = "start"
 GAME_STATE_PLAYER_TURN = "player_turn"
 GAME_STATE_CPU_TURN = "cpu_turn"
 GAME_STATE_KOIKOI_CHOICE = "koikoi_choice" # Player has a yaku and must choose
+GAME_STATE_CAPTURE_CHOICE = "capture_choice" # A card matches two field cards; its player picks one
 GAME_STATE_ROUND_END = "round_end"
 GAME_STATE_GAME_END = "game_end"
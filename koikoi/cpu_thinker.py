@@ -0,0 +1,59 @@
+# cpu_thinker.py
+# Runs CPU decisions on a background thread so the window stays responsive.
+#
+# The controller hands over a snapshot of the game (a BitboardState) and
+# polls the returned future every frame. Searches receive a threading.Event;
+# setting it makes them stop early and return their best move so far.
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class CpuThinker:
+    """One background thread that runs one decision at a time."""
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cpu-thinker")
+        self.future = None
+        self.stop_event = None
+
+    def submit(self, decide, state):
+        """
+        Starts decide(state, stop_event) in the background, cancelling any
+        decision still in progress. Returns the future.
+        """
+        self.cancel()
+        self.stop_event = threading.Event()
+        self.future = self.executor.submit(decide, state, self.stop_event)
+        return self.future
+
+    def busy(self):
+        """True while a submitted decision has not been collected."""
+        return self.future is not None
+
+    def poll(self):
+        """
+        Returns (True, move) once the decision is done and forgets it,
+        otherwise (False, None). Errors raised by the search are re-raised.
+        """
+        if self.future is None or not self.future.done():
+            return False, None
+        future, self.future = self.future, None
+        return True, future.result()
+
+    def hurry(self):
+        """Asks the running search to return its best move so far."""
+        if self.stop_event is not None:
+            self.stop_event.set()
+
+    def cancel(self):
+        """Stops the running search and discards its result."""
+        self.hurry()
+        if self.future is not None:
+            self.future.cancel()
+            self.future = None
+
+    def close(self):
+        """Cancels any decision and waits for the thread to finish."""
+        self.cancel()
+        self.executor.shutdown(wait=True)
@@ -2,102 +2,60 @@
 # Manages the deck of Hanafuda cards
 
 import random
-from card import Card
-
-# Complete Hanafuda card data
-# Structure: (month, name, category, points)
-CARD_DATA = [
-    # January (Matsu - Pine)
-    (1, "Tsuru", "hikari", 20),
-    (1, "Akatan", "tan", 5),
-    (1, "Kasu", "kasu", 1),
-    (1, "Kasu", "kasu", 1),
-    # February (Ume - Plum Blossom)
-    (2, "Uguisu", "tane", 10),
-    (2, "Akatan", "tan", 5),
-    (2, "Kasu", "kasu", 1),
-    (2, "Kasu", "kasu", 1),
-    # March (Sakura - Cherry Blossom)
-    (3, "Maku", "hikari", 20),
-    (3, "Akatan", "tan", 5),
-    (3, "Kasu", "kasu", 1),
-    (3, "Kasu", "kasu", 1),
-    # April (Fuji - Wisteria)
-    (4, "Hototogisu", "tane", 10),
-    (4, "Tan", "tan", 5),
-    (4, "Kasu", "kasu", 1),
-    (4, "Kasu", "kasu", 1),
-    # May (Ayame - Iris)
-    (5, "Yatsuhashi", "tane", 10),
-    (5, "Tan", "tan", 5),
-    (5, "Kasu", "kasu", 1),
-    (5, "Kasu", "kasu", 1),
-    # June (Botan - Peony)
-    (6, "Chou", "tane", 10),
-    (6, "Aotan", "tan", 5),
-    (6, "Kasu", "kasu", 1),
-    (6, "Kasu", "kasu", 1),
-    # July (Hagi - Bush Clover)
-    (7, "Inoshishi", "tane", 10),
-    (7, "Tan", "tan", 5),
-    (7, "Kasu", "kasu", 1),
-    (7, "Kasu", "kasu", 1),
-    # August (Susuki - Pampas Grass)
-    (8, "Tsuki", "hikari", 20),
-    (8, "Gan", "tane", 10),
-    (8, "Kasu", "kasu", 1),
-    (8, "Kasu", "kasu", 1),
-    # September (Kiku - Chrysanthemum)
-    (9, "Sakazuki", "tane", 10), # Special card, can be 10 or 1 pt
-    (9, "Aotan", "tan", 5),
-    (9, "Kasu", "kasu", 1),
-    (9, "Kasu", "kasu", 1),
-    # October (Momiji - Maple)
-    (10, "Shika", "tane", 10),
-    (10, "Aotan", "tan", 5),
-    (10, "Kasu", "kasu", 1),
-    (10, "Kasu", "kasu", 1),
-    # November (Yanagi - Willow)
-    (11, "Ono no Michikaze", "hikari", 20),
-    (11, "Tsubame", "tane", 10),
-    (11, "Tan", "tan", 5),
-    (11, "Kasu", "kasu", 1),
-    # December (Kiri - Paulownia)
-    (12, "Ho-oh", "hikari", 20),
-    (12, "Kasu", "kasu", 1),
-    (12, "Kasu", "kasu", 1),
-    (12, "Kasu", "kasu", 1),
-]
+import zobrist
+from card import Card, CARD_DATA
 
 
 class Deck:
-    def __init__(self):
+    def __init__(self, rng=None):
+        # rng is a random.Random for reproducible deals; default is the global generator
+        self.rng = rng if rng is not None else random
         self.cards = []
+        self.zobrist = 0  # Zobrist key of the cards in draw order, see zobrist.py
         self.create_deck()
         self.shuffle()
 
+    @classmethod
+    def from_order(cls, card_ids, rng=None):
+        """
+        Creates a deck holding the given cards in order, top first: a
+        recorded deal, or the rest of a deck restored from a checkpoint.
+        """
+        if len(set(card_ids)) != len(card_ids) or not all(0 <= card_id < len(CARD_DATA) for card_id in card_ids):
+            raise ValueError("A deck order must list distinct card ids")
+        deck = cls.__new__(cls)
+        deck.rng = rng if rng is not None else random
+        deck.create_deck()
+        deck.cards = [deck.cards[card_id] for card_id in card_ids]
+        deck.zobrist = zobrist.deck_key(list(card_ids))
+        return deck
+
     def create_deck(self):
         """Creates a full 48-card deck from the CARD_DATA."""
         self.cards = []
-        for month, name, category, points in CARD_DATA:
-            card = Card(month, category, name, points)
+        for card_id, (month, name, category, points) in enumerate(CARD_DATA):
+            card = Card(month, category, name, points, card_id)
             self.cards.append(card)
-
+        self.zobrist = zobrist.deck_key([card.card_id for card in self.cards])
 
     def shuffle(self):
         """Shuffles the deck."""
-        random.shuffle(self.cards)
+        self.rng.shuffle(self.cards)
+        self.zobrist = zobrist.deck_key([card.card_id for card in self.cards])
 
     def deal(self, num_cards):
         """Deals a specified number of cards from the deck."""
         if len(self.cards) < num_cards:
             # This should not happen in a normal game, but good to have a check
-            dealt_cards = self.cards[:]
-            self.cards = []
-            return dealt_cards
+            num_cards = len(self.cards)
 
         dealt_cards = self.cards[:num_cards]
         self.cards = self.cards[num_cards:]
+        # Deck slots count from the bottom, so only the dealt cards' keys change
+        slot = len(self.cards) + num_cards
+        for card in dealt_cards:
+            slot -= 1
+            self.zobrist -= zobrist.DECK_KEYS[slot][card.card_id]
         return dealt_cards
 
     def is_empty(self):
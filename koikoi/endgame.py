@@ -0,0 +1,278 @@
+# endgame.py
+# Exact endgame solver for the last few turns of a round.
+#
+# Near the end of a round only a few cards are left in the hands, so each
+# determinization (one guess of the opponent's hand and of the cards still to
+# be drawn) can be solved exactly with alpha-beta minimax. The solver enumerates
+# every determinization when there are few enough, otherwise samples them until
+# the time limit, and picks the move with the best average exact value.
+# Determinizations and positions that only differ by interchangeable cards
+# (see symmetry.py) are solved and stored once.
+
+import itertools
+import math
+import random
+import time
+from bitboard import (PHASE_PLAY, PHASE_DRAW, PHASE_KOIKOI, PHASE_END, MONTH_MASKS, CARD_MONTHS, CARD_KINDS,
+                      CARD_POINTS, mask_to_ids, move_card, move_target)
+from symmetry import kinds, canonical_move, concrete_move
+from zobrist import KEY_MASK, OBSERVER_KEY
+
+# Transposition table entry flags
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+
+class _Timeout(Exception):
+    pass
+
+
+class TranspositionTable:
+    """
+    Fixed-size hash table for search results, keyed by Zobrist keys
+    (BitboardState.zobrist, plus OBSERVER_KEY for values seen from seat 1,
+    so one table can serve both seats and outlive a search). Each key maps to one slot; a new entry replaces
+    the old one if it comes from a newer search or covers at least as many
+    remaining plies, so memory use stays bounded.
+    """
+
+    def __init__(self, size=1 << 16):
+        self.size = size
+        self.slots = [None] * size
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.overwrites = 0  # Stores that evicted a different position
+        self.collisions = 0  # Lookups that found a different position in the slot
+
+    def new_search(self):
+        """Marks existing entries as older than anything stored from now on."""
+        self.generation += 1
+
+    def get(self, key):
+        """Returns (depth, value, flag, move) for key, or None."""
+        entry = self.slots[key % self.size]
+        if entry is not None:
+            if entry[0] == key:
+                self.hits += 1
+                return entry[2:]
+            self.collisions += 1
+        self.misses += 1
+        return None
+
+    def put(self, key, depth, value, flag, move):
+        index = key % self.size
+        entry = self.slots[index]
+        if entry is not None:
+            if entry[1] == self.generation and entry[2] > depth:
+                return
+            if entry[0] != key:
+                self.overwrites += 1
+        self.slots[index] = (key, self.generation, depth, value, flag, move)
+        self.stores += 1
+
+    def stats(self):
+        """Counters for tuning the table size."""
+        used = sum(1 for entry in self.slots if entry is not None)
+        return {'size': self.size, 'used': used, 'hits': self.hits, 'misses': self.misses,
+                'stores': self.stores, 'overwrites': self.overwrites, 'collisions': self.collisions}
+
+
+class EndgameSolver:
+    """
+    Takes over once the current player holds at most max_hand_size cards.
+    The clock is checked at every search node, so solve() stops within a
+    node of time_limit seconds (plus any garbage collection pause). It
+    returns None if not even one determinization could be solved in time.
+    max_determinizations caps the work instead of (or as well as) the
+    clock, which makes results reproducible; at least one must be given.
+    """
+
+    def __init__(self, max_hand_size=3, time_limit=0.5, enumeration_limit=5000,
+                 table_size=1 << 16, rng=None, max_determinizations=None):
+        if time_limit is None and max_determinizations is None:
+            raise ValueError("EndgameSolver needs a time_limit or max_determinizations")
+        self.max_hand_size = max_hand_size
+        self.time_limit = time_limit
+        self.max_determinizations = max_determinizations
+        self.enumeration_limit = enumeration_limit
+        self.table = TranspositionTable(table_size)
+        self.rng = rng or random.Random()
+        self.last_solved = 0  # Determinizations solved by the last call
+        self.last_exhaustive = False  # Whether the last call covered every determinization
+        self.stop_event = None  # Event that ends the current solve early
+
+    def applies(self, state):
+        """Checks if the state is small enough for the solver."""
+        return state.phase != PHASE_END and state.hands[state.current].bit_count() <= self.max_hand_size
+
+    def solve(self, state, stop_event=None, deadline=None):
+        """
+        Returns the best move for the current player, or None if out of time.
+        Setting stop_event (a threading.Event) ends the search like the clock
+        does; deadline (a time.perf_counter() value) cuts time_limit short.
+        The move is best over every determinization only if last_exhaustive
+        is set afterwards; otherwise it is best over the sampled ones.
+        """
+        moves = self._ordered_moves(state)
+        if len(moves) == 1:
+            return moves[0]
+
+        observer = state.current
+        if self.time_limit is not None:
+            deadline = min(math.inf if deadline is None else deadline, time.perf_counter() + self.time_limit)
+        elif deadline is None:
+            deadline = math.inf
+        self.stop_event = stop_event
+        self.table.new_search()
+        totals = dict.fromkeys(moves, 0)
+        self.last_solved = 0
+        self.last_exhaustive = False
+        try:
+            for sample, weight in self._determinizations(state, observer):
+                values = {}
+                for move in moves:
+                    sample.make(move)
+                    values[move] = self._alphabeta(sample, observer, -math.inf, math.inf, deadline)
+                    sample.undo()
+                for move, value in values.items():
+                    totals[move] += value * weight
+                self.last_solved += 1
+                if self.last_solved == self.max_determinizations:
+                    break
+            else:
+                self.last_exhaustive = True
+        except _Timeout:
+            pass
+
+        if not self.last_solved:
+            return None
+        return max(moves, key=lambda move: totals[move])
+
+    def _determinizations(self, state, observer):
+        """
+        Yields (copy of state with the opponent's hand and the next draws
+        filled in, weight). Only the order of the cards drawn this round is
+        varied. Enumerated deals that only differ by interchangeable cards
+        are yielded once, weighted by how many there are.
+        """
+        opponent = 1 - observer
+        unseen = mask_to_ids(state.hands[opponent]) + list(state.deck[state.deck_pos:])
+        hand_size = state.hands[opponent].bit_count()
+        draws = min(state.hands[0].bit_count() + state.hands[1].bit_count(), len(unseen) - hand_size)
+
+        count = math.comb(len(unseen), hand_size) * math.perm(len(unseen) - hand_size, draws)
+        if count <= self.enumeration_limit:
+            deals = {}  # Class of the deal -> [hand, drawn, rest, weight]
+            for hand in itertools.combinations(unseen, hand_size):
+                rest = [card_id for card_id in unseen if card_id not in hand]
+                hand_kinds = kinds(hand)
+                for drawn in itertools.permutations(rest, draws):
+                    key = (hand_kinds, tuple(CARD_KINDS[card_id] for card_id in drawn))
+                    entry = deals.get(key)
+                    if entry is None:
+                        deals[key] = [hand, drawn, rest, 1]
+                    else:
+                        entry[3] += 1
+            for hand, drawn, rest, weight in deals.values():
+                yield self._deal(state, opponent, hand, drawn, rest), weight
+        else:
+            while True:
+                self.rng.shuffle(unseen)
+                hand = unseen[:hand_size]
+                yield self._deal(state, opponent, hand, unseen[hand_size:hand_size + draws], unseen[hand_size:]), 1
+
+    @staticmethod
+    def _deal(state, opponent, hand, drawn, rest):
+        sample = state.clone()
+        mask = 0
+        for card_id in hand:
+            mask |= 1 << card_id
+        sample.hands[opponent] = mask
+        # Undrawn cards still count towards the deck size, which decides when the round ends.
+        # They are sorted so determinizations that only differ there share table entries.
+        sample.deck = tuple(drawn) + tuple(sorted(card_id for card_id in rest if card_id not in drawn))
+        sample.deck_pos = 0
+        sample.rehash()
+        return sample
+
+    def _alphabeta(self, state, observer, alpha, beta, deadline):
+        if state.phase == PHASE_END:
+            return state.score_for(observer)
+        if time.perf_counter() > deadline or (self.stop_event is not None and self.stop_event.is_set()):
+            raise _Timeout()
+
+        plies = state.hands[0].bit_count() + state.hands[1].bit_count()
+        # monthly_scores follow from the captured piles until the round ends, so the key leaves them out.
+        # Values are score_for(observer), so the observer is part of the key.
+        key = (state.zobrist() + OBSERVER_KEY * observer) & KEY_MASK
+        entry = self.table.get(key)
+        tt_move = None
+        if entry is not None:
+            _, value, flag, tt_move = entry
+            # The entry may come from a position with interchangeable cards swapped
+            tt_move = concrete_move(state, tt_move) if tt_move is not None else None
+            if flag == EXACT:
+                return value
+            if flag == LOWER_BOUND:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
+
+        original_alpha, original_beta = alpha, beta
+        maximizing = state.current == observer
+        moves = self._ordered_moves(state)
+        if tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+
+        best_move = None
+        best = -math.inf if maximizing else math.inf
+        for move in moves:
+            state.make(move)
+            value = self._alphabeta(state, observer, alpha, beta, deadline)
+            state.undo()
+            if maximizing:
+                if value > best:
+                    best, best_move = value, move
+                alpha = max(alpha, best)
+            else:
+                if value < best:
+                    best, best_move = value, move
+                beta = min(beta, best)
+            if alpha >= beta:
+                break
+
+        if best <= original_alpha:
+            flag = UPPER_BOUND
+        elif best >= original_beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.table.put(key, plies, best, flag, canonical_move(state, best_move) if best_move is not None else None)
+        return best
+
+    @staticmethod
+    def _ordered_moves(state):
+        """Legal moves, most promising first: plays that capture valuable field cards, then shobu."""
+        if state.phase == PHASE_KOIKOI:
+            return [False, True]
+        if state.phase == PHASE_DRAW:
+            return sorted(state.legal_moves(), key=lambda card_id: CARD_POINTS[card_id], reverse=True)
+        if state.phase != PHASE_PLAY:
+            return []
+
+        def capture_value(move):
+            card_id, target = move_card(move), move_target(move)
+            if target is not None:
+                return 100 + CARD_POINTS[target] + CARD_POINTS[card_id]
+            matches = state.field & MONTH_MASKS[CARD_MONTHS[card_id]]
+            if not matches:
+                return -CARD_POINTS[card_id]  # Prefer dumping cheap cards
+            return 100 + sum(CARD_POINTS[match] for match in mask_to_ids(matches)) + CARD_POINTS[card_id]
+
+        return sorted(state.legal_moves(), key=capture_value, reverse=True)
@@ -0,0 +1,167 @@
+# evaluation.py
+# Batched feature encoding and linear scoring of positions.
+#
+# A position seen by one seat becomes a row of NUM_FEATURES floats: one 0/1
+# plane of 48 cards per features.py location and a few counters.
+# FeatureEncoder fills a preallocated matrix for a whole batch of positions
+# with a few array operations, and LinearEvaluator scores every candidate
+# move of a position with one matrix product.
+
+import numpy as np
+from bitboard import (CARD_MONTHS, CARD_POINTS, MONTH_MASKS, PHASE_PLAY, PHASE_DRAW,
+                      capture_targets, greedy_move, move_card, move_target, play_move)
+from features import NUM_CARDS, NUM_LOCATIONS, LOC_HAND, LOC_FIELD, LOC_CAPTURED, LOC_OPPONENT_CAPTURED
+
+# Feature layout: planes for LOC_HAND .. LOC_PENDING, then the counters
+NUM_PLANES = NUM_LOCATIONS - 1
+SCALARS = ('deck', 'opponent_hand', 'koikoi', 'opponent_koikoi', 'parent', 'bias')
+NUM_FEATURES = NUM_PLANES * NUM_CARDS + len(SCALARS)
+# Counters are scaled to about [0, 1]
+SCALAR_SCALE = np.array([1 / 24, 1 / 8, 1, 1, 1, 1], np.float32)
+_SHIFTS = np.arange(NUM_CARDS, dtype=np.uint64)
+
+
+def position_row(state, seat):
+    """
+    The (masks, counters) of a BitboardState seen by seat: bitmasks of
+    each plane and the unscaled SCALARS.
+    """
+    pending = 0 if state.pending is None else 1 << state.pending
+    return ((state.hands[seat], state.field, state.captured[seat], state.captured[1 - seat], pending),
+            (state.deck_remaining(), state.hands[1 - seat].bit_count(),
+             state.koikoied[seat], state.koikoied[1 - seat], state.parent == seat, 1))
+
+
+def capture_row(state, seat, card_id, target=None):
+    """
+    position_row after seat's card_id (from the hand or the pending drawn
+    card) lands on the field, capturing target if it has a choice. The
+    draw that follows a hand play is unknown, so it is left out.
+    """
+    hand = state.hands[seat] & ~(1 << card_id)
+    field = state.field
+    captured = state.captured[seat]
+    matches = field & MONTH_MASKS[CARD_MONTHS[card_id]]
+    if not matches:
+        field |= 1 << card_id
+    else:
+        if matches.bit_count() == 2:
+            matches = 1 << target if target is not None and matches >> target & 1 else matches & -matches
+        field ^= matches
+        captured |= matches | 1 << card_id
+    return ((hand, field, captured, state.captured[1 - seat], 0),
+            (state.deck_remaining(), state.hands[1 - seat].bit_count(),
+             state.koikoied[seat], state.koikoied[1 - seat], state.parent == seat, 1))
+
+
+class FeatureEncoder:
+    """
+    Turns batches of positions into one float32 feature matrix. The mask,
+    bit and feature buffers are allocated once and reused, growing only
+    when a batch is larger than any before it; the matrix returned by
+    encode() is a view that the next call overwrites.
+    """
+
+    def __init__(self, capacity=64):
+        self.capacity = 0
+        self._reserve(capacity)
+
+    def _reserve(self, rows):
+        if rows <= self.capacity:
+            return
+        self.capacity = max(rows, 2 * self.capacity)
+        self.masks = np.zeros((self.capacity, NUM_PLANES), np.uint64)
+        self.bits = np.zeros((self.capacity, NUM_PLANES, NUM_CARDS), np.uint64)
+        self.scalars = np.zeros((self.capacity, len(SCALARS)), np.float32)
+        self.matrix = np.zeros((self.capacity, NUM_FEATURES), np.float32)
+
+    def encode(self, rows):
+        """Encodes (masks, counters) rows, e.g. from position_row, as matrix rows."""
+        n = len(rows)
+        self._reserve(n)
+        masks, bits, scalars, matrix = self.masks[:n], self.bits[:n], self.scalars[:n], self.matrix[:n]
+        masks[:] = [row[0] for row in rows]
+        scalars[:] = [row[1] for row in rows]
+        np.right_shift(masks[:, :, None], _SHIFTS, out=bits)
+        np.bitwise_and(bits, 1, out=bits)
+        np.copyto(matrix[:, :NUM_PLANES * NUM_CARDS].reshape(n, NUM_PLANES, NUM_CARDS), bits, casting='unsafe')
+        np.multiply(scalars, SCALAR_SCALE, out=matrix[:, NUM_PLANES * NUM_CARDS:])
+        return matrix
+
+    def encode_states(self, states, seats=None):
+        """Encodes BitboardStates, each seen by its seat (default: the player to move)."""
+        if seats is None:
+            seats = [state.current for state in states]
+        return self.encode([position_row(state, seat) for state, seat in zip(states, seats)])
+
+
+def encode_columns(columns, start=0, stop=None):
+    """Feature matrix (newly allocated) of dataset rows start:stop, see selfplay.load_dataset."""
+    cards = columns['cards'][start:stop]
+    n = len(cards)
+    matrix = np.empty((n, NUM_FEATURES), np.float32)
+    planes = matrix[:, :NUM_PLANES * NUM_CARDS].reshape(n, NUM_PLANES, NUM_CARDS)
+    np.equal(cards[:, None, :], np.arange(1, NUM_LOCATIONS, dtype=np.uint8)[:, None], out=planes, casting='unsafe')
+    koikoi = columns['koikoi'][start:stop]
+    scalars = np.stack([columns['deck'][start:stop], columns['opponent_hand'][start:stop],
+                        koikoi[:, 0], koikoi[:, 1], columns['parent'][start:stop], np.ones(n)], axis=1)
+    np.multiply(scalars, SCALAR_SCALE, out=matrix[:, NUM_PLANES * NUM_CARDS:], casting='unsafe')
+    return matrix
+
+
+def default_weights():
+    """
+    Hand-set weights close to the greedy heuristic: captured cards count
+    their points for and against, valuable cards are better kept in hand
+    than left on the field. Kasu count as one point.
+    """
+    points = np.array([max(points, 1) for points in CARD_POINTS], np.float32)
+    weights = np.zeros(NUM_FEATURES, np.float32)
+    for location, scale in ((LOC_HAND, 0.5), (LOC_FIELD, -0.5), (LOC_CAPTURED, 1.0),
+                            (LOC_OPPONENT_CAPTURED, -1.0)):
+        start = (location - 1) * NUM_CARDS
+        weights[start:start + NUM_CARDS] = scale * points
+    return weights
+
+
+class LinearEvaluator:
+    """
+    Scores positions as features @ weights, from the view of the seat they
+    are encoded for. The choose_* methods score every candidate move of a
+    BitboardState in one batch; rollout_policy plugs into ISMCTS.
+    """
+
+    def __init__(self, weights=None, encoder=None):
+        self.weights = default_weights() if weights is None else np.asarray(weights, np.float32)
+        if self.weights.shape != (NUM_FEATURES,):
+            raise ValueError(f"Expected {NUM_FEATURES} weights, got {self.weights.shape}")
+        self.encoder = encoder or FeatureEncoder()
+
+    def score(self, rows):
+        """Scores of (masks, counters) rows, in one matrix product."""
+        return self.encoder.encode(rows) @ self.weights
+
+    def score_states(self, states, seats=None):
+        return self.encoder.encode_states(states, seats) @ self.weights
+
+    def choose_play(self, state):
+        """Best (card id, target id or None) for the player to move in PHASE_PLAY."""
+        seat = state.current
+        moves = state.legal_moves()
+        scores = self.score([capture_row(state, seat, move_card(move), move_target(move)) for move in moves])
+        move = moves[int(np.argmax(scores))]
+        return move_card(move), move_target(move)
+
+    def choose_target(self, state, card_id, targets):
+        """Best of the field card ids `targets` for card_id to capture."""
+        scores = self.score([capture_row(state, state.current, card_id, target) for target in targets])
+        return targets[int(np.argmax(scores))]
+
+    def rollout_policy(self, state):
+        """A BitboardState policy for ISMCTS rollouts. Koikoi calls follow greedy_move."""
+        if state.phase == PHASE_PLAY:
+            return play_move(*self.choose_play(state))
+        if state.phase == PHASE_DRAW:
+            return self.choose_target(state, state.pending, capture_targets(state.field, state.pending))
+        return greedy_move(state)
+
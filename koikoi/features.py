@@ -0,0 +1,73 @@
+# features.py
+# Fixed-width encoding of decision points, for training evaluation functions.
+#
+# A position is seen by the seat that has to decide, so the opponent's hand
+# and the deck order stay hidden. Every card id (a CARD_DATA index) gets one
+# location code and a few small counters describe the rest. Rows are stored
+# column by column: COLUMNS names each column with its dtype and width.
+
+import numpy as np
+from card import CARD_DATA
+
+NUM_CARDS = len(CARD_DATA)
+
+# Location codes of the `cards` column, from the deciding seat's view
+LOC_UNSEEN = 0  # Deck or opponent's hand
+LOC_HAND = 1
+LOC_FIELD = 2
+LOC_CAPTURED = 3
+LOC_OPPONENT_CAPTURED = 4
+LOC_PENDING = 5  # Played or drawn card waiting for a capture choice
+NUM_LOCATIONS = 6
+
+# Values of the `decision` column and what `action` holds for each
+DECISION_PLAY = 0  # action: hand card id, target: captured field card id or NO_TARGET
+DECISION_CAPTURE = 1  # action: field card id the pending card captures
+DECISION_KOIKOI = 2  # action: 1 for koikoi, 0 for shobu
+NO_TARGET = 255
+
+# name -> (dtype, width); width 1 columns are stored one-dimensional
+COLUMNS = {
+    'cards': (np.uint8, NUM_CARDS),  # Location code of every card
+    'deck': (np.uint8, 1),  # Cards left in the deck
+    'opponent_hand': (np.uint8, 1),  # Cards in the opponent's hand
+    'koikoi': (np.uint8, 2),  # Own and opponent's koikoi flags
+    'parent': (np.uint8, 1),  # 1 if the deciding seat is the parent
+    'month': (np.uint8, 1),
+    'seat': (np.uint8, 1),  # GameController seat of the deciding player
+    'decision': (np.uint8, 1),
+    'action': (np.uint8, 1),
+    'target': (np.uint8, 1),
+    'outcome': (np.int16, 1),  # Round points won by the deciding seat minus the opponent's
+    'game': (np.uint32, 1),  # Index of the game in the run, to group rows
+}
+
+
+def card_locations(game, seat):
+    """The `cards` column of a GameController position seen by seat, as bytes."""
+    players = (game.player, game.cpu)
+    codes = bytearray(NUM_CARDS)
+    for card in players[seat].hand:
+        codes[card.card_id] = LOC_HAND
+    for card in game.field.cards:
+        codes[card.card_id] = LOC_FIELD
+    for card in players[seat].captured_cards:
+        codes[card.card_id] = LOC_CAPTURED
+    for card in players[1 - seat].captured_cards:
+        codes[card.card_id] = LOC_OPPONENT_CAPTURED
+    if game.pending_capture is not None:
+        codes[game.pending_capture[0].card_id] = LOC_PENDING
+    return bytes(codes)
+
+
+def encode_decision(game, decision, action, target=NO_TARGET):
+    """
+    One row of a decision by the current player of a GameController, as a
+    tuple in COLUMNS order. `outcome` is 0 and `game` 0 until the round and
+    run are known (see selfplay.PositionCollector).
+    """
+    seat = game.current_player.seat
+    me, opponent = (game.player, game.cpu) if seat == 0 else (game.cpu, game.player)
+    return (card_locations(game, seat), len(game.deck.cards), len(opponent.hand),
+            (me.has_koikoied, opponent.has_koikoied), me.is_parent, game.current_month,
+            seat, decision, action, target, 0, 0)
@@ -1,23 +1,68 @@
 # field.py
 # Manages the cards on the table (the "ba")
 
+from zobrist import FIELD, CARD_KEYS
+
 class Field:
     def __init__(self):
         self.cards = []
+        # Month -> field cards of that month, kept in the same order as self.cards
+        self.cards_by_month = {month: [] for month in range(1, 13)}
+        self.zobrist = 0  # Zobrist key of the field cards, see zobrist.py
 
     def add_cards(self, cards):
         """Adds cards to the field."""
         self.cards.extend(cards)
+        keys = CARD_KEYS[FIELD]
+        for card in cards:
+            self.cards_by_month[card.month].append(card)
+            self.zobrist += keys[card.card_id]
 
     def remove_card(self, card):
         """Removes a specific card from the field."""
-        if card in self.cards:
+        bucket = self.cards_by_month.get(card.month)
+        if bucket and card in bucket:
+            bucket.remove(card)
             self.cards.remove(card)
+            self.zobrist -= CARD_KEYS[FIELD][card.card_id]
 
     def find_matches(self, card_to_match):
         """Finds cards on the field that have the same month as the given card."""
-        return [card for card in self.cards if card.month == card_to_match.month]
+        return list(self.cards_by_month[card_to_match.month])
+
+    def capture_choices(self, card):
+        """
+        The field cards the player must choose between when `card` is played
+        or drawn: its two matches, unless they are identical cards. One match
+        is simply captured and three are all captured, so they need no choice.
+        """
+        matches = self.cards_by_month[card.month]
+        if len(matches) != 2:
+            return []
+        first, second = matches
+        if (first.name, first.category, first.points) == (second.name, second.category, second.points):
+            return []
+        return list(matches)
+
+    def has_month(self, month):
+        """Checks if any field card belongs to the given month."""
+        return bool(self.cards_by_month[month])
+
+    def months_present(self):
+        """Returns the months that have at least one card on the field."""
+        return [month for month, bucket in self.cards_by_month.items() if bucket]
+
+    def matches_for_hand(self, hand):
+        """
+        Returns (hand_card, matching_field_cards) for every hand card that
+        matches something on the field, in hand order.
+        """
+        return [(card, list(self.cards_by_month[card.month]))
+                for card in hand if self.cards_by_month[card.month]]
 
     def clear(self):
         """Clears all cards from the field."""
         self.cards = []
+        for bucket in self.cards_by_month.values():
+            bucket.clear()
+        self.zobrist = 0
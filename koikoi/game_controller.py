@@ -2,19 +2,33 @@
 # Manages the overall game logic and state.
 
 import random
+import time
 from deck import Deck
 from player import Player
 from field import Field
-from yaku import Yaku
+from bitboard import BitboardState, move_card, move_target
+from yaku_odds import koikoi_advice
+from zobrist import CARD_KEYS, HAND, PENDING, KEY_MASK, state_key
 from constants import *
 
+# How often update() should be called while a background search is running
+THINK_POLL_INTERVAL = 1 / FPS
+
 class GameController:
-    def __init__(self):
-        self.deck = Deck()
-        self.player = Player("You")
-        self.cpu = Player("CPU", is_cpu=True)
+    def __init__(self, player=None, cpu=None, rng=None, thinker=None, recorder=None):
+        # Players can be injected so headless runs can pit two CPUs together
+        # rng is a random.Random for reproducible games; default is the global generator
+        self.rng = rng if rng is not None else random
+        # A cpu_thinker.CpuThinker runs searching AIs off the render thread; None decides inline
+        self.thinker = thinker
+        # A game_record.GameRecorder logs the deals and every decision; None records nothing
+        self.recorder = recorder
+        self.deck = Deck(self.rng)
+        self.player = player if player is not None else Player("You")
+        self.cpu = cpu if cpu is not None else Player("CPU", is_cpu=True)
         self.field = Field()
-        self.yaku_checker = Yaku()
+        self.player.set_seat(0)
+        self.cpu.set_seat(1)
 
         self.current_month = 1
         self.parent_player = None
@@ -22,34 +36,50 @@ class GameController:
 
         self.game_state = GAME_STATE_START
         self.winner_of_round = None
+        self.pending_capture = None  # (card, came from hand) while GAME_STATE_CAPTURE_CHOICE waits
         
-        # Add CPU turn delay
-        self.cpu_turn_timer = 0
-        self.cpu_turn_delay = 60  # 1 second at 60 FPS
-
-    def start_game(self):
-        """Starts a new 12-round game."""
-        self._determine_first_parent()
-        self.start_round()
-
-    def start_round(self):
-        """Sets up and starts a new round (month)."""
+        # Add CPU turn delay, measured on the wall clock so it does not depend on the frame rate
+        self.cpu_turn_delay = CPU_TURN_DELAY
+        self.cpu_turn_due = None  # time.monotonic() at which the CPU moves
+
+    def start_game(self, first_parent=None, deck_order=None):
+        """
+        Starts a new 12-round game. first_parent (a seat) and deck_order
+        replace the random choices when replaying a record.
+        """
+        self._determine_first_parent(first_parent)
+        if self.recorder is not None:
+            self.recorder.start_game(self.parent_player.seat)
+        self.start_round(deck_order)
+
+    def start_round(self, deck_order=None):
+        """
+        Sets up and starts a new round (month). deck_order (card ids, top
+        first) replaces the shuffle when replaying a record.
+        """
         if self.current_month > 12:
             self.game_state = GAME_STATE_GAME_END
+            if self.recorder is not None:
+                self.recorder.end_game(self.player.total_score, self.cpu.total_score)
             return
 
         # Reset players and field for the new round
-        self.deck = Deck()
+        if deck_order is None:
+            self.deck = Deck(self.rng)
+        else:
+            self.deck = Deck.from_order(deck_order, self.rng)
         self.field.clear()
         for p in [self.player, self.cpu]:
-            p.hand.clear()
-            p.captured_cards.clear()
+            p.clear_cards()
             p.yaku_list.clear()
             p.monthly_score = 0
             p.has_koikoied = False
 
         # Deal cards
-        self.deck.shuffle()
+        if deck_order is None:
+            self.deck.shuffle()
+        if self.recorder is not None:
+            self.recorder.deal([card.card_id for card in self.deck.cards])
         self.parent_player.add_cards_to_hand(self.deck.deal(8))
         self.get_other_player(self.parent_player).add_cards_to_hand(self.deck.deal(8))
         self.field.add_cards(self.deck.deal(8))
@@ -59,10 +89,11 @@ class GameController:
         self.current_player = self.parent_player
         self.game_state = GAME_STATE_PLAYER_TURN if self.current_player == self.player else GAME_STATE_CPU_TURN
         self.winner_of_round = None
+        self.pending_capture = None
 
-    def _determine_first_parent(self):
-        """Randomly selects the parent for the first round."""
-        if random.choice([True, False]):
+    def _determine_first_parent(self, seat=None):
+        """Randomly selects the parent for the first round, unless seat is given."""
+        if seat == 0 or (seat is None and self.rng.choice([True, False])):
             self.player.is_parent = True
             self.cpu.is_parent = False
             self.parent_player = self.player
@@ -71,8 +102,13 @@ class GameController:
             self.cpu.is_parent = True
             self.parent_player = self.cpu
 
-    def execute_turn(self, hand_card):
-        """Executes a full turn for the current player."""
+    def execute_turn(self, hand_card, target=None):
+        """
+        Executes a full turn for the current player. target is the field card
+        to capture when hand_card matches two different ones (see
+        Field.capture_choices). Without it a CPU uses its AI and a human is
+        asked through GAME_STATE_CAPTURE_CHOICE.
+        """
         player = self.current_player
 
         # Validate input
@@ -81,34 +117,86 @@ class GameController:
             return
 
         # 1. Play card from hand
+        choices = self.field.capture_choices(hand_card)
+        if choices and target not in choices:
+            if not player.is_cpu:
+                if self.recorder is not None:
+                    self.recorder.play(hand_card.card_id, None)
+                player.play_card(hand_card)
+                self._ask_capture(hand_card, True)
+                return
+            target = self.choose_ai_capture(player, hand_card, choices)
+        if self.recorder is not None:
+            self.recorder.play(hand_card.card_id, target.card_id if target in choices else None)
         card_from_hand = player.play_card(hand_card)
         if card_from_hand:
-            self._handle_play(card_from_hand, player)
+            self._handle_play(card_from_hand, player, target)
+
+        # 2. Draw card from deck, then 3. check for yaku
+        self._draw_and_decide(player)
 
-        # 2. Draw card from deck
+    def _draw_and_decide(self, player):
+        """Draws a card from the deck and plays it, then checks for yaku."""
         if not self.deck.is_empty():
             drawn_cards = self.deck.deal(1)
             if drawn_cards:
                 card_from_deck = drawn_cards[0]
+                choices = self.field.capture_choices(card_from_deck)
+                if choices:
+                    self._ask_capture(card_from_deck, False)
+                    if player.is_cpu and not self._thinks_in_background(player):
+                        self.player_chooses_capture(self.choose_ai_capture(player, card_from_deck, choices))
+                    return
                 self._handle_play(card_from_deck, player)
 
-        # 3. Check for yaku and decide next step
         self._check_yaku_and_decide(player)
 
-    def _handle_play(self, played_card, player):
-        """Handles the logic of matching a played card with cards on the field."""
+    def _ask_capture(self, card, from_hand):
+        """Waits for the current player to pick which field card `card` captures."""
+        self.pending_capture = (card, from_hand)
+        self.game_state = GAME_STATE_CAPTURE_CHOICE
+
+    def player_chooses_capture(self, field_card):
+        """Called when the current player picks the field card the pending card captures."""
+        if self.game_state != GAME_STATE_CAPTURE_CHOICE:
+            return
+        card, from_hand = self.pending_capture
+        if field_card not in self.field.capture_choices(card):
+            return
+        if self.recorder is not None:
+            self.recorder.capture(field_card.card_id)
+        self.pending_capture = None
+        player = self.current_player
+        self._handle_play(card, player, field_card)
+        if from_hand:
+            self._draw_and_decide(player)
+        else:
+            self._check_yaku_and_decide(player)
+
+    def _handle_play(self, played_card, player, target=None):
+        """
+        Handles the logic of matching a played card with cards on the field.
+        One match is captured and three matches are all captured. Of two
+        matches, target is captured, or the lowest card id when there is no
+        real choice.
+        """
         matches = self.field.find_matches(played_card)
         if matches:
-            # TODO: Handle multiple matches - for now, take the first
-            match_card = matches[0]
-            self.field.remove_card(match_card)
-            player.capture_cards([played_card, match_card])
+            if len(matches) == 3:
+                captured = matches
+            elif target in matches:
+                captured = [target]
+            else:
+                captured = [min(matches, key=lambda card: card.card_id)]
+            for match_card in captured:
+                self.field.remove_card(match_card)
+            player.capture_cards([played_card] + captured)
         else:
             self.field.add_cards([played_card])
 
     def _check_yaku_and_decide(self, player):
         """Checks for yaku and transitions the game state."""
-        new_yaku = self.yaku_checker.check_yaku(player.captured_cards)
+        new_yaku = player.yaku_tracker.yaku_list()
 
         if new_yaku:
             # Check if it's a new, higher-scoring yaku combination
@@ -119,14 +207,12 @@ class GameController:
                 player.yaku_list = new_yaku
                 player.monthly_score = new_score
 
-                if player.is_cpu:
-                    # Simple AI: CPU always calls koikoi once, then stops.
-                    if player.has_koikoied:
-                        self.player_chooses_shobu() # Win
+                self.game_state = GAME_STATE_KOIKOI_CHOICE
+                if player.is_cpu and not self._thinks_in_background(player):
+                    if self.choose_ai_koikoi(player):
+                        self.player_chooses_koikoi()
                     else:
-                        self.player_chooses_koikoi() # Koikoi
-                else:
-                    self.game_state = GAME_STATE_KOIKOI_CHOICE
+                        self.player_chooses_shobu()
                 return
 
         # If no new yaku or player chose koikoi, switch turns
@@ -134,11 +220,15 @@ class GameController:
 
     def player_chooses_koikoi(self):
         """Called when the player decides to 'koikoi'."""
+        if self.recorder is not None:
+            self.recorder.koikoi(True)
         self.current_player.has_koikoied = True
         self.switch_turns()
 
     def player_chooses_shobu(self):
         """Called when the player decides to 'shobu' (win the round)."""
+        if self.recorder is not None:
+            self.recorder.koikoi(False)
         self.winner_of_round = self.current_player
         self._calculate_final_score()
         self.game_state = GAME_STATE_ROUND_END
@@ -188,8 +278,8 @@ class GameController:
         self.current_player = self.get_other_player(self.current_player)
         self.game_state = GAME_STATE_PLAYER_TURN if self.current_player == self.player else GAME_STATE_CPU_TURN
 
-    def next_round(self):
-        """Advances to the next month/round."""
+    def next_round(self, deck_order=None):
+        """Advances to the next month/round; deck_order is for replays, see start_round."""
         self.current_month += 1
 
         # The winner of the round becomes the next parent
@@ -200,34 +290,164 @@ class GameController:
             other.is_parent = False
         # If it was a draw, parent does not change.
 
-        self.start_round()
+        self.start_round(deck_order)
+
+    def to_bitboard(self):
+        """Returns the current round as a BitboardState for simulation and search."""
+        return BitboardState.from_controller(self)
+
+    def position_hash(self):
+        """
+        64-bit Zobrist key of the current round, equal to to_bitboard().zobrist().
+        Built from the keys the players, field and deck keep up to date.
+        """
+        key = self.player.zobrist + self.cpu.zobrist + self.field.zobrist + self.deck.zobrist
+        phase = "play"
+        if self.game_state == GAME_STATE_KOIKOI_CHOICE:
+            phase = "koikoi"
+        elif self.game_state == GAME_STATE_CAPTURE_CHOICE:
+            card, from_hand = self.pending_capture
+            if from_hand:
+                # Like to_bitboard(), a hand card waiting for its target counts as not played yet
+                key += CARD_KEYS[HAND[self.current_player.seat]][card.card_id]
+            else:
+                key += CARD_KEYS[PENDING][card.card_id]
+                phase = "draw"
+        elif self.game_state in (GAME_STATE_ROUND_END, GAME_STATE_GAME_END):
+            phase = "end"
+        current = self.current_player.seat if self.current_player else 0
+        parent = self.parent_player.seat if self.parent_player else 0
+        return (key + state_key(current, parent, (self.player.has_koikoied, self.cpu.has_koikoied), phase)) & KEY_MASK
 
     def get_other_player(self, player):
         """Returns the other player."""
         return self.cpu if player == self.player else self.player
 
+    def _thinks_in_background(self, player):
+        """Whether the player's decisions go to the background thinker."""
+        return self.thinker is not None and hasattr(player.ai, 'decide')
+
+    def _poll_thinker(self, player):
+        """Starts a background decision if none is running; returns (done, move)."""
+        if not self.thinker.busy():
+            self.thinker.submit(player.ai.decide, self.to_bitboard())
+        return self.thinker.poll()
+
+    def is_cpu_thinking(self):
+        """True while a background decision is pending."""
+        return self.thinker is not None and self.thinker.busy()
+
+    def hurry_cpu(self):
+        """Makes a background search play its best move so far."""
+        if self.thinker is not None:
+            self.thinker.hurry()
+
+    def choose_ai_play(self, player):
+        """
+        Asks a CPU player which card to play and, if it matches two different
+        field cards, which one to capture. Returns (card, target or None).
+        """
+        if player.ai:
+            return player.ai.choose_play(self, player)
+        state = self.to_bitboard() if player.evaluator is not None else None
+        card = player.choose_card_to_play(self.field, state)
+        choices = self.field.capture_choices(card) if card else []
+        return card, player.choose_capture_target(choices, card, state) if choices else None
+
+    def choose_ai_capture(self, player, card, choices):
+        """Asks a CPU player which of the field cards in choices `card` captures."""
+        if player.ai:
+            return player.ai.choose_capture(self, player, card, choices)
+        state = self.to_bitboard() if player.evaluator is not None else None
+        return player.choose_capture_target(choices, card, state)
+
+    def _field_card(self, card_id):
+        return next((card for card in self.field.cards if card.card_id == card_id), None)
+
+    def choose_ai_koikoi(self, player):
+        """Asks a CPU player whether to call koikoi (True) or shobu (False)."""
+        if player.ai:
+            return player.ai.choose_koikoi(self, player)
+        # Simple AI: koikoi when the odds of a new yaku outweigh the risk
+        return koikoi_advice(self.to_bitboard(), player.seat)[0]
+
     # UI-facing methods
-    def player_plays_card(self, hand_card):
+    def player_plays_card(self, hand_card, target=None):
         if self.current_player == self.player and self.game_state == GAME_STATE_PLAYER_TURN:
-            self.execute_turn(hand_card)
+            self.execute_turn(hand_card, target)
 
     def cpu_turn(self):
         if self.current_player == self.cpu and self.game_state == GAME_STATE_CPU_TURN:
-            card_to_play = self.cpu.choose_card_to_play(self.field.cards)
+            if self._thinks_in_background(self.cpu):
+                done, move = self._poll_thinker(self.cpu)
+                if not done:
+                    return  # Still thinking; update() calls again
+                card_id, target_id = move_card(move), move_target(move)
+                card_to_play = next((card for card in self.cpu.hand if card.card_id == card_id), None)
+                target = self._field_card(target_id) if target_id is not None else None
+            else:
+                card_to_play, target = self.choose_ai_play(self.cpu)
+            self.cpu_turn_due = None
             if card_to_play:
-                self.execute_turn(card_to_play)
+                self.execute_turn(card_to_play, target)
             else:
                 self.switch_turns() # CPU has no cards left
 
     def update(self):
-        """Updates the game state, currently only for CPU turn."""
-        if self.game_state == GAME_STATE_CPU_TURN:
-            self.cpu_turn_timer += 1
-            if self.cpu_turn_timer >= self.cpu_turn_delay:
-                self.cpu_turn()
-                self.cpu_turn_timer = 0
+        """
+        Updates the game state: CPU turns and background CPU decisions.
+        Does nothing while a human, or a replayed seat, is to move.
+        """
+        if self._cpu_choice_pending():
+            # Only reached when the decision runs in the background
+            done, move = self._poll_thinker(self.current_player)
+            if not done:
+                return
+            if self.game_state == GAME_STATE_CAPTURE_CHOICE:
+                self.player_chooses_capture(self._field_card(move))
+            elif move:
+                self.player_chooses_koikoi()
+            else:
+                self.player_chooses_shobu()
+            return
+        if self.game_state != GAME_STATE_CPU_TURN or not self.cpu.is_cpu:
+            self.cpu_turn_due = None
+            return
+        now = time.monotonic()
+        if self.cpu_turn_due is None:
+            self.cpu_turn_due = now + self.cpu_turn_delay
+            # Think during the delay rather than after it
+            if self._thinks_in_background(self.cpu):
+                self._poll_thinker(self.cpu)
+        if now >= self.cpu_turn_due:
+            self.cpu_turn()
+
+    def _cpu_choice_pending(self):
+        """A CPU koikoi or capture choice left to the background thinker."""
+        return (self.game_state in (GAME_STATE_KOIKOI_CHOICE, GAME_STATE_CAPTURE_CHOICE)
+                and self.current_player.is_cpu)
+
+    def time_until_update(self):
+        """
+        Seconds until update() has something to do, or None while the game
+        is waiting for the human player.
+        """
+        if self._cpu_choice_pending():
+            return THINK_POLL_INTERVAL
+        if self.game_state != GAME_STATE_CPU_TURN or not self.cpu.is_cpu:
+            return None
+        if self.cpu_turn_due is None:
+            return 0.0
+        remaining = self.cpu_turn_due - time.monotonic()
+        if remaining <= 0 and self.is_cpu_thinking():
+            return THINK_POLL_INTERVAL
+        return max(0.0, remaining)
 
     def restart_game(self):
         """Restarts the entire game."""
-        self.__init__()
+        if self.thinker is not None:
+            self.thinker.cancel()
+        for p in [self.player, self.cpu]:
+            p.total_score = 0
+        self.__init__(self.player, self.cpu, self.rng, self.thinker, self.recorder)
         self.start_game()
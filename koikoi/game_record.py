@@ -0,0 +1,421 @@
+# game_record.py
+# Compact binary game records and a headless replayer.
+# Usage: python koikoi/game_record.py record games.kkr --games 1000 --policies greedy random --seed 1
+#        python koikoi/game_record.py replay games.kkr [--workers 4]
+#
+# A record file starts with MAGIC and is append-only: GameController writes
+# each event through a GameRecorder as it happens, so the games of a session
+# (or one that crashed) can be replayed later. Events are a tag byte and a
+# fixed payload:
+#
+#   GAME      flags (bit 0: first parent seat, bit 1: seed follows), seed u64
+#   DEAL      the 48 card ids of a round's deck, top first
+#   PLAY      0x80 | card id, or 0xC0 | card id and the captured card id
+#   CAPTURE   0x40 | card id of the field card the pending card captures
+#   KOIKOI    koikoi / SHOBU   shobu
+#   END       final total scores of both seats, u16 each
+#
+# so a move costs one or two bytes. Replays re-execute the decisions on a
+# GameController with no display and no AI, and check the final scores.
+# ReplayIndex keeps compact checkpoints so a replay can jump to any move.
+
+import argparse
+import bisect
+import random
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from constants import (GAME_STATE_START, GAME_STATE_PLAYER_TURN, GAME_STATE_CPU_TURN, GAME_STATE_KOIKOI_CHOICE,
+                       GAME_STATE_CAPTURE_CHOICE, GAME_STATE_ROUND_END, GAME_STATE_GAME_END)
+from card import CARD_DATA
+from deck import Deck
+from game_controller import GameController
+from player import Player
+
+MAGIC = b"KKGR\x01"
+
+TAG_GAME = 0x01
+TAG_DEAL = 0x02
+TAG_END = 0x03
+TAG_SHOBU = 0x04
+TAG_KOIKOI = 0x05
+TAG_CAPTURE = 0x40  # | card id
+TAG_PLAY = 0x80  # | card id
+TAG_PLAY_TARGET = 0xC0  # | card id, then the target's card id
+
+_CARD_BITS = 0x3F
+_SEED = struct.Struct("<Q")
+_SCORES = struct.Struct("<HH")
+NUM_CARDS = len(CARD_DATA)
+# Turns between the checkpoints of a ReplayIndex, besides one at each round start
+CHECKPOINT_INTERVAL = 8
+
+
+class ReplayError(ValueError):
+    """A record that does not replay: corrupt, truncated or from different rules."""
+
+
+class GameRecorder:
+    """
+    Writes GameController events to a binary stream opened for appending.
+    seed is stored with the next game to start and then cleared, since a
+    restarted game continues the same random generator; set it again
+    before a game whose seed is known.
+    """
+
+    def __init__(self, stream, seed=None):
+        self.stream = stream
+        self.seed = seed
+        if stream.tell() == 0:
+            stream.write(MAGIC)
+
+    @classmethod
+    def open(cls, path, seed=None):
+        """Opens (or creates) a record file for appending."""
+        return cls(open(path, "ab"), seed)
+
+    def start_game(self, first_parent):
+        flags = first_parent
+        if self.seed is None:
+            self.stream.write(bytes((TAG_GAME, flags)))
+        else:
+            self.stream.write(bytes((TAG_GAME, flags | 2)) + _SEED.pack(self.seed))
+            self.seed = None
+
+    def deal(self, card_ids):
+        self.stream.write(bytes((TAG_DEAL, *card_ids)))
+
+    def play(self, card_id, target_id):
+        if target_id is None:
+            self.stream.write(bytes((TAG_PLAY | card_id,)))
+        else:
+            self.stream.write(bytes((TAG_PLAY_TARGET | card_id, target_id)))
+
+    def capture(self, card_id):
+        self.stream.write(bytes((TAG_CAPTURE | card_id,)))
+
+    def koikoi(self, koikoi):
+        self.stream.write(bytes((TAG_KOIKOI if koikoi else TAG_SHOBU,)))
+
+    def end_game(self, player_score, cpu_score):
+        self.stream.write(bytes((TAG_END,)) + _SCORES.pack(player_score, cpu_score))
+        self.stream.flush()
+
+    def close(self):
+        self.stream.close()
+
+
+class GameRecord:
+    """One recorded game: its seed, first parent and events in order."""
+
+    __slots__ = ('seed', 'first_parent', 'events', 'final_scores')
+
+    def __init__(self, seed, first_parent):
+        self.seed = seed  # None unless this was the first game of its session
+        self.first_parent = first_parent
+        # ('deal', card ids), ('play', card id, target id or None), ('capture', card id), ('koikoi', bool)
+        self.events = []
+        self.final_scores = None  # (seat 0, seat 1) totals, None if the game was not finished
+
+    def moves(self):
+        """Number of decisions (plays, capture choices and koikoi calls)."""
+        return sum(1 for event in self.events if event[0] != 'deal')
+
+
+def parse_records(data):
+    """Yields the GameRecords in the bytes of a record file."""
+    if not data.startswith(MAGIC):
+        raise ReplayError("Not a game record file")
+    record = None
+    pos = len(MAGIC)
+    end = len(data)
+    try:
+        while pos < end:
+            tag = data[pos]
+            pos += 1
+            if tag >= TAG_CAPTURE:
+                card_id = tag & _CARD_BITS
+                if tag >= TAG_PLAY_TARGET:
+                    record.events.append(('play', card_id, data[pos]))
+                    pos += 1
+                elif tag >= TAG_PLAY:
+                    record.events.append(('play', card_id, None))
+                else:
+                    record.events.append(('capture', card_id))
+            elif tag == TAG_DEAL:
+                if pos + NUM_CARDS > end:
+                    raise ReplayError("Truncated deal")
+                record.events.append(('deal', tuple(data[pos:pos + NUM_CARDS])))
+                pos += NUM_CARDS
+            elif tag == TAG_KOIKOI or tag == TAG_SHOBU:
+                record.events.append(('koikoi', tag == TAG_KOIKOI))
+            elif tag == TAG_GAME:
+                if record is not None:
+                    yield record
+                flags = data[pos]
+                pos += 1
+                seed = None
+                if flags & 2:
+                    (seed,) = _SEED.unpack_from(data, pos)
+                    pos += _SEED.size
+                record = GameRecord(seed, flags & 1)
+            elif tag == TAG_END:
+                record.final_scores = _SCORES.unpack_from(data, pos)
+                pos += _SCORES.size
+            else:
+                raise ReplayError(f"Unknown tag {tag:#x} at byte {pos - 1}")
+    except (AttributeError, IndexError, struct.error) as e:
+        # AttributeError: an event before the first GAME tag
+        raise ReplayError(f"Corrupt or truncated record near byte {pos}") from e
+    if record is not None:
+        yield record
+
+
+def read_records(path):
+    """Yields the GameRecords in a record file."""
+    with open(path, "rb") as f:
+        data = f.read()
+    yield from parse_records(data)
+
+
+def new_replay_game():
+    """A headless GameController whose seats both wait for recorded decisions."""
+    return GameController(Player("Seat 0"), Player("Seat 1"))
+
+
+def apply_event(game, record, event):
+    """Applies one event of record to game. Raises ReplayError if it is not legal."""
+    kind = event[0]
+    state = game.game_state
+    if kind == 'deal':
+        if state == GAME_STATE_START:
+            game.start_game(record.first_parent, event[1])
+        elif state == GAME_STATE_ROUND_END:
+            game.next_round(event[1])
+        else:
+            raise ReplayError(f"Deal in state {state}")
+    elif kind == 'play':
+        if state not in (GAME_STATE_PLAYER_TURN, GAME_STATE_CPU_TURN):
+            raise ReplayError(f"Play in state {state}")
+        card = next((card for card in game.current_player.hand if card.card_id == event[1]), None)
+        if card is None:
+            raise ReplayError(f"Card {event[1]} is not in {game.current_player.name}'s hand")
+        target = None
+        if event[2] is not None:
+            target = next((card for card in game.field.cards if card.card_id == event[2]), None)
+            if target is None:
+                raise ReplayError(f"Card {event[2]} is not on the field")
+        game.execute_turn(card, target)
+    elif kind == 'capture':
+        if state != GAME_STATE_CAPTURE_CHOICE:
+            raise ReplayError(f"Capture choice in state {state}")
+        target = next((card for card in game.field.cards if card.card_id == event[1]), None)
+        if target is None or target not in game.field.capture_choices(game.pending_capture[0]):
+            raise ReplayError(f"Card {event[1]} is not a capture choice")
+        game.player_chooses_capture(target)
+    else:
+        if state != GAME_STATE_KOIKOI_CHOICE:
+            raise ReplayError(f"Koikoi choice in state {state}")
+        if event[1]:
+            game.player_chooses_koikoi()
+        else:
+            game.player_chooses_shobu()
+
+
+def finish_replay(game, record):
+    """Ends a game replayed up to its last event and checks the recorded final scores."""
+    if record.final_scores is None:
+        return
+    if game.game_state == GAME_STATE_ROUND_END:
+        game.next_round()  # Past the twelfth month this ends the game without a deal
+    if game.game_state != GAME_STATE_GAME_END:
+        raise ReplayError(f"Record ends in state {game.game_state}")
+    scores = (game.player.total_score, game.cpu.total_score)
+    if scores != record.final_scores:
+        raise ReplayError(f"Final scores {scores} differ from the recorded {record.final_scores}")
+
+
+def replay(record):
+    """
+    Re-executes a GameRecord on a headless GameController and returns it.
+    Both seats are non-CPU players, so every decision comes from the record.
+    Raises ReplayError if an event is not legal or the final scores differ.
+    """
+    game = new_replay_game()
+    for event in record.events:
+        apply_event(game, record, event)
+    finish_replay(game, record)
+    return game
+
+
+def checkpoint(game):
+    """
+    Packs a replay game at the start of a turn into a few dozen bytes:
+    month, parent, current seat, koikoi flags, total scores and every card
+    list in order. Yaku and monthly scores follow from the captured piles.
+    """
+    if game.game_state not in (GAME_STATE_PLAYER_TURN, GAME_STATE_CPU_TURN):
+        raise ValueError(f"Checkpoints are taken at the start of a turn, not in state {game.game_state}")
+    players = (game.player, game.cpu)
+    data = bytearray((game.current_month, game.parent_player.seat, game.current_player.seat,
+                      players[0].has_koikoied | players[1].has_koikoied << 1))
+    data += _SCORES.pack(players[0].total_score, players[1].total_score)
+    for cards in (players[0].hand, players[1].hand, players[0].captured_cards, players[1].captured_cards,
+                  game.field.cards, game.deck.cards):
+        data.append(len(cards))
+        data += bytes(card.card_id for card in cards)
+    return bytes(data)
+
+
+def restore(data):
+    """Rebuilds a replay game from checkpoint() bytes."""
+    month, parent, current, koikoi = data[:4]
+    scores = _SCORES.unpack_from(data, 4)
+    lists = []
+    pos = 4 + _SCORES.size
+    for _ in range(6):
+        lists.append(data[pos + 1:pos + 1 + data[pos]])
+        pos += 1 + data[pos]
+    hands, captured, field, deck = lists[0:2], lists[2:4], lists[4], lists[5]
+
+    game = new_replay_game()
+    cards = Deck.from_order(range(NUM_CARDS)).cards  # Indexed by card id
+    players = (game.player, game.cpu)
+    for seat, player in enumerate(players):
+        player.add_cards_to_hand([cards[card_id] for card_id in hands[seat]])
+        player.capture_cards([cards[card_id] for card_id in captured[seat]])
+        player.yaku_list = player.yaku_tracker.yaku_list()
+        player.monthly_score = player.yaku_tracker.score
+        player.has_koikoied = bool(koikoi >> seat & 1)
+        player.total_score = scores[seat]
+        player.is_parent = seat == parent
+    game.field.add_cards([cards[card_id] for card_id in field])
+    game.deck = Deck.from_order(list(deck))
+    game.current_month = month
+    game.parent_player = players[parent]
+    game.current_player = players[current]
+    game.game_state = GAME_STATE_PLAYER_TURN if current == 0 else GAME_STATE_CPU_TURN
+    return game
+
+
+class ReplayIndex:
+    """
+    Seekable replay of one GameRecord. Building the index replays the game
+    once and keeps a checkpoint at the start of every round and every
+    `interval` turns, so seek() replays at most that many turns.
+    Positions count events: 0 is before the first deal and len(index)
+    is the finished game.
+    """
+
+    def __init__(self, record, interval=CHECKPOINT_INTERVAL):
+        self.record = record
+        self.interval = interval
+        self.positions = []  # Event positions with a checkpoint, ascending
+        self.checkpoints = []  # checkpoint() bytes for each of self.positions
+        game = new_replay_game()
+        turns = 0
+        for position, event in enumerate(record.events, 1):
+            apply_event(game, record, event)
+            if event[0] == 'play':
+                turns += 1
+            if (game.game_state in (GAME_STATE_PLAYER_TURN, GAME_STATE_CPU_TURN)
+                    and (event[0] == 'deal' or turns >= interval)):
+                self.positions.append(position)
+                self.checkpoints.append(checkpoint(game))
+                turns = 0
+        finish_replay(game, record)
+
+    def __len__(self):
+        return len(self.record.events)
+
+    def seek(self, position):
+        """Returns a new GameController showing the game after `position` events."""
+        position = max(0, min(position, len(self)))
+        i = bisect.bisect_right(self.positions, position) - 1
+        if i >= 0:
+            game = restore(self.checkpoints[i])
+            start = self.positions[i]
+        else:
+            game = new_replay_game()
+            start = 0
+        for event in self.record.events[start:position]:
+            apply_event(game, self.record, event)
+        if position == len(self):
+            finish_replay(game, self.record)
+        return game
+
+    def size(self):
+        """Bytes held by the checkpoints."""
+        return sum(len(data) for data in self.checkpoints)
+
+
+def _replay_records(records):
+    """Worker entry point: replays some GameRecords and returns their number of moves."""
+    moves = 0
+    for record in records:
+        replay(record)
+        moves += record.moves()
+    return moves
+
+
+def replay_file(path, workers=1, chunk=1000):
+    """Replays every game in a file. Returns (games, moves, elapsed seconds)."""
+    start = time.perf_counter()
+    records = list(read_records(path))
+    if workers > 1:
+        chunks = [records[i:i + chunk] for i in range(0, len(records), chunk)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            moves = sum(executor.map(_replay_records, chunks))
+    else:
+        moves = _replay_records(records)
+    return len(records), moves, time.perf_counter() - start
+
+
+def record_games(path, num_games, policies=("greedy", "greedy"), seed=0):
+    """Plays num_games headless games between two policies and appends them to path."""
+    from policies import create_ai
+    from simulation import play_game
+    rng = random.Random(seed)
+    recorder = GameRecorder.open(path)
+    try:
+        for _ in range(num_games):
+            game_seed = rng.getrandbits(63)
+            game_rng = random.Random(game_seed)
+            players = [Player(spec, is_cpu=True, ai=create_ai(spec, game_rng.getrandbits(64))) for spec in policies]
+            recorder.seed = game_seed
+            game = GameController(*players, rng=game_rng, recorder=recorder)
+            try:
+                play_game(game)
+            finally:
+                for player in players:
+                    if player.ai is not None:
+                        player.ai.close()
+    finally:
+        recorder.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay koikoi games")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="Play headless games and append them to a file")
+    record.add_argument("path")
+    record.add_argument("--games", type=int, default=100)
+    record.add_argument("--policies", nargs=2, default=["greedy", "greedy"], help="Policy specs of the two seats")
+    record.add_argument("--seed", type=int, default=0)
+    replay_parser = commands.add_parser("replay", help="Replay every game in a file and check the scores")
+    replay_parser.add_argument("path")
+    replay_parser.add_argument("--workers", type=int, default=1, help="Worker processes")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        start = time.perf_counter()
+        record_games(args.path, args.games, args.policies, args.seed)
+        print(f"Recorded {args.games} games in {time.perf_counter() - start:.1f}s")
+    else:
+        games, moves, elapsed = replay_file(args.path, args.workers)
+        print(f"Replayed {games} games ({moves} moves) in {elapsed:.2f}s: "
+              f"{games / elapsed:,.0f} games/second, {moves / elapsed:,.0f} moves/second")
+
+
+if __name__ == "__main__":
+    main()
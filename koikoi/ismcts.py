@@ -0,0 +1,308 @@
+# ismcts.py
+# Information-set Monte Carlo Tree Search CPU.
+#
+# The CPU cannot see the opponent's hand or the deck order. Each iteration
+# deals those unseen cards at random (a "determinization"), walks a single
+# shared tree restricted to the moves legal in that deal, plays the rest of
+# the round out with the greedy heuristic and backs up the round result.
+# Both the card to play and the koikoi/shobu decision are searched.
+# Tree edges are move classes (symmetry.canonical_move), so playing either of
+# two interchangeable cards in different deals leads to the same node.
+
+import math
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from bitboard import BitboardState, greedy_move, mask_to_ids, move_card, move_target
+from symmetry import canonical_move, concrete_move
+
+# Round points are divided by this before backing up, so UCB sees values near [-1, 1]
+REWARD_SCALE = 10.0
+
+
+class _Node:
+    __slots__ = ('move', 'seat', 'parent', 'children', 'visits', 'total', 'available')
+
+    def __init__(self, move=None, seat=None, parent=None):
+        self.move = move  # Class of the move that led here (symmetry.canonical_move)
+        self.seat = seat  # Seat that made that move
+        self.parent = parent
+        self.children = {}  # (phase, move) -> _Node
+        self.visits = 0
+        self.total = 0.0  # Sum of rewards from self.seat's point of view
+        self.available = 0  # Iterations in which this move was legal
+
+    def ucb(self, exploration):
+        return self.total / self.visits + exploration * math.sqrt(math.log(self.available) / self.visits)
+
+
+class ISMCTS:
+    """
+    A CPU AI that plugs into Player.ai. Searches until time_limit seconds
+    have passed or max_playouts iterations are done, whichever comes first.
+    Set either to None to disable it; at least one must be given.
+    An optional endgame.EndgameSolver takes over near the end of the round.
+    Searches also stop early, with their best move so far, once the
+    optional stop_event (a threading.Event) is set.
+    """
+
+    def __init__(self, time_limit=1.0, max_playouts=None, exploration=0.7,
+                 rollout_policy=greedy_move, rng=None, endgame=None):
+        if time_limit is None and max_playouts is None:
+            raise ValueError("ISMCTS needs a time_limit or a max_playouts budget")
+        self.time_limit = time_limit
+        self.max_playouts = max_playouts
+        self.exploration = exploration
+        self.rollout_policy = rollout_policy
+        self.rng = rng or random.Random()
+        self.endgame = endgame
+        self.last_playouts = 0  # Iterations run by the last search
+
+    # Player.ai interface
+    def choose_play(self, game, player):
+        """Returns (Card to play, field Card to capture or None)."""
+        move = self.decide(game.to_bitboard())
+        card_id, target_id = move_card(move), move_target(move)
+        card = next((card for card in player.hand if card.card_id == card_id), None)
+        target = next((card for card in game.field.cards if card.card_id == target_id), None)
+        return card, target
+
+    def choose_capture(self, game, player, card, choices):
+        """
+        Returns which of the field Cards in choices the drawn card captures.
+        Raises ValueError if the search picked a card that is not a choice.
+        """
+        target_id = self.decide(game.to_bitboard())
+        target = next((choice for choice in choices if choice.card_id == target_id), None)
+        if target is None:
+            raise ValueError(f"Search chose capture {target_id}, not one of "
+                             f"{[choice.card_id for choice in choices]}")
+        return target
+
+    def choose_koikoi(self, game, player):
+        """Returns True to call koikoi, False to call shobu."""
+        return self.decide(game.to_bitboard())
+
+    def close(self):
+        """Releases resources held by the AI. Nothing to do for in-process search."""
+
+    def decide(self, state, stop_event=None):
+        """
+        Returns the move to play, using the endgame solver when it applies.
+        The solver and, if it runs out of time, the search share one
+        time_limit budget.
+        """
+        deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        if self.endgame is not None and self.endgame.applies(state):
+            move = self.endgame.solve(state, stop_event, deadline)
+            if move is not None:
+                return move
+        return self.search(state, stop_event, deadline)
+
+    # Search
+    def search(self, state, stop_event=None, deadline=None):
+        """
+        Returns the best move for the current player of a BitboardState.
+        deadline (a time.perf_counter() value) replaces the time_limit.
+        """
+        root_moves = state.legal_moves()
+        if len(root_moves) == 1:
+            self.last_playouts = 0
+            return root_moves[0]
+
+        root = self.run(state, stop_event, deadline)
+        return concrete_move(state, self.best_move(root))
+
+    def run(self, state, stop_event=None, deadline=None):
+        """Runs the search on a BitboardState and returns the root node."""
+        observer = state.current
+        root = _Node()
+        if deadline is None and self.time_limit is not None:
+            deadline = time.perf_counter() + self.time_limit
+        playouts = 0
+        while True:
+            self._iterate(root, self.determinize(state, observer))
+            playouts += 1
+            if self.max_playouts is not None and playouts >= self.max_playouts:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            if stop_event is not None and stop_event.is_set():
+                break
+        self.last_playouts = playouts
+        return root
+
+    @staticmethod
+    def best_move(root):
+        """Class of the most visited root move."""
+        best = max(root.children.values(), key=lambda child: child.visits)
+        return best.move
+
+    def determinize(self, state, observer):
+        """Deals the cards the observer cannot see: the opponent's hand and the deck order."""
+        opponent = 1 - observer
+        unseen = mask_to_ids(state.hands[opponent]) + list(state.deck[state.deck_pos:])
+        self.rng.shuffle(unseen)
+        hand_size = state.hands[opponent].bit_count()
+        sample = state.clone()
+        hand = 0
+        for card_id in unseen[:hand_size]:
+            hand |= 1 << card_id
+        sample.hands[opponent] = hand
+        sample.deck = tuple(unseen[hand_size:])
+        sample.deck_pos = 0
+        sample.rehash()
+        return sample
+
+    def _iterate(self, root, state):
+        node = root
+        exploration = self.exploration
+
+        # Selection: descend while every legal move already has a child
+        while not state.is_terminal():
+            phase = state.phase
+            moves = {canonical_move(state, move): move for move in state.legal_moves()}
+            untried = [move for move in moves if (phase, move) not in node.children]
+            if untried:
+                # Expansion
+                move = self.rng.choice(untried)
+                child = _Node(move, state.current, node)
+                node.children[(phase, move)] = child
+                for other in moves:
+                    sibling = node.children.get((phase, other))
+                    if sibling is not None:
+                        sibling.available += 1
+                state.apply(moves[move])
+                node = child
+                break
+            best, best_value = None, -math.inf
+            for move in moves:
+                child = node.children[(phase, move)]
+                child.available += 1
+                value = child.ucb(exploration)
+                if value > best_value:
+                    best, best_value = child, value
+            state.apply(moves[best.move])
+            node = best
+
+        # Simulation
+        policy = self.rollout_policy
+        while not state.is_terminal():
+            state.apply(policy(state))
+
+        # Backpropagation
+        rewards = (state.score_for(0) / REWARD_SCALE, state.score_for(1) / REWARD_SCALE)
+        while node is not None:
+            node.visits += 1
+            if node.seat is not None:
+                node.total += rewards[node.seat]
+            node = node.parent
+
+
+_stop_flag = None  # In a worker process: the pool's shared stop flag
+
+
+def _init_worker(stop_flag):
+    """Runs once in each new worker process."""
+    global _stop_flag
+    _stop_flag = stop_flag
+
+
+def _root_search(packed_state, time_limit, max_playouts, exploration, rollout_policy, seed):
+    """
+    Worker process entry point: one independent search, returning its root
+    statistics. Stops early once the pool's stop flag is set.
+    """
+    search = ISMCTS(time_limit, max_playouts, exploration, rollout_policy, random.Random(seed))
+    root = search.run(BitboardState.unpack(packed_state), _stop_flag)
+    stats = {child.move: (child.visits, child.total) for child in root.children.values()}
+    return search.last_playouts, stats
+
+
+def _warm_up(_):
+    """Runs in each new worker so the pool is fully started before the first search."""
+    return os.getpid()
+
+
+class ParallelISMCTS(ISMCTS):
+    """
+    Root-parallel ISMCTS. Every worker process runs its own search on the
+    same packed BitboardState and the root statistics are summed. The
+    process pool is created on first use and kept alive across turns;
+    call close() when done with it.
+    A max_playouts budget is split between the workers; a time_limit
+    applies to each of them. stop() makes the running workers return what
+    they have so far.
+    """
+
+    def __init__(self, workers=None, time_limit=1.0, max_playouts=None, exploration=0.7,
+                 rollout_policy=greedy_move, rng=None, endgame=None):
+        super().__init__(time_limit, max_playouts, exploration, rollout_policy, rng, endgame)
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = None
+        self.stop_flag = None  # multiprocessing.Event shared with the workers
+        self.last_root_stats = {}  # Merged root statistics of the last search, by move class
+
+    def start(self):
+        """Starts the worker processes now instead of on the first search."""
+        if self.executor is None:
+            self.stop_flag = multiprocessing.Event()
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                initargs=(self.stop_flag,))
+            list(self.executor.map(_warm_up, range(self.workers)))
+        return self.executor
+
+    def stop(self):
+        """Makes the workers end the search in progress, if any."""
+        if self.stop_flag is not None:
+            self.stop_flag.set()
+
+    def close(self):
+        """Shuts down the worker processes."""
+        if self.executor is not None:
+            self.stop()
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    def search(self, state, stop_event=None, deadline=None):
+        root_moves = state.legal_moves()
+        if len(root_moves) == 1:
+            self.last_playouts = 0
+            return root_moves[0]
+
+        executor = self.start()
+        time_limit = self.time_limit if deadline is None else max(0.0, deadline - time.perf_counter())
+        playouts = None
+        if self.max_playouts is not None:
+            playouts = max(1, math.ceil(self.max_playouts / self.workers))
+        packed = state.pack()
+        self.stop_flag.clear()
+        futures = [executor.submit(_root_search, packed, time_limit, playouts, self.exploration,
+                                   self.rollout_policy, self.rng.getrandbits(64))
+                   for _ in range(self.workers)]
+
+        merged = {}  # move -> [visits, total reward]
+        self.last_playouts = 0
+        pending = futures
+        while pending:
+            done, pending = wait(pending, timeout=None if stop_event is None else 0.05)
+            for future in done:
+                if future.cancelled():
+                    continue
+                worker_playouts, stats = future.result()
+                self.last_playouts += worker_playouts
+                for move, (visits, total) in stats.items():
+                    entry = merged.setdefault(move, [0, 0.0])
+                    entry[0] += visits
+                    entry[1] += total
+            if stop_event is not None and stop_event.is_set():
+                # Running workers return what they have at their next iteration; the rest never start
+                self.stop()
+                for future in pending:
+                    future.cancel()
+        self.last_root_stats = merged
+        if not merged:
+            return ISMCTS.search(self, state, stop_event, deadline)
+        return concrete_move(state, max(merged, key=lambda move: merged[move][0]))
@@ -1,46 +1,140 @@
 # main.py
 # This will be the main entry point for the game.
 
+import argparse
+import itertools
+import random
 import pygame
 from constants import SCREEN_WIDTH, SCREEN_HEIGHT, FPS
+from cpu_thinker import CpuThinker
+from endgame import EndgameSolver
 from game_controller import GameController
+from game_record import GameRecorder, ReplayIndex, read_records
+from ismcts import ISMCTS, ParallelISMCTS
+from player import Player
 from ui_manager import UIManager
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Hanafuda Koikoi")
+    parser.add_argument("--cpu", choices=["greedy", "ismcts"], default="greedy",
+                        help="CPU AI: the simple heuristic or ISMCTS search")
+    parser.add_argument("--think-time", type=float, default=1.0,
+                        help="ISMCTS thinking time per decision, in seconds")
+    parser.add_argument("--playouts", type=int, default=None,
+                        help="ISMCTS playouts per decision (instead of a time limit)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes for the ISMCTS search")
+    parser.add_argument("--endgame", action="store_true",
+                        help="Solve the last turns of each round with exact minimax over the possible deals")
+    parser.add_argument("--constant-fps", action="store_true",
+                        help=f"Run the loop at a steady {FPS} FPS instead of sleeping while idle")
+    parser.add_argument("--record", metavar="PATH",
+                        help="Append the games played to a record file (see game_record.py)")
+    parser.add_argument("--replay", metavar="PATH",
+                        help="Step through a recorded game instead of playing")
+    parser.add_argument("--game", type=int, default=0,
+                        help="Which game of the --replay file to show, counting from 0")
+    parser.add_argument("--hints", action="store_true",
+                        help="Show the odds of each yaku when choosing koikoi or shobu")
+    return parser.parse_args()
+
+def create_cpu(args):
+    """Creates the CPU player with the AI chosen on the command line."""
+    ai = None
+    if args.cpu == "ismcts":
+        time_limit = None if args.playouts else args.think_time
+        # The solver gets half of the time; a search that follows a timed-out solve gets the rest
+        endgame = EndgameSolver(time_limit=args.think_time / 2) if args.endgame else None
+        if args.workers > 1:
+            ai = ParallelISMCTS(args.workers, time_limit=time_limit, max_playouts=args.playouts,
+                                endgame=endgame)
+            ai.start()
+        else:
+            ai = ISMCTS(time_limit=time_limit, max_playouts=args.playouts, endgame=endgame)
+    return Player("CPU", is_cpu=True, ai=ai)
+
+def load_replay(args):
+    """Indexes the game picked by --replay and --game for seeking."""
+    record = next(itertools.islice(read_records(args.replay), args.game, None), None)
+    if record is None:
+        raise ValueError(f"{args.replay} has no game {args.game}")
+    return ReplayIndex(record)
+
+def next_events(game_controller, constant_fps):
+    """
+    Returns the pending events. Unless constant_fps is set, first sleeps
+    until an event arrives or the controller has work to do, so a table
+    waiting for the human uses no CPU.
+    """
+    if not constant_fps:
+        timeout = game_controller.time_until_update()
+        if timeout is None:
+            event = pygame.event.wait()
+        elif timeout > 0:
+            event = pygame.event.wait(max(1, round(timeout * 1000)))
+        else:
+            event = None
+        if event is not None and event.type != pygame.NOEVENT:
+            return [event] + pygame.event.get()
+    return pygame.event.get()
+
 def main():
     """Main function to run the game."""
+    args = parse_args()
+    cpu = None
+    recorder = None
+    thinker = CpuThinker()
     try:
+        replay = load_replay(args) if args.replay else None
+        # Create the CPU first so any worker processes start before the display
+        if replay is None:
+            cpu = create_cpu(args)
         pygame.init()
         screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("花札こいこい (Hanafuda Koikoi)")
         clock = pygame.time.Clock()
 
-        game_controller = GameController()
-        ui_manager = UIManager(screen, game_controller)
-
-        game_controller.start_game()
+        rng = None
+        if args.record and replay is None:
+            # Seed the game explicitly so the record can name it
+            seed = random.randrange(1 << 63)
+            rng = random.Random(seed)
+            recorder = GameRecorder.open(args.record, seed)
+        if replay is None:
+            game_controller = GameController(cpu=cpu, rng=rng, thinker=thinker, recorder=recorder)
+            game_controller.start_game()
+        else:
+            game_controller = replay.seek(0)
+        ui_manager = UIManager(screen, game_controller, replay, hints=args.hints)
 
         running = True
         while running:
+            # The replay viewer swaps in a new controller on every seek
+            game_controller = ui_manager.game_controller
+
             # Event handling
-            for event in pygame.event.get():
+            for event in next_events(game_controller, args.constant_fps):
                 if event.type == pygame.QUIT:
                     running = False
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
                         running = False
+                    elif event.key == pygame.K_SPACE:
+                        game_controller.hurry_cpu()
 
-                ui_manager.handle_event(event)
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    ui_manager.invalidate()
 
-            # Game logic update
-            game_controller.update()
+                ui_manager.handle_event(event)
 
-            # Drawing
-            ui_manager.draw()
+            # Game logic update; a replayed position only changes when the viewer seeks
+            if replay is None:
+                ui_manager.game_controller.update()
 
-            # Update the display
-            pygame.display.flip()
+            # Redraw only what changed and push just those areas to the display
+            pygame.display.update(ui_manager.draw())
 
-            # Cap the frame rate
+            # Cap the frame rate; after an idle wait this returns at once
             clock.tick(FPS)
 
     except Exception as e:
@@ -48,6 +142,11 @@ def main():
         import traceback
         traceback.print_exc()
     finally:
+        thinker.close()
+        if recorder is not None:
+            recorder.close()
+        if cpu is not None and cpu.ai is not None:
+            cpu.ai.close()
         pygame.quit()
 
 if __name__ == "__main__":
@@ -1,48 +1,91 @@
 # player.py
 # Represents a player in the game
 
+from yaku import YakuTracker
+from zobrist import HAND, CAPTURED, CARD_KEYS
+
 class Player:
-    def __init__(self, name, is_parent=False, is_cpu=False):
+    def __init__(self, name, is_parent=False, is_cpu=False, ai=None, evaluator=None):
         self.name = name
         self.is_cpu = is_cpu
+        # Optional CPU AI object with choose_play(game, player),
+        # choose_capture(game, player, card, choices) and
+        # choose_koikoi(game, player). None uses the built-in heuristic.
+        self.ai = ai
+        # Optional evaluation.LinearEvaluator for the built-in heuristic: it
+        # scores every card and capture choice at once instead of the rules below
+        self.evaluator = evaluator
         self.is_parent = is_parent
         self.hand = []  # Cards in the player's hand
         self.captured_cards = [] # Cards won by the player
         self.yaku_list = [] # List of yaku achieved in the current round
+        self.yaku_tracker = YakuTracker() # Yaku progress of captured_cards
         self.monthly_score = 0 # Score for the current month/round
         self.total_score = 0 # Total score for the whole game
         self.has_koikoied = False # Flag for "koikoi"
+        self.seat = 0 # 0 for GameController.player, 1 for its cpu; picks the Zobrist keys
+        self.zobrist = 0 # Zobrist key of hand and captured_cards, see zobrist.py
+
+    def set_seat(self, seat):
+        """Sets the player's seat and recomputes the Zobrist key for it."""
+        self.seat = seat
+        self.zobrist = 0
+        for card in self.hand:
+            self.zobrist += CARD_KEYS[HAND[seat]][card.card_id]
+        for card in self.captured_cards:
+            self.zobrist += CARD_KEYS[CAPTURED[seat]][card.card_id]
+
+    def clear_cards(self):
+        """Empties the hand and captured pile for a new round."""
+        self.hand.clear()
+        self.captured_cards.clear()
+        self.yaku_tracker.reset()
+        self.zobrist = 0
 
     def add_cards_to_hand(self, cards):
         """Adds a list of cards to the player's hand."""
         self.hand.extend(cards)
+        keys = CARD_KEYS[HAND[self.seat]]
+        for card in cards:
+            self.zobrist += keys[card.card_id]
 
     def play_card(self, card):
         """Removes a card from the hand to be played."""
         if card in self.hand:
             self.hand.remove(card)
+            self.zobrist -= CARD_KEYS[HAND[self.seat]][card.card_id]
             return card
         return None
 
     def capture_cards(self, cards):
-        """Adds cards to the player's captured pile."""
+        """
+        Adds cards to the player's captured pile.
+        Returns the yaku newly satisfied by these cards.
+        """
         self.captured_cards.extend(cards)
+        keys = CARD_KEYS[CAPTURED[self.seat]]
+        for card in cards:
+            self.zobrist += keys[card.card_id]
+        return self.yaku_tracker.add_cards(cards)
 
-    def choose_card_to_play(self, field_cards):
+    def choose_card_to_play(self, field, state=None):
         """
         Logic for choosing a card.
         For CPU, this will contain the AI logic.
         For a human player, this might just wait for input.
+        state is the round as a BitboardState, needed by an evaluator.
         """
+        if self.is_cpu and self.evaluator is not None and state is not None:
+            card_id, _ = self.evaluator.choose_play(state)
+            return next((card for card in self.hand if card.card_id == card_id), None)
         if self.is_cpu:
             # Improved AI: prioritize cards that match field cards
             # First, try to find cards that match field cards
             matching_cards = []
-            for hand_card in self.hand:
-                for field_card in field_cards:
-                    if hand_card.month == field_card.month:
-                        matching_cards.append((hand_card, field_card))
-            
+            for hand_card, field_matches in field.matches_for_hand(self.hand):
+                for field_card in field_matches:
+                    matching_cards.append((hand_card, field_card))
+
             if matching_cards:
                 # Prioritize higher value matches
                 matching_cards.sort(key=lambda x: x[1].points, reverse=True)
@@ -57,3 +100,14 @@ class Player:
         else:
             # Human player logic is handled by UIManager
             return None
+
+    def choose_capture_target(self, choices, card=None, state=None):
+        """
+        Heuristic capture choice: the most valuable field card, ties to the
+        lowest card id. With an evaluator and the round's BitboardState the
+        choice for `card` is scored instead.
+        """
+        if self.evaluator is not None and state is not None:
+            target_id = self.evaluator.choose_target(state, card.card_id, [choice.card_id for choice in choices])
+            return next(choice for choice in choices if choice.card_id == target_id)
+        return max(choices, key=lambda card: (card.points, -card.card_id))
@@ -0,0 +1,54 @@
+# policies.py
+# Named CPU policies for headless runs (tournaments, self-play).
+# A spec is a name with an optional budget, e.g. "greedy", "random",
+# "ismcts:500" (500 playouts) or "ismcts-endgame:500".
+
+import random
+from endgame import EndgameSolver
+from ismcts import ISMCTS
+
+
+class RandomAI:
+    """Plays a random card, captures a random choice and flips a coin for koikoi."""
+
+    def __init__(self, rng=None):
+        self.rng = rng or random.Random()
+
+    def choose_play(self, game, player):
+        if not player.hand:
+            return None, None
+        card = self.rng.choice(player.hand)
+        choices = game.field.capture_choices(card)
+        return card, self.rng.choice(choices) if choices else None
+
+    def choose_capture(self, game, player, card, choices):
+        return self.rng.choice(choices)
+
+    def choose_koikoi(self, game, player):
+        return self.rng.random() < 0.5
+
+    def close(self):
+        pass
+
+
+def create_ai(spec, seed=None):
+    """
+    Returns the Player.ai object for a policy spec (None for the built-in
+    greedy heuristic). Search policies use playout budgets rather than time
+    limits, so the same seed always gives the same game.
+    """
+    name, _, budget = spec.partition(':')
+    rng = random.Random(seed)
+    if name == 'greedy':
+        return None
+    if name == 'random':
+        return RandomAI(rng)
+    if name in ('ismcts', 'ismcts-endgame'):
+        playouts = int(budget) if budget else 500
+        endgame = None
+        if name == 'ismcts-endgame':
+            # Enumerate or sample a fixed number of determinizations instead of using the clock
+            endgame = EndgameSolver(time_limit=None, max_determinizations=playouts,
+                                    rng=random.Random(rng.getrandbits(64)))
+        return ISMCTS(time_limit=None, max_playouts=playouts, rng=rng, endgame=endgame)
+    raise ValueError(f"Unknown policy '{spec}'")
@@ -0,0 +1,208 @@
+# selfplay.py
+# Headless self-play that exports every decision point as a training dataset.
+# Usage: python koikoi/selfplay.py dataset/ --games 1000 --policies greedy greedy --workers 4 --seed 1
+#
+# Each worker process plays its share of the games on GameControllers. A
+# PositionCollector takes the place of the GameRecorder, so it sees every
+# play, capture choice and koikoi call just before it is applied and encodes
+# the position with features.encode_decision. Rows wait until their round
+# ends to get its outcome, then go to a ShardWriter that fills preallocated
+# column arrays and writes them out as a compressed .npz shard whenever
+# they are full. A worker never holds more than one shard and one round.
+# Games are seeded from --seed and their index, like tournament.py, so the
+# same run gives the same rows however many workers play it.
+
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from features import COLUMNS, DECISION_PLAY, DECISION_CAPTURE, DECISION_KOIKOI, NO_TARGET, encode_decision
+from game_controller import GameController
+from player import Player
+from policies import create_ai
+from simulation import play_game
+
+SHARD_ROWS = 1 << 16
+_SEAT = list(COLUMNS).index('seat')
+_OUTCOME = list(COLUMNS).index('outcome')
+_GAME = list(COLUMNS).index('game')
+
+
+def game_seed(base_seed, game_index):
+    """Seed for one game, independent of which worker plays it."""
+    return (base_seed << 32) + game_index
+
+
+class ShardWriter:
+    """
+    Buffers rows in preallocated column arrays and writes each full buffer
+    to `<directory>/<prefix>-<n>.npz`. close() writes the last partial shard.
+    """
+
+    def __init__(self, directory, prefix, shard_rows=SHARD_ROWS):
+        self.directory = directory
+        self.prefix = prefix
+        self.shard_rows = shard_rows
+        self.columns = {name: np.zeros((shard_rows, width) if width > 1 else shard_rows, dtype)
+                        for name, (dtype, width) in COLUMNS.items()}
+        self.rows = 0  # Rows in the buffer
+        self.total = 0  # Rows written or buffered
+        self.paths = []
+
+    def extend(self, rows):
+        """Adds rows, tuples in COLUMNS order, one column at a time."""
+        while rows:
+            count = min(len(rows), self.shard_rows - self.rows)
+            batch, rows = rows[:count], rows[count:]
+            start, end = self.rows, self.rows + count
+            for (name, column), values in zip(self.columns.items(), zip(*batch)):
+                if name == 'cards':
+                    column[start:end] = np.frombuffer(b"".join(values), np.uint8).reshape(count, -1)
+                else:
+                    column[start:end] = values
+            self.rows = end
+            self.total += count
+            if self.rows == self.shard_rows:
+                self.flush()
+
+    def flush(self):
+        """Writes the buffered rows as the next shard, if there are any."""
+        if not self.rows:
+            return
+        path = os.path.join(self.directory, f"{self.prefix}-{len(self.paths):05d}.npz")
+        np.savez_compressed(path, **{name: column[:self.rows] for name, column in self.columns.items()})
+        self.paths.append(path)
+        self.rows = 0
+
+    def close(self):
+        self.flush()
+
+
+class PositionCollector:
+    """
+    A GameController recorder that encodes each decision instead of
+    writing it down. Rows of the round in progress are kept until the next
+    deal or the end of the game, when the round's points are known.
+    """
+
+    def __init__(self, game, writer, game_index=0):
+        self.game = game
+        self.writer = writer
+        self.game_index = game_index
+        self.round_rows = []
+        self.round_start_scores = (0, 0)
+        game.recorder = self
+
+    def _finish_round(self):
+        scores = (self.game.player.total_score, self.game.cpu.total_score)
+        gained = (scores[0] - self.round_start_scores[0], scores[1] - self.round_start_scores[1])
+        for row in self.round_rows:
+            seat = row[_SEAT]
+            row[_OUTCOME] = gained[seat] - gained[1 - seat]
+            row[_GAME] = self.game_index
+        self.writer.extend(self.round_rows)
+        self.round_rows = []
+        self.round_start_scores = scores
+
+    def _add(self, decision, action, target=NO_TARGET):
+        self.round_rows.append(list(encode_decision(self.game, decision, action, target)))
+
+    # GameRecorder interface
+    def start_game(self, first_parent):
+        self.round_start_scores = (self.game.player.total_score, self.game.cpu.total_score)
+
+    def deal(self, card_ids):
+        self._finish_round()
+
+    def play(self, card_id, target_id):
+        self._add(DECISION_PLAY, card_id, NO_TARGET if target_id is None else target_id)
+
+    def capture(self, card_id):
+        self._add(DECISION_CAPTURE, card_id)
+
+    def koikoi(self, koikoi):
+        self._add(DECISION_KOIKOI, int(koikoi))
+
+    def end_game(self, player_score, cpu_score):
+        self._finish_round()
+
+
+def generate_part(directory, part, first_game, num_games, policies=("greedy", "greedy"), seed=0,
+                  shard_rows=SHARD_ROWS):
+    """
+    Worker entry point: plays games first_game .. first_game + num_games - 1
+    into shards named part-<part>-<n>.npz. Returns (positions, shard paths).
+    """
+    writer = ShardWriter(directory, f"part-{part:04d}", shard_rows)
+    for game_index in range(first_game, first_game + num_games):
+        rng = random.Random(game_seed(seed, game_index))
+        players = [Player(spec, is_cpu=True, ai=create_ai(spec, rng.getrandbits(64))) for spec in policies]
+        game = GameController(*players, rng=random.Random(rng.getrandbits(64)))
+        PositionCollector(game, writer, game_index)
+        try:
+            play_game(game)
+        finally:
+            for player in players:
+                if player.ai is not None:
+                    player.ai.close()
+    writer.close()
+    return writer.total, writer.paths
+
+
+def generate(directory, num_games, policies=("greedy", "greedy"), workers=1, seed=0,
+             games_per_part=250, shard_rows=SHARD_ROWS):
+    """
+    Plays num_games self-play games into shards under directory.
+    Returns (positions, shard paths, elapsed seconds).
+    """
+    start = time.perf_counter()
+    os.makedirs(directory, exist_ok=True)
+    parts = [(directory, part, first, min(games_per_part, num_games - first), policies, seed, shard_rows)
+             for part, first in enumerate(range(0, num_games, games_per_part))]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(generate_part, *zip(*parts)))
+    else:
+        results = [generate_part(*args) for args in parts]
+    positions = sum(total for total, _ in results)
+    paths = [path for _, part_paths in results for path in part_paths]
+    return positions, paths, time.perf_counter() - start
+
+
+def load_dataset(paths):
+    """Concatenates the columns of some shards into one dict of arrays."""
+    shards = []
+    for path in paths:
+        with np.load(path) as shard:
+            shards.append({name: shard[name] for name in COLUMNS})
+    return {name: np.concatenate([shard[name] for shard in shards]) for name in COLUMNS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export self-play decision points as .npz shards")
+    parser.add_argument("directory")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--policies", nargs=2, default=["greedy", "greedy"], help="Policy specs of the two seats")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes")
+    parser.add_argument("--seed", type=int, default=0, help="Base seed for every game")
+    parser.add_argument("--games-per-part", type=int, default=250,
+                        help="Games played by one worker task, each writing its own shards")
+    parser.add_argument("--shard-rows", type=int, default=SHARD_ROWS, help="Positions per shard")
+    args = parser.parse_args()
+    for spec in args.policies:
+        try:
+            create_ai(spec)
+        except ValueError as e:
+            parser.error(str(e))
+
+    positions, paths, elapsed = generate(args.directory, args.games, args.policies, args.workers, args.seed,
+                                         args.games_per_part, args.shard_rows)
+    size = sum(os.path.getsize(path) for path in paths)
+    print(f"Wrote {positions:,} positions from {args.games} games to {len(paths)} shards "
+          f"({size / 1e6:.1f} MB) in {elapsed:.1f}s: {positions / elapsed:,.0f} positions/second")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# simulation.py
+# Plays complete games without a display, for testing and analysis.
+# Usage: python koikoi/simulation.py [num_games] [--bitboard]
+
+import random
+import sys
+import time
+from constants import *
+from bitboard import BitboardState, greedy_move, NUM_CARDS
+from game_controller import GameController
+from player import Player
+
+
+def create_headless_game():
+    """Creates a controller where both seats are played by the CPU AI."""
+    return GameController(Player("CPU 1", is_cpu=True), Player("CPU 2", is_cpu=True))
+
+
+def play_turn(game):
+    """Lets the current player choose and play a card."""
+    player = game.current_player
+    card, target = game.choose_ai_play(player)
+    if card:
+        game.execute_turn(card, target)
+    else:
+        game.switch_turns()
+
+
+def play_game(game):
+    """Plays a full 12-month game and returns the number of rounds played."""
+    game.start_game()
+    rounds = 0
+    while game.game_state != GAME_STATE_GAME_END:
+        if game.game_state in (GAME_STATE_PLAYER_TURN, GAME_STATE_CPU_TURN):
+            play_turn(game)
+        elif game.game_state == GAME_STATE_ROUND_END:
+            rounds += 1
+            game.next_round()
+        else:
+            raise RuntimeError(f"Unexpected state in headless game: {game.game_state}")
+    return rounds
+
+
+def run_simulation(num_games):
+    """Plays num_games games and returns (rounds played, elapsed seconds)."""
+    total_rounds = 0
+    start = time.perf_counter()
+    for _ in range(num_games):
+        total_rounds += play_game(create_headless_game())
+    return total_rounds, time.perf_counter() - start
+
+
+def play_bitboard_round(state, policy=greedy_move):
+    """Plays a BitboardState to the end of the round with the given policy."""
+    while not state.is_terminal():
+        state.apply(policy(state))
+    return state
+
+
+def run_bitboard_simulation(num_games):
+    """
+    Same as run_simulation on the bitboard backend. The parent rotates like
+    GameController.next_round; scores are not kept.
+    """
+    start = time.perf_counter()
+    deck = list(range(NUM_CARDS))
+    for _ in range(num_games):
+        parent = random.randrange(2)
+        for _ in range(12):
+            random.shuffle(deck)
+            state = play_bitboard_round(BitboardState.deal(deck, parent))
+            parent = state.winner
+    return num_games * 12, time.perf_counter() - start
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    num_games = int(args[0]) if args else 1000
+    if "--bitboard" in sys.argv:
+        rounds, elapsed = run_bitboard_simulation(num_games)
+    else:
+        rounds, elapsed = run_simulation(num_games)
+    print(f"Games: {num_games}  Rounds: {rounds}  Time: {elapsed:.2f}s")
+    print(f"Rounds per minute: {rounds / elapsed * 60:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# symmetry.py
+# Interchangeable cards.
+#
+# Cards with the same CARD_DATA entry (the two kasu of January to October and
+# the three of December) match and score identically, so positions and moves
+# that only differ in which of them is where are the same. Each card id maps
+# to its kind, the lowest id with the same data (bitboard.CARD_KINDS).
+#
+# Positions map to a class with position_class(); Zobrist keys give every
+# position of a class the same key (see zobrist.py). Moves map to a class
+# with canonical_move() and back onto a concrete state with concrete_move(),
+# so a search tree or table built on one position can be reused on any
+# position of its class. BitboardState.legal_moves already offers only one
+# card of each kind per hand.
+
+from bitboard import (CARD_KINDS, NUM_CARDS, PHASE_PLAY, PHASE_DRAW, mask_to_ids,
+                      play_move, move_card, move_target)
+
+# KIND_MASKS[kind] holds every card of that kind (0 for ids that are not a kind)
+KIND_MASKS = tuple(sum(1 << card_id for card_id in range(NUM_CARDS) if CARD_KINDS[card_id] == kind)
+                   for kind in range(NUM_CARDS))
+
+
+def kinds(card_ids):
+    """The kinds of some cards as a sorted tuple (a multiset), usable as a key."""
+    return tuple(sorted(CARD_KINDS[card_id] for card_id in card_ids))
+
+
+def position_class(state):
+    """
+    A hashable value shared by exactly the BitboardStates that only differ
+    by swapping interchangeable cards. Scores are left out, like Zobrist keys.
+    """
+    return (kinds(mask_to_ids(state.hands[0])), kinds(mask_to_ids(state.hands[1])),
+            kinds(mask_to_ids(state.captured[0])), kinds(mask_to_ids(state.captured[1])),
+            kinds(mask_to_ids(state.field)),
+            tuple(CARD_KINDS[card_id] for card_id in state.deck[state.deck_pos:]),
+            None if state.pending is None else CARD_KINDS[state.pending],
+            state.current, state.parent, state.koikoied[0], state.koikoied[1], state.phase)
+
+
+def canonical_move(state, move):
+    """The class of a legal move in state: its card ids replaced by their kinds."""
+    if state.phase == PHASE_PLAY:
+        target = move_target(move)
+        return play_move(CARD_KINDS[move_card(move)], None if target is None else CARD_KINDS[target])
+    if state.phase == PHASE_DRAW:
+        return CARD_KINDS[move]
+    return move
+
+
+def concrete_move(state, move):
+    """
+    The move of class `move` (from canonical_move) that is legal in state,
+    or None if there is none. Cards of the same kind are equivalent, so the
+    lowest id of each kind is used.
+    """
+    if state.phase == PHASE_PLAY:
+        cards = state.hands[state.current] & KIND_MASKS[move_card(move)]
+        if not cards:
+            return None
+        card_id = (cards & -cards).bit_length() - 1
+        target = move_target(move)
+        if target is None:
+            return card_id
+        targets = state.field & KIND_MASKS[target]
+        if not targets:
+            return None
+        return play_move(card_id, (targets & -targets).bit_length() - 1)
+    if state.phase == PHASE_DRAW:
+        targets = state.field & KIND_MASKS[move]
+        return (targets & -targets).bit_length() - 1 if targets else None
+    return move
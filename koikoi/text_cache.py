@@ -0,0 +1,42 @@
+# text_cache.py
+# Caches rendered text surfaces so unchanged HUD and dialog text is not
+# re-rendered every frame.
+
+from collections import OrderedDict
+
+
+class TextCache:
+    """
+    Least-recently-used cache of font.render results, keyed by
+    (font, text, color, antialias). A string is rendered again only when
+    it changes or after it has been evicted.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, antialias=True):
+        """Returns the surface for text, rendering it on a miss."""
+        key = (font, text, color, antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+
+    def stats(self):
+        """Counters for checking how often text is re-rendered."""
+        return {'size': len(self.surfaces), 'max_size': self.max_size,
+                'hits': self.hits, 'misses': self.misses}
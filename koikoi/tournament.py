@@ -0,0 +1,181 @@
+# tournament.py
+# Round-robin tournament between CPU policies, played headless.
+# Usage: python koikoi/tournament.py greedy random ismcts:200 --games 50 --workers 4 --seed 1
+#
+# Every match is a full 12-month game driven through GameController.start_game
+# and next_round. Each match gets its own seed, used for the deal and for the
+# policies, so a tournament can be replayed exactly regardless of how matches
+# are spread over the worker processes. Results are applied in match order.
+
+import argparse
+import itertools
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from game_controller import GameController
+from player import Player
+from policies import create_ai
+from simulation import play_game
+
+ELO_START = 1500.0
+ELO_K = 16.0
+Z_95 = 1.96
+
+
+def match_seed(base_seed, match_index):
+    """Seed for one match, independent of scheduling."""
+    return (base_seed << 32) + match_index
+
+
+def play_match(match_index, first, second, seed):
+    """
+    Plays one game with `first` in the GameController.player seat.
+    Returns (match_index, first, second, first_score, second_score).
+    """
+    rng = random.Random(seed)
+    ai_first = create_ai(first, rng.getrandbits(64))
+    ai_second = create_ai(second, rng.getrandbits(64))
+    game = GameController(Player(first, is_cpu=True, ai=ai_first),
+                          Player(second, is_cpu=True, ai=ai_second),
+                          rng=random.Random(rng.getrandbits(64)))
+    try:
+        play_game(game)
+    finally:
+        for ai in (ai_first, ai_second):
+            if ai is not None:
+                ai.close()
+    return match_index, first, second, game.player.total_score, game.cpu.total_score
+
+
+def schedule(policies, games_per_pair):
+    """Round robin; each pair plays games_per_pair games, swapping seats every game."""
+    matches = []
+    for a, b in itertools.combinations(policies, 2):
+        for game in range(games_per_pair):
+            matches.append((a, b) if game % 2 == 0 else (b, a))
+    return matches
+
+
+def wilson_interval(successes, trials, z=Z_95):
+    """Wilson score interval for a proportion; draws count as half a success."""
+    if trials == 0:
+        return 0.0, 1.0
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    centre = (p + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+def elo_difference(score):
+    """Elo gap implied by an expected score against the field."""
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return 0.0 - 400 * math.log10(1 / score - 1)  # 0.0 - avoids printing -0
+
+
+class Standings:
+    """Accumulates results, Elo ratings and win rates as matches complete."""
+
+    def __init__(self, policies):
+        self.policies = list(policies)
+        self.elo = dict.fromkeys(policies, ELO_START)
+        self.record = {p: [0, 0, 0] for p in policies}  # wins, losses, draws
+        self.pairs = {}  # (a, b) -> [a wins, b wins, draws]
+        self.games = 0
+
+    def add(self, first, second, first_score, second_score):
+        if first_score > second_score:
+            result = 1.0
+        elif first_score < second_score:
+            result = 0.0
+        else:
+            result = 0.5
+
+        expected = 1 / (1 + 10 ** ((self.elo[second] - self.elo[first]) / 400))
+        self.elo[first] += ELO_K * (result - expected)
+        self.elo[second] -= ELO_K * (result - expected)
+
+        for policy, outcome in ((first, result), (second, 1 - result)):
+            self.record[policy][0 if outcome == 1 else 1 if outcome == 0 else 2] += 1
+        a, b = sorted((first, second))
+        pair = self.pairs.setdefault((a, b), [0, 0, 0])
+        a_result = result if a == first else 1 - result
+        pair[0 if a_result == 1 else 1 if a_result == 0 else 2] += 1
+        self.games += 1
+
+    def report(self):
+        """Returns the standings and head-to-head tables as text."""
+        lines = [f"After {self.games} games",
+                 f"{'Policy':<20} {'Elo':>6} {'W':>5} {'L':>5} {'D':>5} {'Score':>6}  95% CI      Elo vs field (95% CI)"]
+        for policy in sorted(self.policies, key=self.elo.get, reverse=True):
+            wins, losses, draws = self.record[policy]
+            played = wins + losses + draws
+            score = (wins + draws / 2) / played if played else 0.0
+            low, high = wilson_interval(wins + draws / 2, played)
+            lines.append(f"{policy:<20} {self.elo[policy]:6.0f} {wins:5d} {losses:5d} {draws:5d} {score:6.1%}"
+                         f"  {low:5.1%}-{high:5.1%}  {elo_difference(score):+5.0f} "
+                         f"({elo_difference(low):+.0f} to {elo_difference(high):+.0f})")
+        lines.append("Head to head (row policy's score)")
+        for (a, b), (a_wins, b_wins, draws) in sorted(self.pairs.items()):
+            played = a_wins + b_wins + draws
+            low, high = wilson_interval(a_wins + draws / 2, played)
+            lines.append(f"  {a} vs {b}: {a_wins}-{b_wins}-{draws}  "
+                         f"{(a_wins + draws / 2) / played:.1%} ({low:.1%}-{high:.1%})")
+        return "\n".join(lines)
+
+
+def run_tournament(policies, games_per_pair, workers=1, seed=0, report_every=0, out=print):
+    """Plays the tournament and returns the final Standings."""
+    matches = schedule(policies, games_per_pair)
+    standings = Standings(policies)
+    pending = {}  # Results that finished ahead of an earlier match
+    next_index = 0
+
+    def apply_ready():
+        nonlocal next_index
+        while next_index in pending:
+            standings.add(*pending.pop(next_index))
+            next_index += 1
+            if report_every and next_index % report_every == 0 and next_index < len(matches):
+                out(standings.report())
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(play_match, i, a, b, match_seed(seed, i))
+                       for i, (a, b) in enumerate(matches)]
+            for future in as_completed(futures):
+                index, *result = future.result()
+                pending[index] = result
+                apply_ready()
+    else:
+        for i, (a, b) in enumerate(matches):
+            index, *result = play_match(i, a, b, match_seed(seed, i))
+            pending[index] = result
+            apply_ready()
+
+    out(standings.report())
+    return standings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Round-robin tournament between CPU policies")
+    parser.add_argument("policies", nargs="+",
+                        help="Policy specs: greedy, random, ismcts[:playouts], ismcts-endgame[:playouts]")
+    parser.add_argument("--games", type=int, default=20, help="Games per pair of policies")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes")
+    parser.add_argument("--seed", type=int, default=0, help="Base seed for every match")
+    parser.add_argument("--report-every", type=int, default=0,
+                        help="Print standings every N games (0: only at the end)")
+    args = parser.parse_args()
+    if len(set(args.policies)) != len(args.policies) or len(args.policies) < 2:
+        parser.error("give at least two distinct policies")
+    for spec in args.policies:
+        try:
+            create_ai(spec)
+        except ValueError as e:
+            parser.error(str(e))
+    run_tournament(args.policies, args.games, args.workers, args.seed, args.report_every)
+
+
+if __name__ == "__main__":
+    main()
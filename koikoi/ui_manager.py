@@ -1,85 +1,272 @@
 # ui_manager.py
 # Handles all rendering and user input.
 
+import weakref
 import pygame
 from constants import *
+from card import Card, CARD_DATA
+from card_sprites import create_card_image, preload_card_images, sprite_key
+from text_cache import TextCache
+from yaku_odds import completion_odds, koikoi_advice
+
+# Captured cards are drawn at half size
+PILE_CARD_SIZE = (CARD_WIDTH // 2, CARD_HEIGHT // 2)
+# Room for the 36 distinct sprites at a few scales
+THUMBNAIL_CACHE_SIZE = 128
+
+# Scrub bar of the replay viewer, in the info area below the HUD
+REPLAY_BAR = pygame.Rect(SCREEN_WIDTH - 250, 265, 220, 14)
+# Yaku odds shown by the koikoi hint, most likely first
+HINT_YAKU = 3
+
+_UNDRAWN = object()  # Signature of a component that has not been drawn yet
+
+
+def _merge_rects(rects):
+    """Unions overlapping rects so no area is repainted twice."""
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        i = 0
+        while i < len(merged):
+            if rect.colliderect(merged[i]):
+                rect.union_ip(merged.pop(i))
+                i = 0
+            else:
+                i += 1
+        merged.append(rect)
+    return merged
 
 class UIManager:
-    def __init__(self, screen, game_controller):
+    def __init__(self, screen, game_controller, replay=None, hints=False):
         self.screen = screen
         self.game_controller = game_controller
+        # A game_record.ReplayIndex to scrub through instead of playing; game_controller is replaced on seeks
+        self.replay = replay
+        self.replay_position = 0
+        self.scrubbing = False  # Mouse button held down on the scrub bar
         self.font = pygame.font.Font(None, 30)
         self.small_font = pygame.font.Font(None, 24)
+        self.text = TextCache()
+        self.overlay = None  # Dimming layer behind the dialogs, created on first use
+        # Dirty-rectangle state: (name, signature, draw) in back-to-front order
+        self.components = [
+            ('field', self._field_signature, self.draw_field),
+            ('player_hand', self._player_hand_signature, self.draw_player_hand),
+            ('cpu_hand', self._cpu_hand_signature, self.draw_cpu_hand),
+            ('captured', self._captured_signature, self.draw_captured_piles),
+            ('deck', self._deck_signature, self.draw_deck),
+            ('capture', self._capture_signature, self.draw_capture_choice),
+            ('hud', self._hud_signature, self.draw_ui_elements),
+            ('dialog', self._dialog_signature, self.draw_dialogs),
+        ]
+        if hints:
+            # Yaku odds under the koikoi dialog
+            self.components.append(('hint', self._hint_signature, self.draw_koikoi_hint))
+        if replay is not None:
+            self.components.append(('replay', self._replay_signature, self.draw_replay_bar))
+        self.signatures = {}  # name -> signature at the last draw
+        self.bounds = {}  # name -> Rect covering everything it drew, or None
+        self.drawn = None  # Bounds of the component being drawn
+        self.full_redraw = True
         self.hovered_card = None
+        # Keyed weakly so the cards of finished rounds can be freed
+        self.card_rects = weakref.WeakKeyDictionary()  # Card -> on-screen rect from the last draw
+        self.thumbnails = {}  # (sprite key, size) -> (base surface, scaled surface)
+        preload_card_images()
+        for card_id, (month, name, category, points) in enumerate(CARD_DATA):
+            self.get_card_thumbnail(Card(month, category, name, points, card_id))
+
+    def get_card_image(self, card):
+        """Returns the shared surface for a card."""
+        return create_card_image(card)
+
+    def get_card_thumbnail(self, card, size=PILE_CARD_SIZE):
+        """
+        Returns the card's sprite scaled to size. Scaled copies are kept until
+        the base sprite they came from is replaced.
+        """
+        base = create_card_image(card)
+        key = (sprite_key(card), size)
+        entry = self.thumbnails.get(key)
+        if entry is not None and entry[0] is base:
+            return entry[1]
+        if entry is None and len(self.thumbnails) >= THUMBNAIL_CACHE_SIZE:
+            del self.thumbnails[next(iter(self.thumbnails))]  # Oldest entry
+        thumbnail = pygame.transform.scale(base, size)
+        self.thumbnails[key] = (base, thumbnail)
+        return thumbnail
+
+    def draw_card(self, card, topleft):
+        """Draws a card at the given position and remembers its rect."""
+        image = self.get_card_image(card)
+        rect = image.get_rect(topleft=topleft)
+        self.card_rects[card] = rect
+        self.blit(image, rect)
+        return rect
+
+    def blit(self, surface, position):
+        """Blits onto the screen and adds the area to the component being drawn."""
+        self._touch(pygame.Rect(position[0], position[1], *surface.get_size()))
+        return self.screen.blit(surface, position)
+
+    def draw_rect(self, color, rect, width=0):
+        """Draws a rectangle on the screen and adds it to the component being drawn."""
+        self._touch(pygame.Rect(rect))
+        return pygame.draw.rect(self.screen, color, rect, width)
+
+    def _touch(self, rect):
+        # Unclipped bounds, so they are the same whatever clip a redraw uses
+        rect = rect.clip(self.screen.get_rect())
+        if rect.width and rect.height:
+            self.drawn = rect if self.drawn is None else self.drawn.union(rect)
+
+    def _draw_component(self, name, draw):
+        self.drawn = None
+        draw()
+        self.bounds[name] = self.drawn
+        return self.drawn
+
+    def invalidate(self):
+        """Forces the next draw() to repaint the whole screen."""
+        self.full_redraw = True
 
     def draw(self):
-        """Draws the entire game state to the screen."""
-        self.screen.fill(GREEN)
-        self.draw_field()
-        self.draw_player_hand()
-        self.draw_cpu_hand()
-        self.draw_captured_piles()
-        self.draw_deck()
-        self.draw_ui_elements()
+        """
+        Redraws the parts of the screen that changed since the last call and
+        returns their rects, for pygame.display.update.
+
+        A component is redrawn when its signature changes. The area it covered
+        before and the area it covers now are filled with the table colour,
+        and every component is drawn again clipped to that area, so
+        overlapping components stay stacked in the right order.
+        """
+        dirty = []
+        if self.full_redraw:
+            self.full_redraw = False
+            dirty.append(self.screen.get_rect())
+        for name, signature, draw in self.components:
+            value = signature()
+            if value == self.signatures.get(name, _UNDRAWN):
+                continue
+            self.signatures[name] = value
+            if not dirty or dirty[0] != self.screen.get_rect():
+                old = self.bounds.get(name)
+                if old is not None:
+                    dirty.append(old)
+                # Drawing it unclipped finds its new bounds; the area is repainted below anyway
+                new = self._draw_component(name, draw)
+                if new is not None:
+                    dirty.append(new)
+        if not dirty:
+            return []
+
+        dirty = _merge_rects(dirty)
+        for rect in dirty:
+            self.screen.set_clip(rect)
+            self.screen.fill(GREEN)
+            for name, _, draw in self.components:
+                self._draw_component(name, draw)
+        self.screen.set_clip(None)
+        return dirty
+
+    # What each component's drawing depends on; cards compare by identity
+    def _field_signature(self):
+        return tuple(self.game_controller.field.cards), tuple(self.player_capture_choices())
+
+    def _player_hand_signature(self):
+        return tuple(self.game_controller.player.hand), self.hovered_card
+
+    def _cpu_hand_signature(self):
+        return len(self.game_controller.cpu.hand)
+
+    def _captured_signature(self):
+        return tuple(self.game_controller.player.captured_cards), tuple(self.game_controller.cpu.captured_cards)
+
+    def _deck_signature(self):
+        return len(self.game_controller.deck.cards)
+
+    def _capture_signature(self):
+        gc = self.game_controller
+        return gc.pending_capture if self.player_capture_choices() else None
+
+    def _hud_signature(self):
+        gc = self.game_controller
+        return (gc.current_player.name if gc.current_player else None, gc.game_state, gc.current_month,
+                gc.player.total_score, gc.cpu.total_score,
+                tuple(gc.player.yaku_list), tuple(gc.cpu.yaku_list), gc.is_cpu_thinking())
+
+    def _dialog_signature(self):
+        gc = self.game_controller
+        winner = gc.winner_of_round
+        return (gc.game_state, self.is_player_koikoi_choice(), gc.current_month, winner.name if winner else None,
+                winner.monthly_score if winner else None, gc.player.total_score, gc.cpu.total_score)
+
+    def _hint_signature(self):
+        return self.game_controller.position_hash() if self.is_player_koikoi_choice() else None
+
+    def _replay_signature(self):
+        return self.replay_position
 
     def draw_layout_areas(self):
         """Draws rectangles for the different game areas for clarity."""
         # Optional: for debugging layout
-        pygame.draw.rect(self.screen, (0, 80, 0), (50, 50, 700, 200), 2) # CPU Area
-        pygame.draw.rect(self.screen, (0, 80, 0), (50, 300, 700, 250), 2) # Field Area
-        pygame.draw.rect(self.screen, (0, 80, 0), (50, SCREEN_HEIGHT - 220, 700, 200), 2) # Player Area
-        pygame.draw.rect(self.screen, (0, 80, 0), (SCREEN_WIDTH - 220, 50, 200, SCREEN_HEIGHT - 100), 2) # Info Area
+        self.draw_rect((0, 80, 0), (50, 50, 700, 200), 2) # CPU Area
+        self.draw_rect((0, 80, 0), (50, 300, 700, 250), 2) # Field Area
+        self.draw_rect((0, 80, 0), (50, SCREEN_HEIGHT - 220, 700, 200), 2) # Player Area
+        self.draw_rect((0, 80, 0), (SCREEN_WIDTH - 220, 50, 200, SCREEN_HEIGHT - 100), 2) # Info Area
 
     def draw_field(self):
         """Draws the cards on the field."""
         if not self.game_controller.field.cards:
             # Draw placeholder for empty field
             field_rect = pygame.Rect(100, 250, 600, 200)
-            pygame.draw.rect(self.screen, (0, 80, 0), field_rect, 2)
-            empty_text = self.small_font.render("Field (Empty)", True, WHITE)
-            self.screen.blit(empty_text, (field_rect.x + 10, field_rect.y + 10))
+            self.draw_rect((0, 80, 0), field_rect, 2)
+            empty_text = self.text.render(self.small_font, "Field (Empty)", WHITE)
+            self.blit(empty_text, (field_rect.x + 10, field_rect.y + 10))
             return
-            
+
+        choices = self.player_capture_choices()
         for i, card in enumerate(self.game_controller.field.cards):
             x = 100 + (i % 8) * (CARD_WIDTH * 0.8)
             y = 250 + (i // 8) * (CARD_HEIGHT * 0.6)
-            card.rect.topleft = (x, y)
-            card.draw(self.screen)
+            rect = self.draw_card(card, (x, y))
+            if card in choices:
+                self.draw_rect((255, 255, 0), rect, 3) # Highlight the cards the player can capture
 
     def draw_player_hand(self):
         """Draws the human player's hand."""
         hand_width = len(self.game_controller.player.hand) * (CARD_WIDTH + 10)
         start_x = (SCREEN_WIDTH - hand_width) / 2
         for i, card in enumerate(self.game_controller.player.hand):
-            card.rect.topleft = (start_x + i * (CARD_WIDTH + 10), SCREEN_HEIGHT - CARD_HEIGHT - 20)
-            card.draw(self.screen)
+            rect = self.draw_card(card, (start_x + i * (CARD_WIDTH + 10), SCREEN_HEIGHT - CARD_HEIGHT - 20))
             if card == self.hovered_card:
-                pygame.draw.rect(self.screen, (255, 255, 0), card.rect, 3) # Highlight hovered card
+                self.draw_rect((255, 255, 0), rect, 3) # Highlight hovered card
 
     def draw_cpu_hand(self):
         """Draws the CPU's hand (face down)."""
         hand_width = len(self.game_controller.cpu.hand) * (CARD_WIDTH + 10)
         start_x = (SCREEN_WIDTH - hand_width) / 2
         for i, card in enumerate(self.game_controller.cpu.hand):
-             pygame.draw.rect(self.screen, CARD_BACK_COLOR, (start_x + i * (CARD_WIDTH + 10), 20, CARD_WIDTH, CARD_HEIGHT))
-             pygame.draw.rect(self.screen, BLACK, (start_x + i * (CARD_WIDTH + 10), 20, CARD_WIDTH, CARD_HEIGHT), 2)
+             self.draw_rect(CARD_BACK_COLOR, (start_x + i * (CARD_WIDTH + 10), 20, CARD_WIDTH, CARD_HEIGHT))
+             self.draw_rect(BLACK, (start_x + i * (CARD_WIDTH + 10), 20, CARD_WIDTH, CARD_HEIGHT), 2)
 
-    def _draw_card_pile(self, surface, cards, position, title):
+    def _draw_card_pile(self, cards, position, title):
         """Helper to draw a pile of captured cards."""
         # Use small font for these titles to save space
-        title_text = self.small_font.render(title, True, WHITE)
-        surface.blit(title_text, (position[0], position[1]))
+        title_text = self.text.render(self.small_font, title, WHITE)
+        self.blit(title_text, (position[0], position[1]))
 
         if not cards:
             # Draw an empty box placeholder to maintain layout
             placeholder_rect = pygame.Rect(position[0], position[1] + 25, (CARD_WIDTH // 2 + 5) * 4 - 5, CARD_HEIGHT // 2)
-            pygame.draw.rect(surface, (0, 60, 0), placeholder_rect, 1)
+            self.draw_rect((0, 60, 0), placeholder_rect, 1)
             return
 
         for i, card in enumerate(cards):
             # Display captured cards smaller and overlapping
-            card_small_img = pygame.transform.scale(card.image, (CARD_WIDTH // 2, CARD_HEIGHT // 2))
-            surface.blit(card_small_img, (position[0] + (i % 4) * (CARD_WIDTH // 2 + 5), position[1] + 25 + (i // 4) * (CARD_HEIGHT//4)))
+            card_small_img = self.get_card_thumbnail(card)
+            self.blit(card_small_img, (position[0] + (i % 4) * (CARD_WIDTH // 2 + 5), position[1] + 25 + (i // 4) * (CARD_HEIGHT//4)))
 
     def draw_captured_piles(self):
         """Draws the cards captured by each player, sorted by category."""
@@ -107,53 +294,83 @@ class UIManager:
             for i, category in enumerate(categories):
                 pos = (base_pos[0] + i * horizontal_spacing, base_pos[1])
                 title = f"{name} {category.capitalize()}"
-                self._draw_card_pile(self.screen, categorized_cards[category], pos, title)
+                self._draw_card_pile(categorized_cards[category], pos, title)
 
     def draw_deck(self):
         """Draws the deck."""
         if not self.game_controller.deck.is_empty():
             deck_pos = (SCREEN_WIDTH - CARD_WIDTH - 50, 350)
-            pygame.draw.rect(self.screen, CARD_BACK_COLOR, (*deck_pos, CARD_WIDTH, CARD_HEIGHT))
-            pygame.draw.rect(self.screen, BLACK, (*deck_pos, CARD_WIDTH, CARD_HEIGHT), 2)
-            deck_text = self.small_font.render(f"Deck: {len(self.game_controller.deck.cards)}", True, WHITE)
-            self.screen.blit(deck_text, (deck_pos[0], deck_pos[1] + CARD_HEIGHT + 5))
+            self.draw_rect(CARD_BACK_COLOR, (*deck_pos, CARD_WIDTH, CARD_HEIGHT))
+            self.draw_rect(BLACK, (*deck_pos, CARD_WIDTH, CARD_HEIGHT), 2)
+            deck_text = self.text.render(self.small_font, f"Deck: {len(self.game_controller.deck.cards)}", WHITE)
+            self.blit(deck_text, (deck_pos[0], deck_pos[1] + CARD_HEIGHT + 5))
+
+    def draw_capture_choice(self):
+        """Draws the card waiting for the player to choose what it captures."""
+        if not self.player_capture_choices():
+            return
+        card, from_hand = self.game_controller.pending_capture
+        pos = (SCREEN_WIDTH - 2 * CARD_WIDTH - 70, 350)
+        rect = self.draw_card(card, pos)
+        self.draw_rect((255, 255, 0), rect, 3)
+        label = "Played" if from_hand else "Drawn"
+        label_text = self.text.render(self.small_font, f"{label}: choose a card to capture", WHITE)
+        self.blit(label_text, (pos[0] - 40, pos[1] - 25))
 
     def draw_ui_elements(self):
         """Draws scores and game state information."""
         if self.game_controller.current_player:
             turn_text_str = f"Turn: {self.game_controller.current_player.name}"
-            turn_text = self.font.render(turn_text_str, True, WHITE)
-            self.screen.blit(turn_text, (SCREEN_WIDTH - 250, 50))
+            turn_text = self.text.render(self.font, turn_text_str, WHITE)
+            self.blit(turn_text, (SCREEN_WIDTH - 250, 50))
 
         # Display game state
-        state_text = self.small_font.render(f"State: {self.game_controller.game_state}", True, WHITE)
-        self.screen.blit(state_text, (SCREEN_WIDTH - 250, 80))
+        state_text = self.text.render(self.small_font, f"State: {self.game_controller.game_state}", WHITE)
+        self.blit(state_text, (SCREEN_WIDTH - 250, 80))
 
         # Display round info
-        round_text = self.small_font.render(f"Round: {self.game_controller.current_month}/12", True, WHITE)
-        self.screen.blit(round_text, (SCREEN_WIDTH - 250, 100))
+        round_text = self.text.render(self.small_font, f"Round: {self.game_controller.current_month}/12", WHITE)
+        self.blit(round_text, (SCREEN_WIDTH - 250, 100))
 
         # Display scores
-        player_score_text = self.small_font.render(f"Player Score: {self.game_controller.player.total_score}", True, WHITE)
-        self.screen.blit(player_score_text, (SCREEN_WIDTH - 250, 120))
+        player_score_text = self.text.render(self.small_font, f"Player Score: {self.game_controller.player.total_score}", WHITE)
+        self.blit(player_score_text, (SCREEN_WIDTH - 250, 120))
         
-        cpu_score_text = self.small_font.render(f"CPU Score: {self.game_controller.cpu.total_score}", True, WHITE)
-        self.screen.blit(cpu_score_text, (SCREEN_WIDTH - 250, 140))
+        cpu_score_text = self.text.render(self.small_font, f"CPU Score: {self.game_controller.cpu.total_score}", WHITE)
+        self.blit(cpu_score_text, (SCREEN_WIDTH - 250, 140))
 
         # Display player yaku
         if self.game_controller.player.yaku_list:
             player_yaku_str = f"Player Yaku: {[y[0] for y in self.game_controller.player.yaku_list]}"
-            player_yaku_text = self.small_font.render(player_yaku_str, True, WHITE)
-            self.screen.blit(player_yaku_text, (SCREEN_WIDTH - 250, 170))
+            player_yaku_text = self.text.render(self.small_font, player_yaku_str, WHITE)
+            self.blit(player_yaku_text, (SCREEN_WIDTH - 250, 170))
 
         # Display CPU yaku
         if self.game_controller.cpu.yaku_list:
             cpu_yaku_str = f"CPU Yaku: {[y[0] for y in self.game_controller.cpu.yaku_list]}"
-            cpu_yaku_text = self.small_font.render(cpu_yaku_str, True, WHITE)
-            self.screen.blit(cpu_yaku_text, (SCREEN_WIDTH - 250, 190))
-
-        # Draw Koikoi choice dialog
-        if self.game_controller.game_state == GAME_STATE_KOIKOI_CHOICE:
+            cpu_yaku_text = self.text.render(self.small_font, cpu_yaku_str, WHITE)
+            self.blit(cpu_yaku_text, (SCREEN_WIDTH - 250, 190))
+
+        if self.game_controller.is_cpu_thinking():
+            thinking_text = self.text.render(self.small_font, "CPU thinking... (Space: play now)", WHITE)
+            self.blit(thinking_text, (SCREEN_WIDTH - 250, 210))
+
+    def is_player_koikoi_choice(self):
+        """True when the human player has to choose koikoi or shobu."""
+        gc = self.game_controller
+        return gc.game_state == GAME_STATE_KOIKOI_CHOICE and not gc.current_player.is_cpu
+
+    def player_capture_choices(self):
+        """The field cards the human player is choosing between, or []."""
+        gc = self.game_controller
+        if gc.game_state != GAME_STATE_CAPTURE_CHOICE or gc.current_player.is_cpu:
+            return []
+        return gc.field.capture_choices(gc.pending_capture[0])
+
+    def draw_dialogs(self):
+        """Draws the dialog for the current game state, if any."""
+        # Draw Koikoi choice dialog; a CPU choosing in the background gets none
+        if self.is_player_koikoi_choice():
             self.draw_koikoi_choice()
 
         # Draw round end/game end messages
@@ -164,11 +381,15 @@ class UIManager:
 
     def handle_event(self, event):
         """Handles user input events."""
+        if self.replay is not None:
+            self.handle_replay_event(event)
+            return
         if event.type == pygame.MOUSEMOTION:
             self.hovered_card = None
             if self.game_controller.game_state == GAME_STATE_PLAYER_TURN:
                 for card in self.game_controller.player.hand:
-                    if card.rect.collidepoint(event.pos):
+                    rect = self.card_rects.get(card)
+                    if rect and rect.collidepoint(event.pos):
                         self.hovered_card = card
                         break
 
@@ -176,9 +397,17 @@ class UIManager:
             if event.button == 1 and self.hovered_card:
                 self.game_controller.player_plays_card(self.hovered_card)
                 self.hovered_card = None # Reset hover after click
-            
+
+            # Handle the choice of which field card to capture
+            elif event.button == 1:
+                for card in self.player_capture_choices():
+                    rect = self.card_rects.get(card)
+                    if rect and rect.collidepoint(event.pos):
+                        self.game_controller.player_chooses_capture(card)
+                        break
+
             # Handle Koikoi choice buttons
-            if self.game_controller.game_state == GAME_STATE_KOIKOI_CHOICE:
+            if self.is_player_koikoi_choice():
                 self.handle_koikoi_choice(event)
             
             # Handle round end/game end buttons
@@ -187,43 +416,67 @@ class UIManager:
             elif self.game_controller.game_state == GAME_STATE_GAME_END:
                 self.handle_game_end(event)
 
+    def draw_overlay(self):
+        """Dims the board behind a dialog."""
+        if self.overlay is None:
+            self.overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+            self.overlay.set_alpha(128)
+            self.overlay.fill(BLACK)
+        self.blit(self.overlay, (0, 0))
+
     def draw_koikoi_choice(self):
         """Draws the Koikoi choice dialog."""
         # Draw semi-transparent overlay
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.set_alpha(128)
-        overlay.fill(BLACK)
-        self.screen.blit(overlay, (0, 0))
+        self.draw_overlay()
         
         # Draw dialog box
         dialog_width, dialog_height = 400, 200
         dialog_x = (SCREEN_WIDTH - dialog_width) // 2
         dialog_y = (SCREEN_HEIGHT - dialog_height) // 2
         dialog_rect = pygame.Rect(dialog_x, dialog_y, dialog_width, dialog_height)
-        pygame.draw.rect(self.screen, WHITE, dialog_rect)
-        pygame.draw.rect(self.screen, BLACK, dialog_rect, 3)
+        self.draw_rect(WHITE, dialog_rect)
+        self.draw_rect(BLACK, dialog_rect, 3)
         
         # Draw text
-        yaku_text = self.font.render("You achieved a Yaku!", True, BLACK)
-        choice_text = self.font.render("Choose your action:", True, BLACK)
+        yaku_text = self.text.render(self.font, "You achieved a Yaku!", BLACK)
+        choice_text = self.text.render(self.font, "Choose your action:", BLACK)
         
-        self.screen.blit(yaku_text, (dialog_x + 20, dialog_y + 20))
-        self.screen.blit(choice_text, (dialog_x + 20, dialog_y + 60))
+        self.blit(yaku_text, (dialog_x + 20, dialog_y + 20))
+        self.blit(choice_text, (dialog_x + 20, dialog_y + 60))
         
         # Draw buttons
         self.koikoi_button = pygame.Rect(dialog_x + 50, dialog_y + 120, 120, 40)
         self.shobu_button = pygame.Rect(dialog_x + 230, dialog_y + 120, 120, 40)
         
-        pygame.draw.rect(self.screen, (100, 255, 100), self.koikoi_button)
-        pygame.draw.rect(self.screen, (255, 100, 100), self.shobu_button)
-        pygame.draw.rect(self.screen, BLACK, self.koikoi_button, 2)
-        pygame.draw.rect(self.screen, BLACK, self.shobu_button, 2)
+        self.draw_rect((100, 255, 100), self.koikoi_button)
+        self.draw_rect((255, 100, 100), self.shobu_button)
+        self.draw_rect(BLACK, self.koikoi_button, 2)
+        self.draw_rect(BLACK, self.shobu_button, 2)
         
-        koikoi_text = self.font.render("Koikoi", True, BLACK)
-        shobu_text = self.font.render("Shobu", True, BLACK)
+        koikoi_text = self.text.render(self.font, "Koikoi", BLACK)
+        shobu_text = self.text.render(self.font, "Shobu", BLACK)
         
-        self.screen.blit(koikoi_text, (self.koikoi_button.x + 25, self.koikoi_button.y + 10))
-        self.screen.blit(shobu_text, (self.shobu_button.x + 25, self.shobu_button.y + 10))
+        self.blit(koikoi_text, (self.koikoi_button.x + 25, self.koikoi_button.y + 10))
+        self.blit(shobu_text, (self.shobu_button.x + 25, self.shobu_button.y + 10))
+
+    def draw_koikoi_hint(self):
+        """Draws the odds behind the koikoi choice, below its dialog."""
+        if not self.is_player_koikoi_choice():
+            return
+        state = self.game_controller.to_bitboard()
+        koikoi, p_gain, p_threat = koikoi_advice(state, 0)
+        # Yaku still open to the player, most likely first
+        odds = sorted(((p_self, name) for name, _, p_self, _ in completion_odds(state, 0) if p_self),
+                      reverse=True)[:HINT_YAKU]
+        hint_rect = pygame.Rect((SCREEN_WIDTH - 400) // 2, (SCREEN_HEIGHT + 200) // 2 + 10, 400, 40 + 22 * len(odds))
+        self.draw_rect(WHITE, hint_rect)
+        self.draw_rect(BLACK, hint_rect, 2)
+        advice = (f"Hint: {'Koikoi' if koikoi else 'Shobu'}  (new yaku {p_gain:.0%}, "
+                  f"CPU scores {p_threat:.0%})")
+        self.blit(self.text.render(self.small_font, advice, BLACK), (hint_rect.x + 15, hint_rect.y + 10))
+        for i, (p_self, name) in enumerate(odds):
+            line = self.text.render(self.small_font, f"{name}: {p_self:.0%}", BLACK)
+            self.blit(line, (hint_rect.x + 30, hint_rect.y + 34 + 22 * i))
 
     def handle_koikoi_choice(self, event):
         """Handles clicking on Koikoi choice buttons."""
@@ -234,40 +487,37 @@ class UIManager:
 
     def draw_round_end(self):
         """Draws the round end screen."""
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.set_alpha(128)
-        overlay.fill(BLACK)
-        self.screen.blit(overlay, (0, 0))
+        self.draw_overlay()
         
         dialog_width, dialog_height = 500, 300
         dialog_x = (SCREEN_WIDTH - dialog_width) // 2
         dialog_y = (SCREEN_HEIGHT - dialog_height) // 2
         dialog_rect = pygame.Rect(dialog_x, dialog_y, dialog_width, dialog_height)
-        pygame.draw.rect(self.screen, WHITE, dialog_rect)
-        pygame.draw.rect(self.screen, BLACK, dialog_rect, 3)
+        self.draw_rect(WHITE, dialog_rect)
+        self.draw_rect(BLACK, dialog_rect, 3)
         
         # Display round results
         winner = self.game_controller.winner_of_round
         if winner:
-            winner_text = self.font.render(f"Round {self.game_controller.current_month} Winner: {winner.name}", True, BLACK)
-            score_text = self.font.render(f"Points gained: {winner.monthly_score}", True, BLACK)
+            winner_text = self.text.render(self.font, f"Round {self.game_controller.current_month} Winner: {winner.name}", BLACK)
+            score_text = self.text.render(self.font, f"Points gained: {winner.monthly_score}", BLACK)
         else:
-            winner_text = self.font.render(f"Round {self.game_controller.current_month}: Draw", True, BLACK)
-            score_text = self.font.render("No points awarded", True, BLACK)
+            winner_text = self.text.render(self.font, f"Round {self.game_controller.current_month}: Draw", BLACK)
+            score_text = self.text.render(self.font, "No points awarded", BLACK)
         
-        total_score_text = self.font.render(f"Total Scores - Player: {self.game_controller.player.total_score}, CPU: {self.game_controller.cpu.total_score}", True, BLACK)
+        total_score_text = self.text.render(self.font, f"Total Scores - Player: {self.game_controller.player.total_score}, CPU: {self.game_controller.cpu.total_score}", BLACK)
         
-        self.screen.blit(winner_text, (dialog_x + 20, dialog_y + 20))
-        self.screen.blit(score_text, (dialog_x + 20, dialog_y + 60))
-        self.screen.blit(total_score_text, (dialog_x + 20, dialog_y + 100))
+        self.blit(winner_text, (dialog_x + 20, dialog_y + 20))
+        self.blit(score_text, (dialog_x + 20, dialog_y + 60))
+        self.blit(total_score_text, (dialog_x + 20, dialog_y + 100))
         
         # Next round button
         self.next_round_button = pygame.Rect(dialog_x + 200, dialog_y + 200, 100, 40)
-        pygame.draw.rect(self.screen, (100, 255, 100), self.next_round_button)
-        pygame.draw.rect(self.screen, BLACK, self.next_round_button, 2)
+        self.draw_rect((100, 255, 100), self.next_round_button)
+        self.draw_rect(BLACK, self.next_round_button, 2)
         
-        next_text = self.font.render("Next", True, BLACK)
-        self.screen.blit(next_text, (self.next_round_button.x + 25, self.next_round_button.y + 10))
+        next_text = self.text.render(self.font, "Next", BLACK)
+        self.blit(next_text, (self.next_round_button.x + 25, self.next_round_button.y + 10))
 
     def handle_round_end(self, event):
         """Handles clicking on round end buttons."""
@@ -276,45 +526,90 @@ class UIManager:
 
     def draw_game_end(self):
         """Draws the game end screen."""
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.set_alpha(128)
-        overlay.fill(BLACK)
-        self.screen.blit(overlay, (0, 0))
+        self.draw_overlay()
         
         dialog_width, dialog_height = 500, 300
         dialog_x = (SCREEN_WIDTH - dialog_width) // 2
         dialog_y = (SCREEN_HEIGHT - dialog_height) // 2
         dialog_rect = pygame.Rect(dialog_x, dialog_y, dialog_width, dialog_height)
-        pygame.draw.rect(self.screen, WHITE, dialog_rect)
-        pygame.draw.rect(self.screen, BLACK, dialog_rect, 3)
+        self.draw_rect(WHITE, dialog_rect)
+        self.draw_rect(BLACK, dialog_rect, 3)
         
         # Display final results
-        game_end_text = self.font.render("Game Over!", True, BLACK)
+        game_end_text = self.text.render(self.font, "Game Over!", BLACK)
         player_score = self.game_controller.player.total_score
         cpu_score = self.game_controller.cpu.total_score
         
         if player_score > cpu_score:
-            winner_text = self.font.render("You Win!", True, BLACK)
+            winner_text = self.text.render(self.font, "You Win!", BLACK)
         elif cpu_score > player_score:
-            winner_text = self.font.render("CPU Wins!", True, BLACK)
+            winner_text = self.text.render(self.font, "CPU Wins!", BLACK)
         else:
-            winner_text = self.font.render("It's a Tie!", True, BLACK)
+            winner_text = self.text.render(self.font, "It's a Tie!", BLACK)
         
-        final_score_text = self.font.render(f"Final Scores - Player: {player_score}, CPU: {cpu_score}", True, BLACK)
+        final_score_text = self.text.render(self.font, f"Final Scores - Player: {player_score}, CPU: {cpu_score}", BLACK)
         
-        self.screen.blit(game_end_text, (dialog_x + 180, dialog_y + 20))
-        self.screen.blit(winner_text, (dialog_x + 180, dialog_y + 60))
-        self.screen.blit(final_score_text, (dialog_x + 50, dialog_y + 100))
+        self.blit(game_end_text, (dialog_x + 180, dialog_y + 20))
+        self.blit(winner_text, (dialog_x + 180, dialog_y + 60))
+        self.blit(final_score_text, (dialog_x + 50, dialog_y + 100))
         
         # Restart button
         self.restart_button = pygame.Rect(dialog_x + 200, dialog_y + 200, 100, 40)
-        pygame.draw.rect(self.screen, (100, 255, 100), self.restart_button)
-        pygame.draw.rect(self.screen, BLACK, self.restart_button, 2)
+        self.draw_rect((100, 255, 100), self.restart_button)
+        self.draw_rect(BLACK, self.restart_button, 2)
         
-        restart_text = self.font.render("Restart", True, BLACK)
-        self.screen.blit(restart_text, (self.restart_button.x + 15, self.restart_button.y + 10))
+        restart_text = self.text.render(self.font, "Restart", BLACK)
+        self.blit(restart_text, (self.restart_button.x + 15, self.restart_button.y + 10))
 
     def handle_game_end(self, event):
         """Handles clicking on game end buttons."""
         if hasattr(self, 'restart_button') and self.restart_button.collidepoint(event.pos):
             self.game_controller.restart_game()
+
+    # Replay viewer
+    def seek(self, position):
+        """Shows the replayed game after `position` events."""
+        position = max(0, min(position, len(self.replay)))
+        if position != self.replay_position:
+            self.replay_position = position
+            self.game_controller = self.replay.seek(position)
+            self.hovered_card = None
+
+    def draw_replay_bar(self):
+        """Draws the scrub bar and the move counter of the replay viewer."""
+        label = self.text.render(self.small_font, f"Move {self.replay_position}/{len(self.replay)}", WHITE)
+        self.blit(label, (REPLAY_BAR.x, REPLAY_BAR.y - 20))
+        self.draw_rect((0, 60, 0), REPLAY_BAR)
+        # Ticks at the checkpoints, where seeking is cheapest
+        for position in self.replay.positions:
+            x = REPLAY_BAR.x + REPLAY_BAR.width * position // len(self.replay)
+            self.draw_rect((0, 140, 0), (x, REPLAY_BAR.y, 1, REPLAY_BAR.height))
+        x = REPLAY_BAR.x + REPLAY_BAR.width * self.replay_position // max(1, len(self.replay))
+        self.draw_rect((255, 255, 0), (x - 3, REPLAY_BAR.y - 3, 6, REPLAY_BAR.height + 6))
+        self.draw_rect(BLACK, REPLAY_BAR, 1)
+        help_text = self.text.render(self.small_font, "Arrows/PgUp/PgDn/Home/End", WHITE)
+        self.blit(help_text, (REPLAY_BAR.x, REPLAY_BAR.bottom + 8))
+
+    def handle_replay_event(self, event):
+        """Scrubs through the replay with the mouse or the keyboard. The game itself takes no input."""
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and REPLAY_BAR.collidepoint(event.pos):
+            self.scrubbing = True
+            self.seek_to(event.pos[0])
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+            self.scrubbing = False
+        elif event.type == pygame.MOUSEMOTION and self.scrubbing:
+            self.seek_to(event.pos[0])
+        elif event.type == pygame.KEYDOWN:
+            steps = {pygame.K_LEFT: -1, pygame.K_RIGHT: 1,
+                     pygame.K_PAGEUP: -self.replay.interval, pygame.K_PAGEDOWN: self.replay.interval}
+            if event.key in steps:
+                self.seek(self.replay_position + steps[event.key])
+            elif event.key == pygame.K_HOME:
+                self.seek(0)
+            elif event.key == pygame.K_END:
+                self.seek(len(self.replay))
+
+    def seek_to(self, x):
+        """Seeks to the move under screen column x of the scrub bar."""
+        fraction = (x - REPLAY_BAR.x) / REPLAY_BAR.width
+        self.seek(round(fraction * len(self.replay)))
@@ -112,3 +112,109 @@ class Yaku:
     def _check_tsukimizake(self, card_names):
         """Checks for Tsukimi-de-Ippai (Moon Viewing)."""
         return {"Tsuki", "Sakazuki"}.issubset(card_names)
+
+
+# Bits for the individually named cards that yaku are built from
+_RAINMAN = 1 << 0
+_INOSHIKACHO = (1 << 1) | (1 << 2) | (1 << 3)
+_AKATAN = (1 << 4) | (1 << 5) | (1 << 6)
+_AOTAN = (1 << 7) | (1 << 8) | (1 << 9)
+_SAKAZUKI = 1 << 10
+_MAKU = 1 << 11
+_TSUKI = 1 << 12
+_HANAMI = _MAKU | _SAKAZUKI
+_TSUKIMI = _TSUKI | _SAKAZUKI
+
+_NAMED_CARD_BITS = {
+    (11, "Ono no Michikaze"): _RAINMAN,
+    (7, "Inoshishi"): 1 << 1,
+    (10, "Shika"): 1 << 2,
+    (6, "Chou"): 1 << 3,
+    (1, "Akatan"): 1 << 4,
+    (2, "Akatan"): 1 << 5,
+    (3, "Akatan"): 1 << 6,
+    (6, "Aotan"): 1 << 7,
+    (9, "Aotan"): 1 << 8,
+    (10, "Aotan"): 1 << 9,
+    (9, "Sakazuki"): _SAKAZUKI,
+    (3, "Maku"): _MAKU,
+    (8, "Tsuki"): _TSUKI,
+}
+
+
+class YakuTracker:
+    """
+    Incremental version of Yaku.check_yaku for one captured pile.
+    Each captured card updates a few counters in O(1), and yaku_list()
+    returns the same (yaku_name, points) list as check_yaku would.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forgets all captured cards (start of a new round)."""
+        self.counts = {'hikari': 0, 'tane': 0, 'tan': 0, 'kasu': 0}
+        self.named = 0  # _NAMED_CARD_BITS of the cards captured so far
+        self.yaku = []
+        self.score = 0
+
+    def add_card(self, card):
+        """Records one captured card. Returns the yaku newly satisfied by it."""
+        if card.category in self.counts:
+            self.counts[card.category] += 1
+        self.named |= _NAMED_CARD_BITS.get((card.month, card.name), 0)
+        return self._refresh()
+
+    def add_cards(self, cards):
+        """Records several captured cards. Returns the yaku newly satisfied by them."""
+        for card in cards:
+            if card.category in self.counts:
+                self.counts[card.category] += 1
+            self.named |= _NAMED_CARD_BITS.get((card.month, card.name), 0)
+        return self._refresh()
+
+    def yaku_list(self):
+        """Returns the current list of (yaku_name, points) tuples."""
+        return list(self.yaku)
+
+    def _refresh(self):
+        """Rebuilds the yaku list from the counters and returns the new entries."""
+        previous = {name for name, _ in self.yaku}
+        yaku = self._evaluate()
+        self.yaku = yaku
+        self.score = sum(points for _, points in yaku)
+        return [y for y in yaku if y[0] not in previous]
+
+    def _evaluate(self):
+        achieved_yaku = []
+        named = self.named
+        counts = self.counts
+
+        num_hikari = counts['hikari']
+        if num_hikari == 5:
+            achieved_yaku.append(("Goko", 10))
+        elif num_hikari == 4:
+            achieved_yaku.append(("Ame-Shiko", 7) if named & _RAINMAN else ("Shiko", 8))
+        elif num_hikari == 3 and not named & _RAINMAN:
+            achieved_yaku.append(("Sanko", 5))
+
+        if named & _INOSHIKACHO == _INOSHIKACHO:
+            achieved_yaku.append(("Ino-Shika-Cho", 5))
+        if named & _AKATAN == _AKATAN:
+            achieved_yaku.append(("Akatan", 5))
+        if named & _AOTAN == _AOTAN:
+            achieved_yaku.append(("Aotan", 5))
+        if named & _HANAMI == _HANAMI:
+            achieved_yaku.append(("Hanami-de-Ippai", 5))
+        if named & _TSUKIMI == _TSUKIMI:
+            achieved_yaku.append(("Tsukimi-de-Ippai", 5))
+
+        if counts['tane'] >= 5:
+            achieved_yaku.append(("Tane", 1 + (counts['tane'] - 5)))
+        if counts['tan'] >= 5:
+            achieved_yaku.append(("Tan", 1 + (counts['tan'] - 5)))
+        if counts['kasu'] >= 10:
+            achieved_yaku.append(("Kasu", 1 + (counts['kasu'] - 10)))
+
+        return achieved_yaku
@@ -0,0 +1,209 @@
+# yaku_odds.py
+# Odds of completing each yaku, from what one seat can see.
+#
+# Seen from a seat, the deck and the opponent's hand form one pool of unseen
+# cards, every split of which is equally likely. The odds come from a
+# simplified model of who ends up with which card:
+#   - each side gets the cards that pass through its hand, the ones it holds
+#     and the ones it will draw;
+#   - the seat also gets the field cards its hand can match;
+#   - any other field card goes to whichever side gets an unseen card of its
+#     month, so it counts as one more card of the pool; a field card whose
+#     month has no unseen card left is out of play.
+# Under that model the chance of a yaku is a (multivariate) hypergeometric
+# tail over the pool cards of its groups, which is computed exactly with
+# binomial coefficients rather than by sampling. The model itself is an
+# approximation: it ignores which cards the players choose to play and
+# capture. Checked against greedy play continued to the end of the round,
+# it is a little optimistic for both sides (e.g. Kasu 0.33 predicted
+# against 0.28 seen for the seat, 0.18 against 0.14 for its opponent).
+#
+# The answer only depends on a few counts per card group (captured by
+# either side, within reach, in the pool) and the number of draws left. Each
+# hypergeometric tail is cached on the cards still needed per group, the pool
+# size and the draws, which recur across yaku and positions.
+
+import math
+from functools import lru_cache
+from bitboard import (CARD_MONTHS, MONTH_MASKS, PHASE_PLAY, HIKARI_MASK, TANE_MASK, TAN_MASK, KASU_MASK,
+                      RAINMAN_MASK, INOSHIKACHO_MASK, AKATAN_MASK, AOTAN_MASK, SAKAZUKI_MASK, MAKU_MASK,
+                      TSUKI_MASK, mask_to_ids)
+
+BRIGHTS_MASK = HIKARI_MASK & ~RAINMAN_MASK  # The four hikari other than the Rainman
+
+# (name, points, ((card mask, cards needed from it), ...)) with the names and
+# points of Yaku.check_yaku. Each yaku is reached once a pile holds enough
+# cards of every group; the groups of one yaku are disjoint.
+YAKU_REQUIREMENTS = (
+    ("Goko", 10, ((HIKARI_MASK, 5),)),
+    ("Shiko", 8, ((BRIGHTS_MASK, 4),)),
+    ("Ame-Shiko", 7, ((RAINMAN_MASK, 1), (BRIGHTS_MASK, 3))),
+    ("Sanko", 5, ((BRIGHTS_MASK, 3),)),
+    ("Ino-Shika-Cho", 5, ((INOSHIKACHO_MASK, 3),)),
+    ("Akatan", 5, ((AKATAN_MASK, 3),)),
+    ("Aotan", 5, ((AOTAN_MASK, 3),)),
+    ("Hanami-de-Ippai", 5, ((MAKU_MASK, 1), (SAKAZUKI_MASK, 1))),
+    ("Tsukimi-de-Ippai", 5, ((TSUKI_MASK, 1), (SAKAZUKI_MASK, 1))),
+    ("Tane", 1, ((TANE_MASK, 5),)),
+    ("Tan", 1, ((TAN_MASK, 5),)),
+    ("Kasu", 1, ((KASU_MASK, 10),)),
+)
+# Every group mask, in a fixed order for signatures
+GROUP_MASKS = tuple(sorted({mask for _, _, groups in YAKU_REQUIREMENTS for mask, _ in groups}))
+_GROUP_INDEX = {mask: i for i, mask in enumerate(GROUP_MASKS)}
+
+
+@lru_cache(maxsize=None)
+def completion_probability(groups, pool, draws):
+    """
+    Probability that `draws` cards taken at random from `pool` include at
+    least `need` of the `unseen` cards of every (need, unseen) group.
+    The groups must be disjoint.
+    """
+    rest = pool - sum(unseen for _, unseen in groups)
+
+    def ways(i, left):
+        # Draws of `left` cards that satisfy groups i.. from their cards and the rest
+        if i == len(groups):
+            return math.comb(rest, left)
+        need, unseen = groups[i]
+        return sum(math.comb(unseen, x) * ways(i + 1, left - x) for x in range(need, min(unseen, left) + 1))
+
+    return ways(0, draws) / math.comb(pool, draws)
+
+
+def remaining_draws(state):
+    """
+    Cards each seat still draws this round: one per turn while the deck
+    lasts, taking turns from the seat to move next.
+    """
+    hands = [state.hands[0].bit_count(), state.hands[1].bit_count()]
+    seat = state.current if state.phase == PHASE_PLAY else 1 - state.current
+    deck = state.deck_remaining()
+    draws = [0, 0]
+    while deck and (hands[0] or hands[1]):
+        if hands[seat]:
+            hands[seat] -= 1
+            draws[seat] += 1
+            deck -= 1
+        seat = 1 - seat
+    return draws
+
+
+def _matchable(cards, other):
+    """The cards that have a card of the same month in other."""
+    reach = 0
+    for card_id in mask_to_ids(cards):
+        if other & MONTH_MASKS[CARD_MONTHS[card_id]]:
+            reach |= 1 << card_id
+    return reach
+
+
+def signature(state, seat):
+    """
+    Everything the odds of seat's view depend on: for each group mask, the
+    cards captured by the seat and by its opponent, the cards within reach
+    of each side and the ones in the pool; then the pool size and the
+    cards each side gets from it.
+    """
+    opponent = 1 - seat
+    hand = state.hands[seat]
+    reach_self = hand | _matchable(state.field, hand)
+    reach_opponent = 0  # Its hand is unseen, so it comes out of the pool
+    unseen = ~(hand | state.field | state.captured[0] | state.captured[1]) & ((1 << 48) - 1)
+    if state.pending is not None:
+        # The drawn card waiting for a capture choice belongs to the player to move
+        unseen &= ~(1 << state.pending)
+        if state.current == seat:
+            reach_self |= 1 << state.pending
+        else:
+            reach_opponent = 1 << state.pending
+    # Field cards the seat cannot match yet go to whoever gets their month from the pool
+    contested = _matchable(state.field & ~reach_self, unseen)
+    draws = remaining_draws(state)
+    pool = unseen | contested
+    counts = tuple((
+        (state.captured[seat] & mask).bit_count(), (state.captured[opponent] & mask).bit_count(),
+        (reach_self & mask).bit_count(), (reach_opponent & mask).bit_count(), (pool & mask).bit_count())
+        for mask in GROUP_MASKS)
+    pool = pool.bit_count()
+    return counts, pool, draws[seat], state.hands[opponent].bit_count() + draws[opponent]
+
+
+def _side_odds(counts, groups, side, pool, draws):
+    """
+    Odds that one side (0: the seat, 1: its opponent) completes a yaku's
+    groups, or None if its captured cards already do.
+    """
+    if all(counts[_GROUP_INDEX[mask]][side] >= needed for mask, needed in groups):
+        return None
+    needs = []
+    for mask, needed in groups:
+        captured_self, captured_opponent, reach_self, reach_opponent, in_pool = counts[_GROUP_INDEX[mask]]
+        have = (captured_self, captured_opponent)[side]
+        reach = (reach_self, reach_opponent)[side]
+        need = needed - have - reach
+        if need > in_pool:
+            return 0.0
+        if need > 0:
+            needs.append((need, in_pool))
+    if not needs:
+        return 1.0
+    return completion_probability(tuple(needs), pool, min(draws, pool))
+
+
+def completion_odds(state, seat):
+    """
+    (name, points, seat's probability, opponent's probability) for each
+    yaku of a BitboardState, using only what seat can see and the model
+    described at the top of this module. The probability is None for a
+    yaku that side has already made.
+    """
+    counts, pool, draws_self, draws_opponent = signature(state, seat)
+    return tuple((name, points, _side_odds(counts, groups, 0, pool, draws_self),
+                  _side_odds(counts, groups, 1, pool, draws_opponent))
+                 for name, points, groups in YAKU_REQUIREMENTS)
+
+
+def _final_points(points, opponent_koikoied):
+    """Round points as GameController._calculate_final_score gives them."""
+    if opponent_koikoied:
+        points *= 2
+    if points >= 7:
+        points *= 2
+    return points
+
+
+def koikoi_advice(state, seat=None):
+    """
+    For the seat choosing koikoi or shobu (default: the player to move),
+    returns (call koikoi?, chance of a new yaku, chance the opponent
+    scores). Calling koikoi gives up the current points unless a new yaku
+    comes before the opponent's first one, which it would score double.
+    The chances of different yaku are combined as if independent, and
+    they come from completion_odds, an estimate rather than exact odds.
+    """
+    if seat is None:
+        seat = state.current
+    current = state.monthly_scores[seat]
+    gain_miss, threat_miss = 1.0, 1.0
+    gain_points = threat_points = 0.0
+    gain_weight = threat_weight = 0.0
+    for name, points, p_self, p_opponent in completion_odds(state, seat):
+        # Yaku a side already has bring it nothing new
+        if p_self is not None:
+            gain_miss *= 1.0 - p_self
+            gain_points += p_self * points
+            gain_weight += p_self
+        if p_opponent is not None:
+            threat_miss *= 1.0 - p_opponent
+            threat_points += p_opponent * points
+            threat_weight += p_opponent
+    p_gain, p_threat = 1.0 - gain_miss, 1.0 - threat_miss
+    shobu = _final_points(current, state.koikoied[1 - seat])
+    koikoi = 0.0
+    if gain_weight:
+        koikoi += p_gain * _final_points(current + gain_points / gain_weight, state.koikoied[1 - seat])
+    if threat_weight:
+        koikoi -= p_threat * _final_points(threat_points / threat_weight, True)
+    return koikoi > shobu, p_gain, p_threat
@@ -0,0 +1,119 @@
+# yaku_table.py
+# Table-driven yaku evaluation on captured-pile bitboards (bit i = CARD_DATA[i]).
+#
+# Every yaku depends on one of a few small parts of the captured pile:
+#   - the hikari cards (Goko, Shiko, Ame-Shiko, Sanko)
+#   - the named set cards (Ino-Shika-Cho, Akatan, Aotan, Hanami/Tsukimi-de-Ippai)
+#   - the number of tane, tan and kasu cards
+# Each part is looked up in a table built once at import time from the rules
+# in yaku.Yaku, so the two always agree.
+
+from card import Card, CARD_DATA
+from yaku import Yaku
+
+
+def mask_where(predicate):
+    """Builds a mask of every card whose (month, name, category, points) matches."""
+    mask = 0
+    for card_id, data in enumerate(CARD_DATA):
+        if predicate(*data):
+            mask |= 1 << card_id
+    return mask
+
+
+HIKARI_MASK = mask_where(lambda m, n, c, p: c == 'hikari')
+TANE_MASK = mask_where(lambda m, n, c, p: c == 'tane')
+TAN_MASK = mask_where(lambda m, n, c, p: c == 'tan')
+KASU_MASK = mask_where(lambda m, n, c, p: c == 'kasu')
+
+# The cards that take part in Ino-Shika-Cho, Akatan, Aotan and the two sake yaku
+SET_CARD_NAMES = {"Inoshishi", "Shika", "Chou", "Akatan", "Aotan", "Sakazuki", "Maku", "Tsuki"}
+SET_CARDS_MASK = mask_where(lambda m, n, c, p: n in SET_CARD_NAMES)
+
+_HIKARI_YAKU = {"Goko", "Shiko", "Ame-Shiko", "Sanko"}
+_SET_YAKU = {"Ino-Shika-Cho", "Akatan", "Aotan", "Hanami-de-Ippai", "Tsukimi-de-Ippai"}
+
+
+def _submasks(mask):
+    """Yields every subset of the bits in mask."""
+    sub = mask
+    while True:
+        yield sub
+        if sub == 0:
+            return
+        sub = (sub - 1) & mask
+
+
+def _build_tables():
+    """Evaluates the reference Yaku rules over every signature value."""
+    reference = Yaku()
+    cards = [Card(month, category, name, points, card_id)
+             for card_id, (month, name, category, points) in enumerate(CARD_DATA)]
+
+    def yaku_of(mask, names):
+        pile = [card for card in cards if mask >> card.card_id & 1]
+        return tuple(y for y in reference.check_yaku(pile) if y[0] in names)
+
+    def count_table(category_mask, name):
+        ids = [card.card_id for card in cards if category_mask >> card.card_id & 1]
+        table, mask = [], 0
+        for count in range(len(ids) + 1):
+            table.append(yaku_of(mask, {name}))
+            if count < len(ids):
+                mask |= 1 << ids[count]
+        return tuple(table)
+
+    hikari = {sub: yaku_of(sub, _HIKARI_YAKU) for sub in _submasks(HIKARI_MASK)}
+    sets = {sub: yaku_of(sub, _SET_YAKU) for sub in _submasks(SET_CARDS_MASK)}
+    return (hikari, sets, count_table(TANE_MASK, "Tane"),
+            count_table(TAN_MASK, "Tan"), count_table(KASU_MASK, "Kasu"))
+
+
+# Yaku tuples keyed by (captured & HIKARI_MASK) and (captured & SET_CARDS_MASK),
+# and indexed by the number of tane / tan / kasu cards
+HIKARI_TABLE, SET_TABLE, TANE_TABLE, TAN_TABLE, KASU_TABLE = _build_tables()
+
+
+def _score_table(table):
+    if isinstance(table, dict):
+        return {key: sum(points for _, points in yaku) for key, yaku in table.items()}
+    return tuple(sum(points for _, points in yaku) for yaku in table)
+
+
+HIKARI_SCORES = _score_table(HIKARI_TABLE)
+SET_SCORES = _score_table(SET_TABLE)
+TANE_SCORES = _score_table(TANE_TABLE)
+TAN_SCORES = _score_table(TAN_TABLE)
+KASU_SCORES = _score_table(KASU_TABLE)
+
+
+def lookup_yaku(captured):
+    """Returns the (yaku_name, points) list for a captured-pile bitboard."""
+    return list(HIKARI_TABLE[captured & HIKARI_MASK]
+                + SET_TABLE[captured & SET_CARDS_MASK]
+                + TANE_TABLE[(captured & TANE_MASK).bit_count()]
+                + TAN_TABLE[(captured & TAN_MASK).bit_count()]
+                + KASU_TABLE[(captured & KASU_MASK).bit_count()])
+
+
+def lookup_score(captured):
+    """Returns the total yaku points for a captured-pile bitboard."""
+    return (HIKARI_SCORES[captured & HIKARI_MASK]
+            + SET_SCORES[captured & SET_CARDS_MASK]
+            + TANE_SCORES[(captured & TANE_MASK).bit_count()]
+            + TAN_SCORES[(captured & TAN_MASK).bit_count()]
+            + KASU_SCORES[(captured & KASU_MASK).bit_count()])
+
+
+class YakuTable:
+    """Drop-in replacement for Yaku that evaluates with table lookups."""
+
+    def check_yaku(self, captured_cards):
+        """
+        Checks the player's captured cards against all yaku definitions.
+        Returns a list of (yaku_name, points) tuples.
+        """
+        captured = 0
+        for card in captured_cards:
+            captured |= 1 << card.card_id
+        return lookup_yaku(captured)
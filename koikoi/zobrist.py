@@ -0,0 +1,105 @@
+# zobrist.py
+# Zobrist hashing of koikoi positions.
+#
+# A position key is the sum (mod 2**64) of one random 64-bit key per fact
+# about the position: where each card is (a seat's hand or captured pile, the
+# field, a deck slot, or waiting for a capture choice), whose turn it is, who
+# is parent, who has called koikoi and the round phase. Moving a card
+# subtracts its old key and adds its new one, so Player, Field, Deck and
+# BitboardState keep their keys up to date as the cards move instead of
+# rehashing.
+#
+# Interchangeable cards (the same CARD_DATA entry, e.g. the kasu of a month)
+# share their keys, so positions that only differ by swapping them have the
+# same key and search, tables and caches see one position. Keys are added
+# rather than XORed so two such cards in the same place do not cancel out.
+#
+# Deck keys depend on the card's slot counted from the bottom of the deck, so
+# the draw order is part of the key (the endgame solver needs that) and
+# drawing from the top leaves the keys of the other cards alone.
+
+import random
+from card import CARD_DATA
+
+NUM_CARDS = len(CARD_DATA)
+KEY_MASK = (1 << 64) - 1
+# Fixed so keys are the same in every process and every run
+ZOBRIST_SEED = 20250101
+
+# Card locations; the hand and captured pile are indexed by seat
+HAND = (0, 1)
+CAPTURED = (2, 3)
+FIELD = 4
+PENDING = 5  # A drawn card waiting for its capture choice
+NUM_LOCATIONS = 6
+
+# Round phases, the same strings as bitboard.PHASE_*
+PHASES = ("play", "draw", "koikoi", "end")
+
+# Cards that only differ by id share a kind: the id of their first CARD_DATA entry
+_KINDS = [CARD_DATA.index(data) for data in CARD_DATA]
+
+_rng = random.Random(ZOBRIST_SEED)
+
+
+def _kind_keys():
+    keys = [_rng.getrandbits(64) for _ in range(NUM_CARDS)]
+    return tuple(keys[kind] for kind in _KINDS)
+
+
+CARD_KEYS = tuple(_kind_keys() for _ in range(NUM_LOCATIONS))
+DECK_KEYS = tuple(_kind_keys() for _ in range(NUM_CARDS))  # [slot][card_id]
+SIDE_KEY = _rng.getrandbits(64)  # Seat 1 to move
+PARENT_KEY = _rng.getrandbits(64)  # Seat 1 is parent
+KOIKOI_KEYS = (_rng.getrandbits(64), _rng.getrandbits(64))
+PHASE_KEYS = {phase: _rng.getrandbits(64) for phase in PHASES}
+OBSERVER_KEY = _rng.getrandbits(64)  # Values from seat 1's point of view (endgame.py)
+del _rng
+
+# Adding CAPTURE_KEYS[seat][card_id] moves a card from the field to seat's captured pile
+CAPTURE_KEYS = tuple(tuple(CARD_KEYS[CAPTURED[seat]][card_id] - CARD_KEYS[FIELD][card_id]
+                           for card_id in range(NUM_CARDS)) for seat in (0, 1))
+
+
+def cards_key(cards, location):
+    """Key of a list of Card objects at one location."""
+    keys = CARD_KEYS[location]
+    key = 0
+    for card in cards:
+        key += keys[card.card_id]
+    return key
+
+
+def mask_key(mask, location):
+    """Key of a bitboard of cards at one location."""
+    keys = CARD_KEYS[location]
+    key = 0
+    while mask:
+        low = mask & -mask
+        key += keys[low.bit_length() - 1]
+        mask ^= low
+    return key
+
+
+def deck_key(card_ids):
+    """Key of the cards left in the deck, in draw order (top first)."""
+    key = 0
+    slot = len(card_ids)
+    for card_id in card_ids:
+        slot -= 1
+        key += DECK_KEYS[slot][card_id]
+    return key
+
+
+def state_key(current, parent, koikoied, phase):
+    """Key of everything but the card locations."""
+    key = PHASE_KEYS[phase]
+    if current:
+        key += SIDE_KEY
+    if parent:
+        key += PARENT_KEY
+    if koikoied[0]:
+        key += KOIKOI_KEYS[0]
+    if koikoied[1]:
+        key += KOIKOI_KEYS[1]
+    return key